@@ -0,0 +1,183 @@
+# coding=utf-8
+
+"""
+Continuous screen frame sources for the UIAutomator2 Android driver.
+
+A :py:class:`LatestFrameSource` keeps capturing frames in a background thread and holds only the latest one, so a
+screenshot is served from memory instead of waiting for a device round trip. Frames come from a capture callable:
+
+- :py:func:`screenshot_capture`: repeated uiautomator2 ``screenshot(format='raw')`` (JPEG encoded on the device)
+- :py:func:`screencap_capture`: repeated ``screencap`` over an adb ``exec:`` stream. The frame is the raw RGBA
+  framebuffer, there is no PNG/JPEG encoding on the device at all.
+"""
+
+import threading
+import time
+
+__all__ = ['LatestFrameSource', 'screenshot_capture', 'screencap_capture']
+
+
+def screenshot_capture(device):
+    """Capture callable reading encoded screenshots through uiautomator2.
+
+    Args:
+        device: uiautomator2 device
+
+    Returns:
+        callable: returns the encoded image bytes of one frame
+    """
+
+    return lambda: device.screenshot(format='raw')
+
+
+def screencap_capture(adb_device):
+    """Capture callable reading the raw framebuffer with ``screencap`` over an adb ``exec:`` stream (binary safe,
+    Android 5.0+).
+
+    Args:
+        adb_device: ``adbutils`` device, e.g. ``u2_device._adb_device``
+
+    Returns:
+        callable: returns one frame as a PIL RGBA image
+    """
+
+    from PIL import Image
+
+    def capture():
+        c = adb_device.open_transport()
+        try:
+            c.send_command('exec:screencap')
+            c.check_okay()
+            chunks = []
+            while True:
+                chunk = c.read(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            data = b''.join(chunks)
+        finally:
+            c.close()
+        # header: width, height, pixel format (little endian uint32), plus a color space field since Android 8
+        width = _uint32(data, 0)
+        height = _uint32(data, 4)
+        header = len(data) - width * height * 4
+        if header not in (12, 16):
+            raise ValueError('Unexpected screencap output: {} bytes for {}x{}'.format(len(data), width, height))
+        return Image.frombuffer('RGBA', (width, height), data[header:], 'raw', 'RGBA', 0, 1)
+
+    return capture
+
+
+def _uint32(data, offset):
+    b = bytearray(data[offset:offset + 4])
+    return b[0] | b[1] << 8 | b[2] << 16 | b[3] << 24
+
+
+class LatestFrameSource(object):
+    """Background thread capturing frames one after another and keeping the latest.
+
+    The thread starts on the first :py:meth:`latest` call (or :py:meth:`keep_alive`) and stops by itself after
+    ``idle_timeout`` seconds without any, so an unused stream does not keep the device busy.
+
+    Args:
+        capture (callable): returns one frame (encoded image bytes or a PIL image)
+        interval (:obj:`float`): minimum seconds between the starts of two captures, 0 for back to back
+        idle_timeout (:obj:`float`): the thread stops this long after the last request
+
+    Attributes:
+        frames_captured (:obj:`int`): frames captured by the thread
+        frames_served (:obj:`int`): frames returned by :py:meth:`latest`
+        capture_errors (:obj:`int`): failed captures
+    """
+
+    def __init__(self, capture, interval=0.0, idle_timeout=5.0):
+        super(LatestFrameSource, self).__init__()
+        self.capture = capture
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.frames_captured = 0
+        self.frames_served = 0
+        self.capture_errors = 0
+        self._frame = None
+        self._frame_started = 0  # when the capture of the latest frame started
+        self._failing = False  # the last capture failed
+        self._last_active = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+
+    def keep_alive(self):
+        with self._lock:
+            self._last_active = time.time()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='poco-frame-source')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if time.time() - self._last_active > self.idle_timeout:
+                    self._thread = None
+                    # an old frame must not be served when the thread starts again
+                    self._frame = None
+                    self._new_frame.notify_all()
+                    return
+            started = time.time()
+            try:
+                frame = self.capture()
+            except Exception:
+                with self._lock:
+                    self.capture_errors += 1
+                    self._failing = True
+                    self._new_frame.notify_all()
+                time.sleep(max(self.interval, 0.1))
+                continue
+            with self._lock:
+                self._frame = frame
+                self._frame_started = started
+                self._failing = False
+                self.frames_captured += 1
+                self._new_frame.notify_all()
+            remaining = self.interval - (time.time() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def latest(self, newer_than=0, timeout=3.0):
+        """The latest frame, waiting only if there is none captured after ``newer_than`` yet. Does not wait while
+        the captures are failing, so that the caller can fall back to another way at once.
+
+        Args:
+            newer_than (:obj:`float`): timestamp the frame capture must have started after, e.g. the last input action
+            timeout (:obj:`float`): max seconds to wait for such a frame
+
+        Returns:
+            tuple: (frame, capture start timestamp). (None, 0) if no frame came in time or the capture failed
+        """
+
+        self.keep_alive()
+        deadline = time.time() + timeout
+        with self._new_frame:
+            while self._frame is None or self._frame_started <= newer_than:
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._failing:
+                    return None, 0
+                self._new_frame.wait(remaining)
+            self.frames_served += 1
+            return self._frame, self._frame_started
+
+    def get_stats(self):
+        """
+        Returns:
+            :obj:`dict`: ``frames_captured``, ``frames_served``, ``capture_errors`` and ``running``
+        """
+
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_served': self.frames_served,
+            'capture_errors': self.capture_errors,
+            'running': self.is_running(),
+        }
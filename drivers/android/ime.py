@@ -0,0 +1,161 @@
+# coding=utf-8
+
+"""
+Fast input IME session of the UIAutomator2 Android driver.
+
+Typing through uiautomator2's ``FastInputIME`` means switching the input method to it first (``ime enable`` and
+``ime set``, then waiting for the keyboard to come up) and switching back afterwards. Doing that around every text
+costs seconds per field. A :py:class:`FastInputSession` switches once, keeps the fast IME across texts, and switches
+back to the input method that was in use lazily: after ``idle_timeout`` seconds without typing, when a
+:py:meth:`FastInputSession.hold` block ends, or when the process exits.
+"""
+
+import atexit
+import threading
+import time
+
+__all__ = ['FastInputSession', 'FAST_INPUT_IME']
+
+FAST_INPUT_IME = 'com.github.uiautomator/.FastInputIME'
+
+
+class FastInputSession(object):
+    """Keeps the uiautomator2 fast input IME active across texts typed on one device.
+
+    Args:
+        device: uiautomator2 device
+        idle_timeout (:obj:`float`): seconds without typing after which the previous input method is restored. None
+         keeps the fast IME until :py:meth:`restore` or the process exits
+
+    Attributes:
+        activations (:obj:`int`): switches to the fast IME
+        restores (:obj:`int`): switches back to the previous input method
+        texts_sent (:obj:`int`): texts typed through the fast IME
+    """
+
+    def __init__(self, device, idle_timeout=10.0):
+        super(FastInputSession, self).__init__()
+        self.device = device
+        self.idle_timeout = idle_timeout
+        self.activations = 0
+        self.restores = 0
+        self.texts_sent = 0
+        self._active = False
+        self._previous_ime = None
+        self._held = 0
+        self._last_used = 0
+        self._thread = None
+        self._exit_hook = False
+        self._lock = threading.RLock()
+
+    def is_active(self):
+        return self._active
+
+    def _activate(self):
+        try:
+            previous, _ = self.device.current_ime()
+        except Exception:
+            previous = None
+        if previous != FAST_INPUT_IME:
+            self._previous_ime = previous
+            self.device.set_fastinput_ime(True)
+        self._active = True
+        self.activations += 1
+        if not self._exit_hook:
+            # leave the device with its own keyboard even if the session was never restored
+            atexit.register(self.restore)
+            self._exit_hook = True
+
+    def send_keys(self, text, clear=False):
+        """Type a text into the focused field, switching to the fast IME first if it is not active yet.
+
+        Args:
+            text (:obj:`str`): text to type
+            clear (:obj:`bool`): replace the content of the field instead of appending to it
+        """
+
+        with self._lock:
+            if not self._active:
+                self._activate()
+            self._last_used = time.time()
+            try:
+                self.device.send_keys(text, clear)
+            finally:
+                self._last_used = time.time()
+                self.texts_sent += 1
+            self._watch_idle()
+
+    def _watch_idle(self):
+        if self.idle_timeout is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='poco-fast-input-ime')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                idle = time.time() - self._last_used
+                if not self._held and idle > self.idle_timeout:
+                    self._thread = None
+                    self._restore()
+                    return
+                remaining = self.idle_timeout - idle
+            time.sleep(max(remaining, 0.1))
+
+    def restore(self):
+        """Switch back to the input method used before the session, if the fast IME is active."""
+
+        with self._lock:
+            self._restore()
+
+    def _restore(self):
+        if not self._active:
+            return
+        self._active = False
+        self.restores += 1
+        try:
+            self.device.set_fastinput_ime(False)
+            if self._previous_ime:
+                self.device.shell(['ime', 'set', self._previous_ime])
+        except Exception:
+            pass
+        self._previous_ime = None
+
+    def hold(self):
+        """Context manager keeping the fast IME active during a text heavy phase (no idle restore inside), and
+        restoring the previous input method when the outermost block ends."""
+
+        return _HeldSession(self)
+
+    def get_stats(self):
+        """
+        Returns:
+            :obj:`dict`: ``activations``, ``restores``, ``texts_sent`` and ``active``
+        """
+
+        return {
+            'activations': self.activations,
+            'restores': self.restores,
+            'texts_sent': self.texts_sent,
+            'active': self._active,
+        }
+
+
+class _HeldSession(object):
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        with self.session._lock:
+            self.session._held += 1
+        return self.session
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self.session._lock:
+            self.session._held -= 1
+            if not self.session._held:
+                self.session._restore()
@@ -0,0 +1,281 @@
+# coding=utf-8
+
+"""
+Motion event engine of the UIAutomator2 Android driver.
+
+:py:func:`compile_motion_events` turns the discretized motion events of :py:meth:`InputInterface.applyMotionEvents
+<poco.sdk.interfaces.input.InputInterface.applyMotionEvents>` (``['d', (x, y), contact]``, ``['m', (x, y), contact]``,
+``['u', contact]`` and ``['s', seconds]``) into as few device calls as possible, each scheduled at an offset from the
+start of the gesture. :py:func:`play_motion_calls` performs them against the absolute schedule, so the time spent in
+device round trips does not add up along the gesture.
+
+The events are split into gestures (from the first contact down to the last contact up) and each gesture is compiled
+according to its shape:
+
+- one contact at a time, not moving: a ``click``, or a ``long_click`` when held for longer
+- one contact at a time, moving at a steady pace right from the down to the up: a single ``swipe_points`` call
+- one contact at a time otherwise (holds, changes of pace): ``touch.down``, ``touch.move`` and ``touch.up`` calls,
+  with the moves without any sleep in between merged into one
+- several contacts at once: ``pointer_down``, ``pointer_move`` and ``pointer_up`` calls per contact, keeping every
+  point and hold of each contact, for a multi-touch backend (see :py:class:`AirtestMultiTouch`). The uiautomator2
+  touch API injects a single contact, so without a backend such gestures raise :py:class:`InvalidOperationException
+  <poco.exceptions.InvalidOperationException>`
+"""
+
+import time
+
+from poco.exceptions import InvalidOperationException
+
+__all__ = ['compile_motion_events', 'play_motion_calls', 'AirtestMultiTouch']
+
+# uiautomator throttles every gesture step to 5ms
+STEP_TIME = 0.005
+
+# a tap held longer than this is a long click
+LONG_CLICK_THRESHOLD = 0.3
+
+# intervals between the points of a stroke within this ratio of their mean count as a steady pace
+PACE_TOLERANCE = 0.25
+
+POINTER_METHODS = ('pointer_down', 'pointer_move', 'pointer_up')
+
+
+class _Stroke(object):
+    __slots__ = ('contact', 'points', 'up_at')
+
+    def __init__(self, contact, at, pos):
+        self.contact = contact
+        self.points = [(at, pos)]
+        self.up_at = None
+
+    def move(self, at, pos):
+        if self.points[-1][0] == at and len(self.points) > 1:
+            # nothing was injected since the last move, only the latest position matters
+            self.points[-1] = (at, pos)
+            if len(self.points) > 1 and self.points[-2][1] == pos:
+                self.points.pop()
+        elif self.points[-1][1] != pos:
+            self.points.append((at, pos))
+
+    @property
+    def down_at(self):
+        return self.points[0][0]
+
+
+def compile_motion_events(events, to_px, multitouch=False):
+    """Compile motion events into device calls.
+
+    Args:
+        events (:obj:`list`): motion events, positions in normalized coordinates
+        to_px (callable): ``to_px(x, y)`` returns the pixel position of a normalized one
+        multitouch (:obj:`bool`): whether a multi-touch backend will play the calls. Gestures with several contacts
+         then compile to ``pointer_*`` calls
+
+    Returns:
+        :obj:`list`: ``(at, method, args)`` tuples, ``at`` being the offset in seconds from the start of the gesture
+        at which to call ``method`` (``click``, ``long_click``, ``swipe_points``, ``down``, ``move``, ``up``, or
+        ``pointer_down``, ``pointer_move`` and ``pointer_up`` with ``(x, y, contact)``) with ``args``
+
+    Raises:
+        ValueError: on an unknown event type
+        InvalidOperationException: if several contacts are down at once and there is no multi-touch backend
+    """
+
+    calls = []
+    at = 0.0
+    active = {}  # contact -> stroke
+    strokes = []  # strokes of the current gesture
+    peak = 0
+    for e in events:
+        if not e:
+            continue
+        t = e[0]
+        if t == 's':
+            at += e[1]
+        elif t == 'd' or t == 'm':
+            pos = to_px(*e[1])
+            contact = e[2]
+            stroke = active.get(contact)
+            if stroke is not None:
+                stroke.move(at, pos)
+            elif t == 'd':
+                stroke = active[contact] = _Stroke(contact, at, pos)
+                strokes.append(stroke)
+                peak = max(peak, len(active))
+            # a move of a contact that is not down is dropped, as a touch panel would
+        elif t == 'u':
+            stroke = active.pop(e[1], None)
+            if stroke is not None:
+                stroke.up_at = at
+                if not active:
+                    calls.extend(_compile_gesture(strokes, peak, multitouch))
+                    strokes, peak = [], 0
+        else:
+            raise ValueError('Unknown event type {}'.format(repr(t)))
+
+    if active:
+        # never leave a contact down on the device
+        for stroke in active.values():
+            stroke.up_at = at
+        calls.extend(_compile_gesture(strokes, peak, multitouch))
+    return calls
+
+
+def _compile_gesture(strokes, peak, multitouch):
+    if peak == 1:
+        calls = []
+        for stroke in strokes:
+            calls.extend(_compile_stroke(stroke))
+        return calls
+    if multitouch:
+        return _compile_pointers(strokes)
+    raise InvalidOperationException(
+        'UIAutomator2 injects a single contact, this gesture has {} contacts at once. It needs a multi-touch backend '
+        '(option multitouch)'.format(peak))
+
+
+def _compile_stroke(stroke):
+    points = stroke.points
+    x, y = points[0][1]
+    held = stroke.up_at - stroke.down_at
+    if len(points) == 1:
+        if held > LONG_CLICK_THRESHOLD:
+            return [(stroke.down_at, 'long_click', (x, y, held))]
+        return [(stroke.down_at, 'click', (x, y))]
+
+    swipe = _steady_swipe(stroke)
+    if swipe is not None:
+        return [swipe]
+
+    calls = [(stroke.down_at, 'down', (x, y))]
+    calls.extend((at, 'move', pos) for at, pos in points[1:])
+    calls.append((stroke.up_at, 'up', points[-1][1]))
+    return calls
+
+
+def _steady_swipe(stroke):
+    # one swipe_points call if the points are evenly spaced in time from the down to the up. uiautomator moves along
+    # each segment in a whole number of 5ms steps, so segments shorter than that are merged
+    points = stroke.points
+    intervals = [b[0] - a[0] for a, b in zip(points, points[1:])]
+    duration = points[-1][0] - points[0][0]
+    mean = duration / len(intervals)
+    if mean <= 0 or any(abs(dt - mean) > mean * PACE_TOLERANCE for dt in intervals):
+        return None
+    # the last sample may be dropped for rounding to the end's pixel, so one missing interval is not a hold
+    if stroke.up_at - points[-1][0] > mean * (2 + PACE_TOLERANCE):
+        return None  # held at the end
+    # as many segments as there are points or 5ms steps, whichever is fewer, sampled evenly along the points
+    total_steps = max(1, int(round(duration / STEP_TIME)))
+    segments = min(len(intervals), total_steps)
+    steps = max(1, int(round(float(total_steps) / segments)))
+    kept = [points[i * len(intervals) // segments][1] for i in range(segments + 1)]
+    # swipe_points takes the duration of a segment and truncates it to steps, half a step keeps the rounding
+    return stroke.down_at, 'swipe_points', (kept, (steps + 0.5) * STEP_TIME)
+
+
+def _compile_pointers(strokes):
+    # every point of every contact at its time. At equal times, earlier touches (a contact lifting before it touches
+    # again) and earlier points of a touch come first
+    calls = []
+    for i, stroke in enumerate(strokes):
+        contact = stroke.contact
+        x, y = stroke.points[0][1]
+        calls.append((stroke.down_at, i, 0, 'pointer_down', (x, y, contact)))
+        for j, (at, (x, y)) in enumerate(stroke.points[1:], 1):
+            calls.append((at, i, j, 'pointer_move', (x, y, contact)))
+        calls.append((stroke.up_at, i, len(stroke.points), 'pointer_up', (x, y, contact)))
+    calls.sort(key=lambda call: call[:3])
+    return [(at, method, args) for at, _, _, method, args in calls]
+
+
+def play_motion_calls(device, calls, multitouch=None):
+    """Perform compiled motion calls on a uiautomator2 device.
+
+    Every call is made when its offset is reached, measured from the start and not from the previous call, so the
+    latency of the calls does not shift the rest of the gesture. A move that is already late while the next move of
+    the same contact is due too is skipped, the contact goes straight to the latest position.
+
+    Args:
+        device: uiautomator2 device
+        calls (:obj:`list`): calls from :py:func:`compile_motion_events`
+        multitouch: multi-touch backend performing the ``pointer_*`` calls, e.g. :py:class:`AirtestMultiTouch`
+
+    Returns:
+        :obj:`int`: number of device calls made
+
+    Raises:
+        InvalidOperationException: on ``pointer_*`` calls without a multi-touch backend
+    """
+
+    if multitouch is None and any(method in POINTER_METHODS for _, method, _ in calls):
+        raise InvalidOperationException('Motion calls with several contacts need a multi-touch backend')
+
+    touch = None
+    performed = 0
+    start = time.time()
+    for i, (at, method, args) in enumerate(calls):
+        delay = start + at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        elif _superseded(calls, i) and start + calls[i + 1][0] <= time.time():
+            continue
+
+        if method in POINTER_METHODS:
+            getattr(multitouch, method[len('pointer_'):])(*args)
+        elif method in ('down', 'move', 'up'):
+            if touch is None:
+                touch = device.touch
+            getattr(touch, method)(*args)
+        else:
+            getattr(device, method)(*args)
+        performed += 1
+    return performed
+
+
+def _superseded(calls, i):
+    # the call is a move followed by another move of the same contact
+    if i + 1 >= len(calls):
+        return False
+    method, args = calls[i][1:]
+    following, following_args = calls[i + 1][1:]
+    if method == 'move':
+        return following == 'move'
+    return method == 'pointer_move' and following == 'pointer_move' and following_args[2] == args[2]
+
+
+class AirtestMultiTouch(object):
+    """Multi-touch backend injecting any number of contacts through airtest's minitouch/maxtouch on the same device.
+
+    Airtest is an optional dependency. It is imported and connected to the device on the first gesture that needs it.
+
+    Args:
+        device: uiautomator2 device, whose serial number airtest connects to
+    """
+
+    def __init__(self, device):
+        super(AirtestMultiTouch, self).__init__()
+        self.device = device
+        self._touch_proxy = None
+        self._events = None
+
+    def _perform(self, name, *args):
+        if self._touch_proxy is None:
+            try:
+                from airtest.core.android.android import Android
+                from airtest.core.android.touch_methods import base_touch
+            except ImportError as e:
+                raise InvalidOperationException('Gestures with several contacts need airtest (minitouch/maxtouch) '
+                                                'on the device: {}'.format(e))
+            self._events = base_touch
+            self._touch_proxy = Android(serialno=self.device.serial).touch_proxy
+        self._touch_proxy.perform([getattr(self._events, name)(*args)], interval=0)
+
+    def down(self, x, y, contact):
+        self._perform('DownEvent', (x, y), contact)
+
+    def move(self, x, y, contact):
+        self._perform('MoveEvent', (x, y), contact)
+
+    def up(self, x, y, contact):
+        self._perform('UpEvent', contact)
@@ -0,0 +1,261 @@
+# coding=utf-8
+
+"""
+Run tests on several Android devices at once with the UIAutomator2 driver.
+
+Every device gets its own Poco instance for each run (by default a new :py:class:`AndroidUiautomator2Poco
+<poco.drivers.android.uiautomation2.AndroidUiautomator2Poco>`) and runs its tests one after another in a worker
+thread, so the Poco state of a device is never shared, not even with a thread abandoned after a timeout. Work is I/O
+bound (device RPCs, dumps) and Poco instances hold live device connections, so threads are used rather than processes.
+
+Example::
+
+    def smoke(poco, device_id):
+        poco(text='Settings').click()
+        assert poco(text='Wi-Fi').exists()
+
+    runner = ParallelRunner(['emulator-5554', 'emulator-5556', 'R58M12345'], max_workers=2, timeout=120)
+    for result in runner.iter_results(smoke):
+        print(result)
+"""
+
+import threading
+import time
+import traceback
+from collections import deque
+
+__all__ = ['DeviceResult', 'RunReport', 'ParallelRunner']
+
+
+class DeviceResult(object):
+    """Outcome of one test on one device.
+
+    Attributes:
+        device_id: the device
+        test (callable): the test
+        status (:obj:`str`): ``passed``, ``failed`` (the test raised :obj:`AssertionError`), ``error`` (any other
+         exception, including failing to create the Poco instance), ``timeout`` or ``skipped`` (the device was
+         abandoned after a timeout before this test could start)
+        value: return value of the test
+        error (:obj:`Exception`): raised exception, if any
+        traceback (:obj:`str`): formatted traceback of ``error``
+        started (:obj:`float`): start timestamp, None if skipped
+        duration (:obj:`float`): seconds spent
+    """
+
+    PASSED = 'passed'
+    FAILED = 'failed'
+    ERROR = 'error'
+    TIMEOUT = 'timeout'
+    SKIPPED = 'skipped'
+
+    def __init__(self, device_id, test, status, value=None, error=None, traceback=None, started=None, duration=0.0):
+        self.device_id = device_id
+        self.test = test
+        self.status = status
+        self.value = value
+        self.error = error
+        self.traceback = traceback
+        self.started = started
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.status == self.PASSED
+
+    def __repr__(self):
+        return '<DeviceResult {} {} {} {:.2f}s>'.format(self.device_id, getattr(self.test, '__name__', self.test),
+                                                        self.status, self.duration)
+
+
+class RunReport(object):
+    """All results of one :py:meth:`ParallelRunner.run`, in completion order.
+
+    Attributes:
+        results (:obj:`list`): :py:class:`DeviceResult` list
+        duration (:obj:`float`): wall time of the whole run
+    """
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return all(r.ok for r in self.results)
+
+    @property
+    def failures(self):
+        return [r for r in self.results if not r.ok]
+
+    def by_device(self):
+        """
+        Returns:
+            :obj:`dict`: device id -> list of its :py:class:`DeviceResult`
+        """
+
+        devices = {}
+        for r in self.results:
+            devices.setdefault(r.device_id, []).append(r)
+        return devices
+
+    def summary(self):
+        """
+        Returns:
+            :obj:`dict`: number of results per status, plus ``duration`` (wall time) and ``busy`` (sum of the test
+            durations)
+        """
+
+        counts = dict.fromkeys([DeviceResult.PASSED, DeviceResult.FAILED, DeviceResult.ERROR, DeviceResult.TIMEOUT,
+                                DeviceResult.SKIPPED], 0)
+        for r in self.results:
+            counts[r.status] += 1
+        counts['duration'] = self.duration
+        counts['busy'] = sum(r.duration for r in self.results)
+        return counts
+
+
+def _default_poco_factory(device_id):
+    # not the instance cached by AndroidUiautomator2Helper: a thread abandoned after a timeout keeps driving its Poco
+    from poco.drivers.android.uiautomation2 import AndroidUiautomator2Poco
+    return AndroidUiautomator2Poco(device_id=device_id)
+
+
+class ParallelRunner(object):
+    """Runs test callables on a list of devices, one worker thread per running test.
+
+    A test is called as ``test(poco, device_id)``. Each device runs at most one test at a time and runs its tests in
+    the given order. Devices take turns (round robin) for the free worker slots, so with fewer slots than devices no
+    device waits for another one to finish all its tests.
+
+    Threads cannot be interrupted. A test running longer than ``timeout`` is reported as ``timeout`` at its deadline
+    and its worker slot is freed, but the thread is left running in the background: its late result is dropped and
+    the device is abandoned, its remaining tests are reported as ``skipped``. Poco instances are created per run, so
+    the next run of the device starts on a new instance instead of the one the abandoned thread may still be using.
+
+    Args:
+        devices (:obj:`list`): device ids (serial numbers)
+        max_workers (:obj:`int`): maximum number of tests running at once, defaults to one per device
+        timeout (:obj:`float`): maximum seconds per test (Poco creation included), None for no limit
+        poco_factory (callable): ``poco_factory(device_id)`` returns a new Poco instance for a device, called once per
+         device and run in its first worker. Defaults to creating an :py:class:`AndroidUiautomator2Poco
+         <poco.drivers.android.uiautomation2.AndroidUiautomator2Poco>`
+    """
+
+    def __init__(self, devices, max_workers=None, timeout=None, poco_factory=None):
+        super(ParallelRunner, self).__init__()
+        self.devices = list(devices)
+        self.max_workers = max(1, max_workers or len(self.devices))
+        self.timeout = timeout
+        self.poco_factory = poco_factory or _default_poco_factory
+        self._cond = threading.Condition()
+
+    def iter_results(self, tests):
+        """Run the tests on every device, yielding each :py:class:`DeviceResult` as soon as it is known.
+
+        Args:
+            tests: a test callable, or a list of them to run in order on every device
+
+        Yields:
+            :py:class:`DeviceResult`: results in completion order
+        """
+
+        tests = list(tests) if isinstance(tests, (list, tuple)) else [tests]
+        cond = self._cond
+        queued = {device_id: deque(tests) for device_id in self.devices}
+        turns = deque(self.devices)
+        busy = set()
+        abandoned = set()
+        running = {}  # job -> (device_id, test, deadline)
+        finished = deque()
+        # Poco instances of this run. A device runs one test at a time, and an abandoned device gets no more tests
+        pocos = {}
+
+        def poco_of(device_id):
+            poco = pocos.get(device_id)
+            if poco is None:
+                poco = pocos[device_id] = self.poco_factory(device_id)
+            return poco
+
+        def work(job, device_id, test):
+            started = time.time()
+            value = error = tb = None
+            try:
+                value = test(poco_of(device_id), device_id)
+                status = DeviceResult.PASSED
+            except AssertionError as e:
+                status, error, tb = DeviceResult.FAILED, e, traceback.format_exc()
+            except Exception as e:
+                status, error, tb = DeviceResult.ERROR, e, traceback.format_exc()
+            result = DeviceResult(device_id, test, status, value, error, tb, started, time.time() - started)
+            with cond:
+                if running.pop(job, None) is not None:
+                    busy.discard(device_id)
+                    finished.append(result)
+                    cond.notify_all()
+
+        def next_device():
+            # the first device in turn order that is idle and has tests left, which then goes to the end of the turn
+            for _ in range(len(turns)):
+                device_id = turns[0]
+                turns.rotate(-1)
+                if device_id not in busy and device_id not in abandoned and queued[device_id]:
+                    return device_id
+            return None
+
+        while True:
+            with cond:
+                while len(running) < self.max_workers:
+                    device_id = next_device()
+                    if device_id is None:
+                        break
+                    test = queued[device_id].popleft()
+                    job = object()
+                    deadline = time.time() + self.timeout if self.timeout is not None else None
+                    running[job] = (device_id, test, deadline)
+                    busy.add(device_id)
+                    worker = threading.Thread(target=work, args=(job, device_id, test),
+                                              name='poco-runner-{}'.format(device_id))
+                    worker.daemon = True
+                    worker.start()
+
+                if not finished:
+                    if not running:
+                        return
+                    deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+                    cond.wait(max(0.0, min(deadlines) - time.time()) if deadlines else None)
+
+                now = time.time()
+                for job, (device_id, test, deadline) in list(running.items()):
+                    if deadline is not None and now >= deadline:
+                        del running[job]
+                        abandoned.add(device_id)
+                        finished.append(DeviceResult(device_id, test, DeviceResult.TIMEOUT,
+                                                     started=deadline - self.timeout, duration=self.timeout))
+                        while queued[device_id]:
+                            finished.append(DeviceResult(device_id, queued[device_id].popleft(),
+                                                         DeviceResult.SKIPPED))
+                results = list(finished)
+                finished.clear()
+
+            for result in results:
+                yield result
+
+    def run(self, tests, on_result=None):
+        """Run the tests on every device and wait for all of them.
+
+        Args:
+            tests: a test callable, or a list of them to run in order on every device
+            on_result (callable): called with each :py:class:`DeviceResult` as soon as it is known
+
+        Returns:
+            :py:class:`RunReport`: all results
+        """
+
+        start = time.time()
+        results = []
+        for result in self.iter_results(tests):
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+        return RunReport(results, time.time() - start)
@@ -0,0 +1,138 @@
+# coding=utf-8
+
+"""
+Single-flight coalescing of device requests for the UIAutomator2 Android driver.
+
+A uiautomator2 device serializes its HTTP requests anyway, so when several threads (a watcher, a screenshot hook,
+the test script) ask for the same resource at the same moment, only the first one needs to reach the device. The
+others wait for that in-flight request and share its result.
+"""
+
+import copy
+import threading
+import time
+
+__all__ = ['SingleFlightDevice']
+
+
+class _Flight(object):
+    __slots__ = ('started', 'done', 'result', 'error')
+
+    def __init__(self, started):
+        self.started = started
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightDevice(object):
+    """Wraps a uiautomator2 device so that concurrent ``dump_hierarchy``, ``screenshot``, ``info`` and
+    ``window_size`` requests with the same arguments share one in-flight request. Everything else is passed through
+    to the wrapped device, including selector calls such as ``device(resourceId=...)``.
+
+    A caller only joins a request that started after the last :py:meth:`expire` (called by the driver whenever the
+    UI is about to change, e.g. after an input action), and no more than ``window`` seconds ago. So a shared result is
+    never older than the caller's own view of the UI. Callers that join get a shallow copy of the result (e.g. their
+    own PIL image), never the leader's object.
+
+    Args:
+        device: uiautomator2 device
+        window (:obj:`float`): max age in seconds of an in-flight request that can be joined, None for any age
+    """
+
+    COALESCED = ('dump_hierarchy', 'screenshot', 'info', 'window_size')
+
+    def __init__(self, device, window=None):
+        self.__dict__['_device'] = device
+        self.__dict__['window'] = window
+        self.__dict__['_lock'] = threading.Lock()
+        self.__dict__['_flights'] = {}
+        self.__dict__['_stats'] = {name: {'requests': 0, 'performed': 0, 'coalesced': 0} for name in self.COALESCED}
+
+    @property
+    def device(self):
+        """The wrapped uiautomator2 device."""
+        return self._device
+
+    def __getattr__(self, name):
+        return getattr(self._device, name)
+
+    def __call__(self, *args, **kwargs):
+        # selectors, e.g. device(resourceId=...)
+        return self._device(*args, **kwargs)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__ or name == 'window':
+            self.__dict__[name] = value
+        else:
+            setattr(self._device, name, value)
+
+    def _call(self, name, func, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        try:
+            key = (name, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            key = None
+        now = time.time()
+        with self._lock:
+            stats = self._stats[name]
+            stats['requests'] += 1
+            flight = self._flights.get(key) if key is not None else None
+            if flight is not None and (self.window is None or now - flight.started <= self.window):
+                stats['coalesced'] += 1
+                leader = False
+            else:
+                stats['performed'] += 1
+                flight = _Flight(now)
+                if key is not None:
+                    self._flights[key] = flight
+                leader = True
+
+        if leader:
+            try:
+                flight.result = func(*args, **kwargs)
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight.done.set()
+            return flight.result
+
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy.copy(flight.result)
+
+    def dump_hierarchy(self, *args, **kwargs):
+        return self._call('dump_hierarchy', self._device.dump_hierarchy, args, kwargs)
+
+    def screenshot(self, *args, **kwargs):
+        return self._call('screenshot', self._device.screenshot, args, kwargs)
+
+    def window_size(self, *args, **kwargs):
+        return self._call('window_size', self._device.window_size, args, kwargs)
+
+    @property
+    def info(self):
+        return self._call('info', lambda: self._device.info)
+
+    def expire(self):
+        """Requests in flight now are not joined any more, the next caller of each resource issues a new one."""
+
+        with self._lock:
+            self._flights.clear()
+
+    def get_stats(self):
+        """Per-resource counters.
+
+        Returns:
+            :obj:`dict`: resource name -> ``requests`` (calls), ``performed`` (requests sent to the device) and
+            ``coalesced`` (calls served by another caller's request)
+        """
+
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
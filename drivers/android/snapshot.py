@@ -0,0 +1,336 @@
+# coding=utf-8
+
+"""
+Hierarchy snapshot store for the UIAutomator2 Android driver.
+
+The XML returned by ``device.dump_hierarchy()`` is parsed in a single streaming
+pass (expat, SAX-style) straight into a compact struct-of-arrays store. No
+intermediate ElementTree is built and no per-element object is kept: tree
+links are integer indices, bounds are packed integers, string attributes are
+interned into one table and boolean attributes are folded into a bitmask.
+
+Nodes are stored in document (pre-order) sequence, so index 0 is always the
+root element (``<hierarchy>`` for UIAutomator dumps).
+"""
+
+import re
+from array import array
+from itertools import chain
+from xml.parsers import expat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['HierarchySnapshot', 'SnapshotGeometry', 'parse_hierarchy', 'build_index']
+
+# boolean flag bits
+FLAG_HIERARCHY = 1 << 0  # the <hierarchy> element, carries no node attributes
+FLAG_VISIBLE = 1 << 1
+FLAG_ENABLED = 1 << 2
+FLAG_CLICKABLE = 1 << 3
+FLAG_FOCUSABLE = 1 << 4
+FLAG_FOCUSED = 1 << 5
+FLAG_SCROLLABLE = 1 << 6
+FLAG_SELECTED = 1 << 7
+FLAG_CHECKABLE = 1 << 8
+FLAG_CHECKED = 1 << 9
+FLAG_LONG_CLICKABLE = 1 << 10
+
+# interned string columns: (column name, xml attribute)
+STRING_COLUMNS = (
+    ('cls', 'class'),
+    ('package', 'package'),
+    ('resource_id', 'resource-id'),
+    ('text', 'text'),
+    ('content_desc', 'content-desc'),
+)
+
+_INT_RE = re.compile(r'-?\d+')
+
+
+def _parse_bounds(value):
+    # "[x1,y1][x2,y2]" -> (x1, y1, x2, y2)
+    coords = _INT_RE.findall(value) if value else ()
+    if len(coords) >= 4:
+        return int(coords[0]), int(coords[1]), int(coords[2]), int(coords[3])
+    return 0, 0, 0, 0
+
+
+def _bounds_column(values):
+    # All bounds strings are scanned by a single regex pass. Fall back to per-node
+    # parsing only if some value does not hold exactly 4 integers.
+    coords = _INT_RE.findall(' '.join(v or '[0,0][0,0]' for v in values))
+    if len(coords) == 4 * len(values):
+        return array('i', map(int, coords))
+    column = array('i')
+    for v in values:
+        column.extend(_parse_bounds(v))
+    return column
+
+
+def _flags_column(attribs):
+    # UIAutomator writes booleans as Java's Boolean.toString(), i.e. exactly "true"/"false".
+    # visible-to-user and enabled are treated as true when absent.
+    return array('i', [
+        (get('visible-to-user') != 'false') * FLAG_VISIBLE |
+        (get('enabled') != 'false') * FLAG_ENABLED |
+        (get('clickable') == 'true') * FLAG_CLICKABLE |
+        (get('focusable') == 'true') * FLAG_FOCUSABLE |
+        (get('focused') == 'true') * FLAG_FOCUSED |
+        (get('scrollable') == 'true') * FLAG_SCROLLABLE |
+        (get('selected') == 'true') * FLAG_SELECTED |
+        (get('checkable') == 'true') * FLAG_CHECKABLE |
+        (get('checked') == 'true') * FLAG_CHECKED |
+        (get('long-clickable') == 'true') * FLAG_LONG_CLICKABLE
+        for get in [a.get for a in attribs]
+    ])
+
+
+def _int_column(values):
+    column = array('i')
+    for v in values:
+        try:
+            column.append(int(v) if v else 0)
+        except ValueError:
+            column.append(0)
+    return column
+
+
+class SnapshotGeometry(object):
+    """Normalized geometry of every node of a snapshot, computed in one vectorized pass.
+
+    Uses NumPy when available and falls back to plain :obj:`array` arithmetic.
+    Columns are flat ``array('d')`` indexed by node id.
+
+    Attributes:
+        screen_size (:obj:`tuple`): (width, height) the columns are normalized to
+        pos (:obj:`array`): center point, 2 floats per node
+        size (:obj:`array`): width and height, 2 floats per node
+        bounds (:obj:`array`): ``x1, y1, x2, y2``, 4 floats per node
+    """
+
+    __slots__ = ('screen_size', 'pos', 'size', 'bounds')
+
+    def __init__(self, bounds, screen_size):
+        self.screen_size = screen_size
+        w, h = float(screen_size[0]), float(screen_size[1])
+        if numpy is not None:
+            self._compute_numpy(bounds, w, h)
+        else:
+            self._compute_array(bounds, w, h)
+
+    def _compute_numpy(self, bounds, w, h):
+        b = numpy.frombuffer(bounds, dtype=numpy.dtype('i{}'.format(bounds.itemsize))).reshape(-1, 4)
+        b = b.astype(numpy.float64)
+        scale = numpy.array([w, h])
+        x1y1, x2y2 = b[:, 0:2], b[:, 2:4]
+        self.pos = _to_array((x1y1 + x2y2) / 2.0 / scale)
+        self.size = _to_array(numpy.abs(x2y2 - x1y1) / scale)
+        self.bounds = _to_array(b / numpy.array([w, h, w, h]))
+
+    def _compute_array(self, bounds, w, h):
+        x1, y1, x2, y2 = bounds[0::4], bounds[1::4], bounds[2::4], bounds[3::4]
+        pos = array('d', [0.0]) * (2 * len(x1))
+        pos[0::2] = array('d', [(a + b) / 2.0 / w for a, b in zip(x1, x2)])
+        pos[1::2] = array('d', [(a + b) / 2.0 / h for a, b in zip(y1, y2)])
+        size = array('d', [0.0]) * (2 * len(x1))
+        size[0::2] = array('d', [abs(b - a) / w for a, b in zip(x1, x2)])
+        size[1::2] = array('d', [abs(b - a) / h for a, b in zip(y1, y2)])
+        self.pos = pos
+        self.size = size
+        self.bounds = array('d', [v / (w if k % 2 == 0 else h) for k, v in enumerate(bounds)])
+
+
+def _to_array(matrix):
+    column = array('d')
+    column.frombytes(numpy.ascontiguousarray(matrix, dtype=numpy.float64).tobytes())
+    return column
+
+
+class HierarchySnapshot(object):
+    """Compact node store of one hierarchy dump.
+
+    Every per-node column is indexed by node id (pre-order position).
+
+    Attributes:
+        parent, first_child, next_sibling (:obj:`array`): tree links, -1 if none
+        subtree_end (:obj:`array`): the subtree of node ``i`` is the id range ``[i, subtree_end[i])``
+        depth (:obj:`array`): distance from the root
+        bounds (:obj:`array`): pixel bounds, 4 ints per node ``x1, y1, x2, y2``
+        flags (:obj:`array`): boolean attribute bitmask, see ``FLAG_*``
+        drawing_order (:obj:`array`): ``drawing-order`` attribute
+        cls, package, resource_id, text, content_desc (:obj:`array`): index into
+         ``strings``, -1 if the attribute is absent
+        strings (:obj:`list`): interned string table
+        rotation (:obj:`int`): ``rotation`` attribute of the root element, or None
+        screen_size (:obj:`tuple`): (width, height) in pixels used for normalization
+        views (:obj:`list`): per-node slot for the driver's node view, filled lazily
+        indexes (:obj:`dict`): inverted indexes by the driver's attribute name, see :py:func:`build_index`
+    """
+
+    def __init__(self):
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.subtree_end = array('i')
+        self.depth = array('i')
+        self.bounds = array('i')
+        self.flags = array('i')
+        self.drawing_order = array('i')
+        for column, _ in STRING_COLUMNS:
+            setattr(self, column, array('i'))
+        self.strings = []
+        self.rotation = None
+        self.screen_size = (1280, 720)
+        self.views = []
+        self.indexes = {}
+        self._geometry = None
+
+    def __len__(self):
+        return len(self.parent)
+
+    def string(self, column, index, default=None):
+        i = getattr(self, column)[index]
+        return self.strings[i] if i >= 0 else default
+
+    def geometry(self):
+        """Normalized geometry columns for the current ``screen_size``, computed on first use.
+
+        Returns:
+            :py:class:`SnapshotGeometry`: geometry of all nodes
+        """
+
+        geometry = self._geometry
+        if geometry is None or geometry.screen_size != self.screen_size:
+            geometry = self._geometry = SnapshotGeometry(self.bounds, self.screen_size)
+        return geometry
+
+    def children_of(self, index):
+        c = self.first_child[index]
+        next_sibling = self.next_sibling
+        while c >= 0:
+            yield c
+            c = next_sibling[c]
+
+    def in_subtree(self, index, root):
+        return root <= index < self.subtree_end[root]
+
+    @classmethod
+    def empty(cls):
+        return parse_hierarchy('<hierarchy/>')
+
+
+def build_index(values):
+    """Inverted index of one attribute over all nodes of a snapshot.
+
+    Args:
+        values (:obj:`list`): attribute value of every node, by node id
+
+    Returns:
+        :obj:`dict`: value -> :obj:`array` of node ids in document order. Unhashable values are left out.
+    """
+
+    index = {}
+    for i, v in enumerate(values):
+        try:
+            ids = index.get(v)
+        except TypeError:
+            continue
+        if ids is None:
+            ids = index[v] = array('i')
+        ids.append(i)
+    return index
+
+
+def parse_hierarchy(xml_content):
+    """Parse a UIAutomator XML dump into a :py:class:`HierarchySnapshot`.
+
+    Args:
+        xml_content (:obj:`str` or :obj:`bytes`): XML text from ``device.dump_hierarchy()``
+
+    Returns:
+        :py:class:`HierarchySnapshot`: node store, root at index 0
+
+    Raises:
+        ValueError: when the dump is empty or malformed
+    """
+
+    snapshot = HierarchySnapshot()
+    parents = []
+    attribs = []
+    hierarchy_elements = []
+    stack = [-1]
+
+    def start(tag, attrib):
+        index = len(parents)
+        parents.append(stack[-1])
+        stack.append(index)
+        if tag == 'hierarchy':
+            hierarchy_elements.append(index)
+            if index == 0 and 'rotation' in attrib:
+                try:
+                    snapshot.rotation = int(attrib['rotation'])
+                except ValueError:
+                    pass
+            attrib = {}
+        attribs.append(attrib)
+
+    def end(tag):
+        stack.pop()
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.Parse(xml_content, True)
+    except expat.ExpatError as e:
+        raise ValueError('Malformed hierarchy dump: {}'.format(e))
+    n = len(parents)
+    if n == 0:
+        raise ValueError('Empty hierarchy dump')
+
+    # tree links
+    snapshot.parent = array('i', parents)
+    first_child = snapshot.first_child = array('i', [-1]) * n
+    next_sibling = snapshot.next_sibling = array('i', [-1]) * n
+    last_child = [-1] * n
+    for i, p in enumerate(parents):
+        if p >= 0:
+            prev = last_child[p]
+            if prev < 0:
+                first_child[p] = i
+            else:
+                next_sibling[prev] = i
+            last_child[p] = i
+    depth = snapshot.depth = array('i', [0]) * n
+    for i in range(1, n):
+        p = parents[i]
+        if p >= 0:
+            depth[i] = depth[p] + 1
+    subtree_end = snapshot.subtree_end = array('i', range(1, n + 1))
+    for i in range(n - 1, -1, -1):
+        c = last_child[i]
+        if c >= 0:
+            subtree_end[i] = subtree_end[c]
+
+    # attribute columns, converted column by column rather than node by node
+    flags = snapshot.flags = _flags_column(attribs)
+    for i in hierarchy_elements:
+        flags[i] = FLAG_HIERARCHY
+    snapshot.bounds = _bounds_column([a.get('bounds') for a in attribs])
+    snapshot.drawing_order = _int_column([a.get('drawing-order') for a in attribs])
+
+    values = [[a.get(key) for a in attribs] for _, key in STRING_COLUMNS]
+    unique = dict.fromkeys(chain.from_iterable(values))
+    unique.pop(None, None)
+    strings = snapshot.strings = list(unique)
+    interned = {v: i for i, v in enumerate(strings)}
+    interned[None] = -1
+    for (column, _), column_values in zip(STRING_COLUMNS, values):
+        setattr(snapshot, column, array('i', map(interned.__getitem__, column_values)))
+
+    snapshot.views = [None] * n
+    return snapshot
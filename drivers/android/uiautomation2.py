@@ -12,9 +12,12 @@ Goals:
   avoiding visibility-based filtering and intrusive screen operations.
 """
 
+import copy
+import threading
 import time
+from bisect import bisect_left
 import warnings
-import xml.etree.ElementTree as ET
+from collections import OrderedDict
 import sys as _sys
 import glob as _glob
 import os as _os
@@ -189,7 +192,16 @@ from poco.sdk.interfaces.screen import ScreenInterface
 from poco.sdk.AbstractNode import AbstractNode
 from poco.sdk.AbstractDumper import AbstractDumper
 from poco.sdk.Attributor import Attributor
+from poco.sdk.Selector import Selector
+from poco.sdk.exceptions import NoSuchTargetException
 from poco.utils import six
+from poco.drivers.android.snapshot import HierarchySnapshot, parse_hierarchy, build_index, FLAG_HIERARCHY, \
+    FLAG_VISIBLE, FLAG_ENABLED, FLAG_CLICKABLE, FLAG_FOCUSABLE, FLAG_FOCUSED, FLAG_SCROLLABLE, FLAG_SELECTED, \
+    FLAG_CHECKABLE, FLAG_CHECKED, FLAG_LONG_CLICKABLE
+from poco.drivers.android.singleflight import SingleFlightDevice
+from poco.drivers.android.framesource import LatestFrameSource, screenshot_capture, screencap_capture
+from poco.drivers.android.motion import compile_motion_events, play_motion_calls, AirtestMultiTouch
+from poco.drivers.android.ime import FastInputSession
 
 __all__ = [
     'AndroidUiautomator2Poco',
@@ -197,187 +209,274 @@ __all__ = [
     # exported for tests/mocks
     'UIAutomator2Node',
     'UIAutomator2Dumper',
+    'UIAutomator2Selector',
+    'UIAutomator2ScreenGeometry',
+    'UIAutomator2Prefetcher',
 ]
 
 
+def _flag_getter(bit):
+    return lambda s, i: bool(s.flags[i] & bit)
+
+
+def _string_getter(column, default):
+    def get(s, i):
+        k = getattr(s, column)[i]
+        return s.strings[k] if k >= 0 else default
+    return get
+
+
+def _name(s, i):
+    k = s.text[i]
+    txt = s.strings[k].strip() if k >= 0 else ''
+    if txt:
+        return txt
+    k = s.cls[i]
+    return s.strings[k] if k >= 0 else '<Unknown>'
+
+
+def _pos(s, i):
+    pos = s.geometry().pos
+    j = i * 2
+    return [pos[j], pos[j + 1]]
+
+
+def _size(s, i):
+    size = s.geometry().size
+    j = i * 2
+    return [size[j], size[j + 1]]
+
+
+def _bounds(s, i):
+    bounds = s.geometry().bounds
+    j = i * 4
+    return [bounds[j], bounds[j + 1], bounds[j + 2], bounds[j + 3]]
+
+
+def _editable(s, i):
+    k = s.cls[i]
+    return k >= 0 and 'EditText' in s.strings[k]
+
+
+def _z_orders(s, i):
+    order = s.drawing_order[i]
+    return {'local': order, 'global': order}
+
+
+# Poco attribute name -> getter(snapshot, index), in dump payload order
+_ATTRIBUTE_GETTERS = OrderedDict([
+    ('name', _name),
+    ('type', _string_getter('cls', 'Unknown')),
+    ('visible', _flag_getter(FLAG_VISIBLE)),
+    ('pos', _pos),
+    ('size', _size),
+    ('scale', lambda s, i: [1.0, 1.0]),
+    ('anchorPoint', lambda s, i: [0.5, 0.5]),
+    ('zOrders', _z_orders),
+    ('text', _string_getter('text', '')),
+    ('resourceId', _string_getter('resource_id', '')),
+    # Critical: preserve package attribute from XML
+    ('package', _string_getter('package', '')),
+    ('contentDesc', _string_getter('content_desc', '')),
+    ('class_name', _string_getter('cls', '')),
+    ('clickable', _flag_getter(FLAG_CLICKABLE)),
+    ('touchable', _flag_getter(FLAG_CLICKABLE)),
+    ('focusable', _flag_getter(FLAG_FOCUSABLE)),
+    ('focused', _flag_getter(FLAG_FOCUSED)),
+    ('scrollable', _flag_getter(FLAG_SCROLLABLE)),
+    ('selected', _flag_getter(FLAG_SELECTED)),
+    ('checkable', _flag_getter(FLAG_CHECKABLE)),
+    ('checked', _flag_getter(FLAG_CHECKED)),
+    ('longClickable', _flag_getter(FLAG_LONG_CLICKABLE)),
+    ('editable', _editable),
+    ('dismissable', lambda s, i: False),
+    ('bounds', _bounds),
+    ('boundsInParent', _size),
+    ('enabled', _flag_getter(FLAG_ENABLED)),
+])
+
+# defaults of the <hierarchy> element, which has no node attributes
+_HIERARCHY_ATTRIBUTES = {
+    'name': '<Unknown>',
+    'type': 'Unknown',
+    'visible': True,
+    'enabled': False,
+    'pos': [0.0, 0.0],
+    'size': [0.0, 0.0],
+    'bounds': [],
+    'text': '',
+    'resourceId': '',
+    'package': '',
+    'clickable': False,
+    'touchable': False,
+    'focusable': False,
+    'focused': False,
+    'scrollable': False,
+    'selected': False,
+    'checkable': False,
+    'checked': False,
+    'longClickable': False,
+    'editable': False,
+    'dismissable': False,
+    'scale': [1.0, 1.0],
+    'anchorPoint': [0.5, 0.5],
+    'zOrders': {'local': 0, 'global': 0},
+    'boundsInParent': [],
+}
+
+
+# attributes served from a per-snapshot inverted index for ``attr=`` predicates
+_INDEXED_ATTRIBUTES = frozenset(['name', 'type', 'text', 'resourceId', 'package', 'contentDesc', 'class_name'])
+
+
+def _attribute_index(snapshot, attrName):
+    index = snapshot.indexes.get(attrName)
+    if index is None:
+        get = _ATTRIBUTE_GETTERS[attrName]
+        default = _HIERARCHY_ATTRIBUTES.get(attrName)
+        flags = snapshot.flags
+        values = [default if flags[i] & FLAG_HIERARCHY else get(snapshot, i) for i in range(len(snapshot))]
+        index = snapshot.indexes[attrName] = build_index(values)
+    return index
+
+
 class UIAutomator2Node(AbstractNode):
     """UIAutomator2 node wrapper compatible with Poco v1 attributes.
 
     This maps standard UIAutomator XML attributes (class, resource-id, package,
     text, content-desc, bounds, etc.) to Poco's expected attribute names and
     normalized coordinate system.
+
+    A node is a ``__slots__`` view of one entry in a :py:class:`HierarchySnapshot
+    <poco.drivers.android.snapshot.HierarchySnapshot>` and owns no data itself.
+    Use :py:meth:`of` to get the view, which is cached in the snapshot so the
+    same entry is always the same object.
     """
 
-    def __init__(self, xml_element, screen_size=(1280, 720)):
-        super(UIAutomator2Node, self).__init__()
-        self.xml_element = xml_element
-        self.screen_width, self.screen_height = screen_size
-        self._parent = None
-        self._children = None
+    __slots__ = ('snapshot', 'index')
 
-    def getParent(self):  # pragma: no cover - simple getter
-        return self._parent
+    def __init__(self, snapshot, index=0):
+        self.snapshot = snapshot
+        self.index = index
+
+    @classmethod
+    def of(cls, snapshot, index):
+        views = snapshot.views
+        node = views[index]
+        if node is None:
+            node = views[index] = cls(snapshot, index)
+        return node
 
-    def setParent(self, parent):  # pragma: no cover - simple setter
-        self._parent = parent
+    def getParent(self):
+        parent = self.snapshot.parent[self.index]
+        return self.of(self.snapshot, parent) if parent >= 0 else None
 
     def getChildren(self):
-        if self._children is None:
-            self._children = []
-            for child_elem in self.xml_element:
-                child_node = UIAutomator2Node(child_elem, (self.screen_width, self.screen_height))
-                child_node.setParent(self)
-                self._children.append(child_node)
-        return self._children
-
-    def _parse_bounds(self):
-        # Root hierarchy case: no bounds
-        if self.xml_element.tag == 'hierarchy':
-            return 0, 0, 0, 0
-
-        bounds_str = self.xml_element.attrib.get('bounds', '[0,0][0,0]')
-        try:
-            bounds_str = bounds_str.replace('[', '').replace(']', ',')
-            coords = [int(x) for x in bounds_str.split(',') if x]
-            if len(coords) >= 4:
-                return coords[0], coords[1], coords[2], coords[3]  # x1, y1, x2, y2
-        except Exception:
-            pass
-        return 0, 0, 0, 0
-
-    def _get_normalized_pos(self):
-        if self.xml_element.tag == 'hierarchy':
-            return [0.0, 0.0]
-        x1, y1, x2, y2 = self._parse_bounds()
-        cx = (x1 + x2) / 2.0
-        cy = (y1 + y2) / 2.0
-        return [cx / float(self.screen_width), cy / float(self.screen_height)]
-
-    def _get_normalized_size(self):
-        if self.xml_element.tag == 'hierarchy':
-            return [0.0, 0.0]
-        x1, y1, x2, y2 = self._parse_bounds()
-        w = abs(x2 - x1)
-        h = abs(y2 - y1)
-        return [w / float(self.screen_width), h / float(self.screen_height)]
-
-    def _get_bounds_array(self):
-        if self.xml_element.tag == 'hierarchy':
-            return []
-        x1, y1, x2, y2 = self._parse_bounds()
-        return [
-            x1 / float(self.screen_width),
-            y1 / float(self.screen_height),
-            x2 / float(self.screen_width),
-            y2 / float(self.screen_height),
-        ]
+        snapshot = self.snapshot
+        return [self.of(snapshot, c) for c in snapshot.children_of(self.index)]
 
     def getAttr(self, attrName):
-        attrib = self.xml_element.attrib
-
-        # Handle hierarchy root defaults
-        if self.xml_element.tag == 'hierarchy':
-            defaults = {
-                'name': '<Unknown>',
-                'type': 'Unknown',
-                'visible': True,
-                'enabled': False,
-                'pos': [0.0, 0.0],
-                'size': [0.0, 0.0],
-                'bounds': [],
-                'text': '',
-                'resourceId': '',
-                'package': '',
-                'clickable': False,
-                'touchable': False,
-                'focusable': False,
-                'focused': False,
-                'scrollable': False,
-                'selected': False,
-                'checkable': False,
-                'checked': False,
-                'longClickable': False,
-                'editable': False,
-                'dismissable': False,
-                'scale': [1.0, 1.0],
-                'anchorPoint': [0.5, 0.5],
-                'zOrders': {'local': 0, 'global': 0},
-                'boundsInParent': [],
-            }
-            return defaults.get(attrName, None)
-
-        if attrName == 'name':
-            txt = attrib.get('text', '').strip()
-            return txt if txt else attrib.get('class', '<Unknown>')
-        if attrName == 'type':
-            return attrib.get('class', 'Unknown')
-        if attrName == 'class_name':
-            return attrib.get('class', '')
-        if attrName == 'visible':
-            return attrib.get('visible-to-user', 'true').lower() == 'true'
-        if attrName == 'enabled':
-            return attrib.get('enabled', 'true').lower() == 'true'
-        if attrName == 'pos':
-            return self._get_normalized_pos()
-        if attrName == 'size':
-            return self._get_normalized_size()
-        if attrName == 'bounds':
-            return self._get_bounds_array()
-        if attrName == 'text':
-            return attrib.get('text', '')
-        if attrName == 'resourceId':
-            return attrib.get('resource-id', '')
-        if attrName == 'package':
-            # Critical: preserve package attribute from XML
-            return attrib.get('package', '')
-        if attrName == 'contentDesc':
-            return attrib.get('content-desc', '')
-        if attrName == 'clickable':
-            return attrib.get('clickable', 'false').lower() == 'true'
-        if attrName == 'touchable':
-            return attrib.get('clickable', 'false').lower() == 'true'
-        if attrName == 'focusable':
-            return attrib.get('focusable', 'false').lower() == 'true'
-        if attrName == 'focused':
-            return attrib.get('focused', 'false').lower() == 'true'
-        if attrName == 'scrollable':
-            return attrib.get('scrollable', 'false').lower() == 'true'
-        if attrName == 'selected':
-            return attrib.get('selected', 'false').lower() == 'true'
-        if attrName == 'checkable':
-            return attrib.get('checkable', 'false').lower() == 'true'
-        if attrName == 'checked':
-            return attrib.get('checked', 'false').lower() == 'true'
-        if attrName == 'longClickable':
-            return attrib.get('long-clickable', 'false').lower() == 'true'
-        if attrName == 'editable':
-            return 'EditText' in attrib.get('class', '')
-        if attrName == 'dismissable':
-            return False
-        if attrName == 'scale':
-            return [1.0, 1.0]
-        if attrName == 'anchorPoint':
-            return [0.5, 0.5]
-        if attrName == 'zOrders':
-            try:
-                order = int(attrib.get('drawing-order', '0'))
-            except Exception:
-                order = 0
-            return {'local': order, 'global': order}
-        if attrName == 'boundsInParent':
-            return self._get_normalized_size()
-
+        snapshot = self.snapshot
+        if snapshot.flags[self.index] & FLAG_HIERARCHY:
+            return copy.deepcopy(_HIERARCHY_ATTRIBUTES.get(attrName))
+        getter = _ATTRIBUTE_GETTERS.get(attrName)
+        if getter is not None:
+            return getter(snapshot, self.index)
         return super(UIAutomator2Node, self).getAttr(attrName)
 
+    def getAttrs(self, attrNames):
+        # hierarchy flag and getters looked up once for the whole list
+        snapshot, index = self.snapshot, self.index
+        if snapshot.flags[index] & FLAG_HIERARCHY:
+            return [copy.deepcopy(_HIERARCHY_ATTRIBUTES.get(name)) for name in attrNames]
+        getters = _ATTRIBUTE_GETTERS
+        return [getters[name](snapshot, index) if name in getters else self.getAttr(name) for name in attrNames]
+
     def getAvailableAttributeNames(self):
-        base = list(super(UIAutomator2Node, self).getAvailableAttributeNames())
-        android_attrs = [
-            'text', 'resourceId', 'package', 'contentDesc', 'class_name',
-            'clickable', 'touchable', 'focusable', 'focused', 'scrollable',
-            'selected', 'checkable', 'checked', 'longClickable', 'editable',
-            'dismissable', 'bounds', 'boundsInParent', 'enabled',
-        ]
-        return base + android_attrs
+        return list(_ATTRIBUTE_GETTERS.keys())
+
+
+class UIAutomator2ScreenGeometry(object):
+    """Screen size cache shared by the dumper, input and screen of one device.
+
+    ``device.window_size()`` costs an HTTP ``/info`` request and two ``dumpsys display``
+    shell calls, so it is fetched once and then only kept in step with the display
+    rotation. The rotation is observed from data fetched anyway (the ``rotation``
+    attribute of every hierarchy dump root); if nothing was observed for
+    ``rotation_check_interval`` seconds, ``displayRotation`` is read from
+    ``device.info`` (one request) on the next size lookup. ``window_size()`` is the
+    physical display size oriented by rotation, so a rotation change only swaps
+    width and height and needs no round trip.
+    """
+
+    def __init__(self, device, rotation_check_interval=3.0):
+        super(UIAutomator2ScreenGeometry, self).__init__()
+        self.device = device
+        self.rotation_check_interval = rotation_check_interval
+        self._size = None
+        self._rotation = None
+        self._rotation_observed_at = 0
+        self.size_queries = 0
+        self.rotation_queries = 0
+
+    def _query_rotation(self):
+        self.rotation_queries += 1
+        try:
+            info = self.device.info or {}
+            rotation = info.get('displayRotation')
+            return int(rotation) if rotation is not None else None
+        except Exception:
+            return None
+
+    def _query_size(self):
+        self.size_queries += 1
+        # Use window_size as authoritative basis (matches Javacap/screenshot & IDE overlay)
+        try:
+            ws = self.device.window_size()  # (width, height)
+            return int(ws[0]), int(ws[1])
+        except Exception:
+            info = getattr(self.device, 'info', {}) or {}
+            return int(info.get('displayWidth', 1280)), int(info.get('displayHeight', 720))
+
+    def observe_rotation(self, rotation):
+        """Record a display rotation (0-3) that came along with other device data.
+
+        Args:
+            rotation (:obj:`int`): current rotation, or None if unknown (ignored)
+        """
+
+        if rotation is None:
+            return
+        self._rotation_observed_at = time.time()
+        previous, self._rotation = self._rotation, rotation
+        if self._size is not None and previous is not None and (previous - rotation) % 2:
+            w, h = self._size
+            self._size = (h, w)
+
+    def get_size(self):
+        """Current screen size in pixels.
+
+        Returns:
+            :obj:`tuple`: (width, height)
+        """
+
+        if self._size is None:
+            # rotation first, so that the size is known to be in the orientation recorded. A dump has usually just
+            # reported it (observe_rotation), then it is not asked again
+            if self._rotation is None:
+                self.observe_rotation(self._query_rotation())
+            self._size = self._query_size()
+        elif time.time() - self._rotation_observed_at > self.rotation_check_interval:
+            rotation = self._query_rotation()
+            if rotation is None:
+                # rotation is not reported by this device, do not ask again too soon
+                self._rotation_observed_at = time.time()
+            self.observe_rotation(rotation)
+        return self._size
+
+    def invalidate(self):
+        self._size = None
+        self._rotation = None
 
 
 class UIAutomator2Dumper(AbstractDumper):
@@ -387,78 +486,324 @@ class UIAutomator2Dumper(AbstractDumper):
     - Uses device.dump_hierarchy() (non-intrusive; avoids screen shrink side-effects)
     - Bypasses visibility-only filtering to keep nodes present in dynamic/video UIs
     - Preserves all XML attributes, especially 'package'
+
+    Snapshot freshness: :py:meth:`getRoot` reuses the last snapshot while it is younger
+    than ``max_age`` seconds (``None`` keeps it until invalidated, ``0`` dumps on every
+    call), and the input invalidates it after each action when ``invalidate_on_action``
+    is set. While pinned (:py:meth:`pin`), the snapshot is kept regardless of age and
+    actions. ``dumps_performed`` and ``dumps_avoided`` count device dumps and reuses.
+
+    A dump byte-identical to the previous one is not parsed: the previous snapshot is
+    kept (``snapshots_reused``) with its node views, indexes and geometry. Dumps are not
+    hashed or compared otherwise.
     """
 
-    def __init__(self, device):
+    def __init__(self, device, geometry=None, max_age=None, invalidate_on_action=True):
         super(UIAutomator2Dumper, self).__init__()
         self.device = device
+        self.geometry = geometry or UIAutomator2ScreenGeometry(device)
+        # drops requests in flight from the coalescing layer (SingleFlightDevice), plain devices have none
+        self._expire_requests = getattr(device, 'expire', None) or (lambda: None)
+        self.max_age = max_age
+        self.invalidate_on_action = invalidate_on_action
+        self.prefetching = False
+        self.dumps_performed = 0
+        self.dumps_avoided = 0
+        self.snapshots_reused = 0
         self._root_node = None
-        self._screen_size = (1280, 720)
-
-    def _update_hierarchy(self):
+        self._snapshot_time = 0
+        self._invalidated_at = 0
+        self._pinned = 0
+        self._snapshot = None
+        self._last_dump = None
+        # guards the published state below, never held while talking to the device
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+
+    def _fetch(self):
+        # dump and parse without touching the published state
+        # age is counted from the dump request, the UI may change while it is in flight
+        request_time = time.time()
+        # Get XML hierarchy with full details (avoid compressed trees hiding overlay controls)
         try:
-            # Use window_size as authoritative basis (matches Javacap/screenshot & IDE overlay)
+            xml_content = self.device.dump_hierarchy(compressed=False)
+        except TypeError:
             try:
-                ws = self.device.window_size()  # (width, height)
-                screen_size = (int(ws[0]), int(ws[1]))
+                xml_content = self.device.dump_hierarchy(False)
             except Exception:
-                info = getattr(self.device, 'info', {}) or {}
-                screen_size = (
-                    int(info.get('displayWidth', 1280)),
-                    int(info.get('displayHeight', 720)),
-                )
-            self._screen_size = screen_size
-
-            # Get XML hierarchy with full details (avoid compressed trees hiding overlay controls)
-            try:
-                xml_content = self.device.dump_hierarchy(compressed=False)
-            except TypeError:
-                try:
-                    xml_content = self.device.dump_hierarchy(False)
-                except Exception:
-                    xml_content = self.device.dump_hierarchy()
-            root_element = ET.fromstring(xml_content)
-            self._root_node = UIAutomator2Node(root_element, screen_size)
+                xml_content = self.device.dump_hierarchy()
+        previous, last_dump = self._snapshot, self._last_dump
+        if previous is not None and xml_content == last_dump:
+            # nothing changed, keep the previous snapshot with its views, indexes and caches
+            snapshot = previous
+        else:
+            # Single streaming pass from dump text to node store (no ElementTree)
+            snapshot = parse_hierarchy(xml_content)
+        # the dump root carries the display rotation, so rotation changes are noticed for free
+        self.geometry.observe_rotation(snapshot.rotation)
+        snapshot.screen_size = self.geometry.get_size()
+        return request_time, xml_content, snapshot, snapshot is previous
+
+    def _publish(self, request_time, xml_content, snapshot, reused, wanted=False):
+        # wanted: a caller is waiting for this snapshot, publish it as root even if an action happened meanwhile or
+        # the snapshot is pinned (the pinned root was dropped on purpose, e.g. by invalidate_cache).
+        # Returns the root the caller is to read, None if the snapshot was not published
+        with self._lock:
+            self.dumps_performed += 1
+            if reused:
+                self.snapshots_reused += 1
+            if request_time < self._snapshot_time and self._root_node is not None:
+                # a dump requested later has been published meanwhile
+                return self._root_node
+            self._snapshot = snapshot
+            self._last_dump = xml_content
+            if wanted or (request_time >= self._invalidated_at and not self._pinned):
+                self._root_node = UIAutomator2Node.of(snapshot, 0)
+                self._snapshot_time = request_time
+                self._published.notify_all()
+                return self._root_node
+            return None
+
+    def _update_hierarchy(self):
+        # returns the root published for this call, which later invalidations from other threads do not take away
+        try:
+            return self._publish(*self._fetch(), wanted=True)
         except Exception as e:
             warnings.warn('Failed to update hierarchy: {}'.format(e))
-            self._screen_size = (1280, 720)
-            self._root_node = UIAutomator2Node(ET.Element('hierarchy'), self._screen_size)
+            snapshot = HierarchySnapshot.empty()
+            snapshot.screen_size = (1280, 720)
+            with self._lock:
+                self.dumps_performed += 1
+                self._snapshot = self._last_dump = None
+                self._root_node = UIAutomator2Node.of(snapshot, 0)
+                self._snapshot_time = time.time()
+                return self._root_node
+
+    def prefetch(self):
+        """Dump and publish a new snapshot, called from a background thread by
+        :py:class:`UIAutomator2Prefetcher`. Selections keep reading the previous snapshot until the new one is
+        complete."""
+
+        if self._pinned:
+            return
+        try:
+            self._publish(*self._fetch())
+        except Exception as e:
+            warnings.warn('Failed to prefetch hierarchy: {}'.format(e))
+
+    def wait_for_change(self, timeout):
+        """Block until a different snapshot than the current one is published, or until timeout.
+
+        Args:
+            timeout (:obj:`float`): max seconds to wait
+
+        Returns:
+            bool: True if a different snapshot was published
+        """
+
+        deadline = time.time() + timeout
+        with self._published:
+            current = self._root_node
+            while self._root_node is current:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._published.wait(remaining)
+            return True
 
     def getRoot(self):
-        if self._root_node is None:
-            self._update_hierarchy()
-        return self._root_node
+        with self._lock:
+            root = self._root_node
+            # while prefetching, the newest published snapshot is as fresh as a blocking dump would be
+            if root is not None and (self._pinned or self.prefetching or self.max_age is None or
+                                     time.time() - self._snapshot_time <= self.max_age):
+                self.dumps_avoided += 1
+                return root
+        return self._update_hierarchy()
 
     def dumpHierarchy(self, onlyVisibleNode=True):  # noqa: N802
         # Always bypass visibility-only filtering to better capture playback overlays
-        self._root_node = None  # force refresh
+        if not self._pinned:
+            self.invalidate_cache()  # force refresh
         return super(UIAutomator2Dumper, self).dumpHierarchy(False)
 
+    def dumpHierarchyImpl(self, node, onlyVisibleNode=True):  # noqa: N802
+        # Same output as AbstractDumper.dumpHierarchyImpl, but reads the snapshot
+        # columns directly instead of going through per-node views
+        if not node:
+            return None
+        snapshot = node.snapshot
+        flags = snapshot.flags
+        getters = list(_ATTRIBUTE_GETTERS.items())
+
+        def dump(i):
+            if flags[i] & FLAG_HIERARCHY:
+                payload = {}
+                for attrName, attrVal in UIAutomator2Node.of(snapshot, i).enumerateAttrs():
+                    if attrVal is not None:
+                        payload[attrName] = attrVal
+            else:
+                payload = {name: get(snapshot, i) for name, get in getters}
+            result = {}
+            children = [dump(c) for c in snapshot.children_of(i)
+                        if not onlyVisibleNode or flags[c] & (FLAG_VISIBLE | FLAG_HIERARCHY)]
+            if children:
+                result['children'] = children
+            result['name'] = payload.get('name')
+            result['payload'] = payload
+            return result
+
+        return dump(node.index)
+
+    @property
+    def invalidated_at(self):
+        """Time of the last :py:meth:`invalidate_cache` (after an action, for instance), 0 if never. Data captured
+        before it may not show the current UI."""
+
+        return self._invalidated_at
+
     def invalidate_cache(self):  # pragma: no cover - simple cache control
-        self._root_node = None
+        with self._lock:
+            self._root_node = None
+            # snapshots requested before now are not to be published any more
+            self._invalidated_at = time.time()
+        # nor shared with callers through the coalescing layer
+        self._expire_requests()
+
+    def on_action(self):
+        # called by the input after every action, the UI is about to change
+        if self.invalidate_on_action and not self._pinned:
+            self.invalidate_cache()
+
+    def on_poll(self):
+        # called between two polls of a wait. Adaptive polls may come sooner than max_age, the next poll must
+        # still see a fresh dump
+        if not self._pinned:
+            self.invalidate_cache()
+
+    def fingerprint(self):
+        """Hash of the text of a fresh hierarchy dump. Equal fingerprints mean an unchanged UI.
+
+        The hash is Python's ``hash()`` of the dump, salted per process for strings (``PYTHONHASHSEED``), so
+        fingerprints are only comparable within one process and must not be stored or sent elsewhere.
+
+        Returns:
+            int: the fingerprint, None when the dump failed or the snapshot is pinned (it never changes while pinned,
+            and would pass for a still UI)
+        """
+
+        if self._pinned:
+            return None
+        self.on_poll()
+        self.getRoot()
+        with self._lock:
+            dump = self._last_dump
+        if dump is None:
+            return None
+        return hash(dump)
+
+    def pin(self):
+        """Keep the current snapshot (dumped now if there is none) until :py:meth:`unpin`. Pins nest."""
+
+        self.getRoot()
+        self._pinned += 1
+
+    def unpin(self):
+        if self._pinned > 0:
+            self._pinned -= 1
+
+    def get_snapshot_stats(self):
+        return {
+            'dumps_performed': self.dumps_performed,
+            'dumps_avoided': self.dumps_avoided,
+            'snapshots_reused': self.snapshots_reused,
+        }
 
     def get_screen_size(self):
-        # Ensure updated at least once
-        if self._root_node is None:
-            try:
-                self._update_hierarchy()
-            except Exception:
-                pass
-        return self._screen_size
+        return self.geometry.get_size()
+
+
+class UIAutomator2Prefetcher(object):
+    """Background thread that keeps dumping the hierarchy while someone is waiting for the UI.
+
+    Each completed snapshot is published by the dumper in one swap, so selections always read the latest complete
+    tree and never wait for a dump in flight. The thread is started by :py:meth:`keep_alive` (called on every polling
+    sleep of a wait, which then ends as soon as a changed snapshot is published) and exits on its own after
+    ``idle_timeout`` seconds without a call, leaving the device alone when nothing is waiting.
+    """
+
+    def __init__(self, dumper, interval=0.2, idle_timeout=3.0):
+        super(UIAutomator2Prefetcher, self).__init__()
+        self.dumper = dumper
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._last_active = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def keep_alive(self):
+        with self._lock:
+            self._last_active = time.time()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='poco-uiautomator2-prefetcher')
+                self._thread.daemon = True
+                self.dumper.prefetching = True
+                self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if time.time() - self._last_active > self.idle_timeout:
+                    self.dumper.prefetching = False
+                    self._thread = None
+                    return
+            self.dumper.prefetch()
+            time.sleep(self.interval)
 
 
 class UIAutomator2Attributor(Attributor):
-    def __init__(self, device):
+    def __init__(self, device, geometry=None, ime=None):
         super(UIAutomator2Attributor, self).__init__()
         self.device = device
+        self.geometry = geometry or UIAutomator2ScreenGeometry(device)
+        # texts typed by coordinates share one fast IME switch, see FastInputSession
+        self.ime = ime or FastInputSession(device)
 
     def getAttr(self, node, attrName):  # noqa: N802
+        if type(node) in (list, tuple):
+            node = node[0]
         if isinstance(node, UIAutomator2Node):
             return node.getAttr(attrName)
         return None
 
+    def getAttrs(self, node, attrNames):  # noqa: N802
+        if type(node) in (list, tuple):
+            node = node[0]
+        if isinstance(node, UIAutomator2Node):
+            return node.getAttrs(attrNames)
+        return [None] * len(attrNames)
+
+    def batchGetAttrs(self, nodes, attrNames):  # noqa: N802
+        # getters resolved once for all nodes, hierarchy elements and unknown names go through getAttrs
+        getters = [_ATTRIBUTE_GETTERS.get(name) for name in attrNames]
+        if None in getters:
+            return [self.getAttrs(node, attrNames) for node in nodes]
+        rows = []
+        for node in nodes:
+            if isinstance(node, UIAutomator2Node) and not node.snapshot.flags[node.index] & FLAG_HIERARCHY:
+                snapshot, index = node.snapshot, node.index
+                rows.append([get(snapshot, index) for get in getters])
+            else:
+                rows.append(self.getAttrs(node, attrNames))
+        return rows
+
     def setAttr(self, node, attrName, attrVal):  # noqa: N802
         # Minimal implementation; UIAutomator2 direct attribute setting is limited
+        if type(node) in (list, tuple):
+            node = node[0]
         if not isinstance(node, UIAutomator2Node):
             return False
 
@@ -473,46 +818,49 @@ class UIAutomator2Attributor(Attributor):
                 if pos:
                     x, y = pos
                     # convert normalized to pixels
-                    info = self.device.info
-                    px = int(x * info.get('displayWidth', 1280))
-                    py = int(y * info.get('displayHeight', 720))
-                    self.device.click(px, py)
-                    # use set_text after focus
-                    self.device.set_fastinput_ime(True)
-                    self.device.send_keys(attrVal)
-                    self.device.set_fastinput_ime(False)
+                    w, h = self.geometry.get_size()
+                    self.device.click(int(x * w), int(y * h))
+                    # type after focus, the fast IME stays active for the next fields
+                    self.ime.send_keys(attrVal)
                     return True
             except Exception as e:
                 warnings.warn('setAttr(text) failed: {}'.format(e))
         return False
 
 
+def _action(method):
+    # input actions change the UI, let the dumper drop its snapshot afterwards
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            on_action = getattr(self.dumper, 'on_action', None)
+            if on_action is not None:
+                on_action()
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
 class UIAutomator2Input(InputInterface):
-    def __init__(self, device, dumper=None):
+    def __init__(self, device, dumper=None, multitouch=None):
         super(UIAutomator2Input, self).__init__()
         self.device = device
         self.dumper = dumper
+        # backend for motion events with several contacts at once, see poco.drivers.android.motion
+        self.multitouch = multitouch
+        self.geometry = getattr(dumper, 'geometry', None) or UIAutomator2ScreenGeometry(device)
         self.default_touch_down_duration = 0.01
-        self._cached_screen = None
 
     def _screen_info(self):
-        if self._cached_screen is None:
-            if self.dumper is not None and hasattr(self.dumper, 'get_screen_size'):
-                w, h = self.dumper.get_screen_size()
-            else:
-                try:
-                    ws = self.device.window_size()
-                    w, h = int(ws[0]), int(ws[1])
-                except Exception:
-                    info = self.device.info
-                    w, h = info.get('displayWidth', 1280), info.get('displayHeight', 720)
-            self._cached_screen = {'width': w, 'height': h}
-        return self._cached_screen
+        w, h = self.geometry.get_size()
+        return {'width': w, 'height': h}
 
     def _to_px(self, x, y):
         s = self._screen_info()
         return int(x * s['width']), int(y * s['height'])
 
+    @_action
     def click(self, x, y):
         px, py = self._to_px(x, y)
         self.device.click(px, py)
@@ -520,6 +868,7 @@ class UIAutomator2Input(InputInterface):
     def right_click(self, x, y):  # compatibility; simulate long click
         self.long_click(x, y, 0.5)
 
+    @_action
     def double_click(self, x, y):
         px, py = self._to_px(x, y)
         try:
@@ -530,6 +879,7 @@ class UIAutomator2Input(InputInterface):
             time.sleep(0.05)
             self.device.click(px, py)
 
+    @_action
     def long_click(self, x, y, duration=2.0):
         px, py = self._to_px(x, y)
         self.device.long_click(px, py, duration)
@@ -538,16 +888,19 @@ class UIAutomator2Input(InputInterface):
     def longClick(self, x, y, duration=2.0):  # noqa: N802
         return self.long_click(x, y, duration)
 
+    @_action
     def swipe(self, x1, y1, x2, y2, duration=0.5):
         x1, y1 = self._to_px(x1, y1)
         x2, y2 = self._to_px(x2, y2)
         self.device.swipe(x1, y1, x2, y2, duration)
 
+    @_action
     def drag(self, x1, y1, x2, y2, duration=2.0):
         x1, y1 = self._to_px(x1, y1)
         x2, y2 = self._to_px(x2, y2)
         self.device.drag(x1, y1, x2, y2, duration)
 
+    @_action
     def keyevent(self, keyname):
         mapping = {
             'HOME': 'home', 'BACK': 'back', 'MENU': 'menu', 'ENTER': 'enter',
@@ -561,54 +914,318 @@ class UIAutomator2Input(InputInterface):
     def getTouchDownDuration(self):  # noqa: N802
         return self.default_touch_down_duration
 
+    @_action
     def applyMotionEvents(self, events):  # noqa: N802
-        warnings.warn('applyMotionEvents has limited support in UIAutomator2')
-        for e in events:
-            if not e:
-                continue
-            t = e[0]
-            if t == 'd':
-                pos = e[1]
-                px, py = self._to_px(pos[0], pos[1])
-                self.device.click(px, py)
-            elif t == 's':
-                time.sleep(e[1])
+        """Compiled into as few device calls as possible, see :py:mod:`poco.drivers.android.motion`. Several
+        contacts at once need the multi-touch backend, except for straight two-pointer gestures such as pinches.
+
+        Raises:
+            InvalidOperationException: on a gesture with several contacts that cannot be injected
+        """
+
+        w, h = self.geometry.get_size()
+
+        def to_px(x, y):
+            # uiautomator2 takes coordinates below 1 as ratios, keep pixels at 1 or more
+            return min(max(int(x * w), 1), w - 1), min(max(int(y * h), 1), h - 1)
+
+        calls = compile_motion_events(events, to_px, self.multitouch is not None)
+        play_motion_calls(self.device, calls, self.multitouch)
 
 
 class UIAutomator2Screen(ScreenInterface):
-    def __init__(self, device, dumper=None):
+    """Screen capture through uiautomator2.
+
+    The screenshot is fetched as the encoded bytes sent by the device and passed through untouched when no resize is
+    needed. A resize decodes JPEG in draft mode (DCT scaling straight to the nearest larger 1/2, 1/4 or 1/8 size)
+    and finishes with a box filter (bilinear when scaling up), then re-encodes JPEG q80.
+
+    Args:
+        device: uiautomator2 device
+        dumper (:py:class:`UIAutomator2Dumper`): shares its screen geometry
+        raw_output (:obj:`bool`): :py:meth:`getScreen` returns the image bytes instead of base64 text by default
+        frame_source (:py:class:`LatestFrameSource <poco.drivers.android.framesource.LatestFrameSource>`): serve
+         screenshots from a continuously captured stream. A frame is only used if its capture started after the
+         dumper was last invalidated (i.e. after the last input action), otherwise the next one is awaited
+    """
+
+    def __init__(self, device, dumper=None, raw_output=False, frame_source=None):
         super(UIAutomator2Screen, self).__init__()
         self.device = device
         self.dumper = dumper
+        self.geometry = getattr(dumper, 'geometry', None) or UIAutomator2ScreenGeometry(device)
+        self.raw_output = raw_output
+        self.frame_source = frame_source
+
+    def _capture(self):
+        # encoded image bytes as sent by the device, or a PIL image from devices without the raw format
+        try:
+            return self.device.screenshot(format='raw')
+        except (TypeError, ValueError):
+            return self.device.screenshot(format='pillow')
+
+    def getScreen(self, width, raw=None):
+        """See :py:meth:`ScreenInterface.getScreen <poco.sdk.interfaces.screen.ScreenInterface.getScreen>`.
+
+        Args:
+            width (:obj:`int`): expected width in pixels, 0 or None keeps the device resolution
+            raw (:obj:`bool`): return the image bytes instead of base64 text, defaults to ``raw_output``
+
+        Returns:
+            2-:obj:`tuple`: image data and its format (``jpg`` or ``png``), (None, None) on failure
+        """
 
-    def getScreen(self, width):
         try:
             import base64, io
             from PIL import Image
-            im = self.device.screenshot(format='pillow')
-            if width and width > 0:
-                ratio = width / float(im.width)
-                im = im.resize((width, int(im.height * ratio)), Image.LANCZOS)
-            buf = io.BytesIO()
-            im.save(buf, format='JPEG', quality=80)
-            return base64.b64encode(buf.getvalue()).decode('utf-8'), 'jpg'
+            data = None
+            if self.frame_source is not None:
+                invalidated_at = self.dumper.invalidated_at if self.dumper is not None else 0
+                data, _ = self.frame_source.latest(newer_than=invalidated_at)
+            if data is None:
+                data = self._capture()
+            fmt = None
+            if isinstance(data, bytes):
+                im = Image.open(io.BytesIO(data))  # reads the header only
+                fmt = {'JPEG': 'jpg', 'PNG': 'png'}.get(im.format)
+            else:
+                im = data
+            resize = bool(width) and width > 0 and im.width != width
+            if resize or fmt is None:
+                if resize:
+                    size = (width, int(im.height * width / float(im.width)))
+                    if im.format == 'JPEG':
+                        im.draft('RGB', size)
+                    # box (area average) is the cheapest filter without aliasing for a downscale
+                    im = im.resize(size, getattr(Image, 'BOX', Image.BILINEAR) if width < im.width else Image.BILINEAR)
+                if im.mode != 'RGB':
+                    im = im.convert('RGB')
+                buf = io.BytesIO()
+                im.save(buf, format='JPEG', quality=80)
+                data, fmt = buf.getvalue(), 'jpg'
+            if raw if raw is not None else self.raw_output:
+                return data, fmt
+            return base64.b64encode(data).decode('utf-8'), fmt
         except Exception as e:
             warnings.warn('Failed to capture screen: {}'.format(e))
             return None, None
 
     def getPortSize(self):  # noqa: N802
-        if self.dumper is not None and hasattr(self.dumper, 'get_screen_size'):
-            w, h = self.dumper.get_screen_size()
-            return [w, h]
-        info = self.device.info
-        return [info.get('displayWidth', 1280), info.get('displayHeight', 720)]
+        w, h = self.geometry.get_size()
+        return [w, h]
+
+
+class UIAutomator2Selector(Selector):
+    """Standard Poco query semantics (see :py:class:`Selector <poco.sdk.Selector.Selector>`) evaluated over the
+    node ids of a hierarchy snapshot.
+
+    Every step of a chained query (``/``, ``>``, ``-``, ``^``, ``index``) walks only the subtree of the nodes matched
+    by the previous step, with the same depth and root inclusion rules as the sdk selector. Node views are created
+    only for the nodes handed to the matcher and for the final result.
+
+    Visibility filtering is off by default, so nodes reported as not visible-to-user (e.g. video playback overlays)
+    stay selectable.
+
+    With ``use_index``, an ``attr=`` predicate on a common string attribute (alone or inside an ``and``) is looked
+    up in an inverted index built once per snapshot, and only its matches are range-checked against the subtree and
+    verified against the whole condition, instead of walking the subtree.
+    """
+
+    def __init__(self, dumper, matcher=None, onlyVisibleNode=False, use_index=True):
+        super(UIAutomator2Selector, self).__init__(dumper, matcher)
+        self.onlyVisibleNode = onlyVisibleNode
+        self.use_index = use_index
+
+    def select(self, cond, multiple=False):
+        return self.selectImpl(cond, multiple, self.getRoot(), 9999, self.onlyVisibleNode, True)
+
+    def selectBatch(self, conds, multiple=False):
+        # one snapshot for all queries. Queries served by an index or made of steps are answered one by one, the
+        # remaining plain predicates share one walk
+        root = self.getRoot()
+        results = [[] for _ in conds]
+        if not root:
+            return results
+        snapshot = root.snapshot
+        plain = []
+        for k, cond in enumerate(conds):
+            if cond[0] in ('>', '/', '-', '^', 'index') or (self.use_index and self._candidates(snapshot, cond)):
+                try:
+                    results[k] = self._select(snapshot, cond, multiple, root.index, 9999, self.onlyVisibleNode, True)
+                except NoSuchTargetException:
+                    pass
+            else:
+                plain.append(k)
+        if plain:
+            found = self._traverse_batch(snapshot, [conds[k] for k in plain], root.index, multiple,
+                                         self.onlyVisibleNode)
+            for k, ids in zip(plain, found):
+                results[k] = ids
+        return [[UIAutomator2Node.of(snapshot, i) for i in ids] for ids in results]
+
+    def selectImpl(self, cond, multiple, root, maxDepth, onlyVisibleNode, includeRoot):
+        if not root:
+            return []
+        snapshot = root.snapshot
+        result = self._select(snapshot, cond, multiple, root.index, maxDepth, onlyVisibleNode, includeRoot)
+        return [UIAutomator2Node.of(snapshot, i) for i in result]
+
+    def _select(self, snapshot, cond, multiple, root, maxDepth, onlyVisibleNode, includeRoot):
+        if root < 0:
+            return []
+
+        op, args = cond
+
+        if op in ('>', '/'):
+            # children or offsprings
+            parents = [root]
+            for index, arg in enumerate(args):
+                midResult = []
+                seen = set()
+                _maxDepth = 1 if op == '/' and index != 0 else maxDepth
+                for parent in parents:
+                    for r in self._select(snapshot, arg, True, parent, _maxDepth, onlyVisibleNode, False):
+                        if r not in seen:
+                            seen.add(r)
+                            midResult.append(r)
+                parents = midResult
+            return parents
+        elif op == '-':
+            # sibling
+            result = []
+            seen = set()
+            query1, query2 = args
+            for n in self._select(snapshot, query1, multiple, root, maxDepth, onlyVisibleNode, includeRoot):
+                parent = snapshot.parent[n]
+                for r in self._select(snapshot, query2, multiple, parent, 1, onlyVisibleNode, includeRoot):
+                    if r not in seen:
+                        seen.add(r)
+                        result.append(r)
+            return result
+        elif op == 'index':
+            cond, i = args
+            try:
+                return [self._select(snapshot, cond, True, root, maxDepth, onlyVisibleNode, includeRoot)[i]]
+            except IndexError:
+                raise NoSuchTargetException(
+                    u'Query results index out of range. Index={} condition "{}" from root "{}".'.format(
+                        i, cond, UIAutomator2Node.of(snapshot, root)))
+        elif op == '^':
+            # parent, only of the first matched UI element
+            query1, _ = args
+            result1 = self._select(snapshot, query1, False, root, maxDepth, onlyVisibleNode, includeRoot)
+            if result1:
+                parent = snapshot.parent[result1[0]]
+                if parent >= 0:
+                    return [parent]
+            return []
+        else:
+            return self._traverse(snapshot, cond, root, multiple, maxDepth, onlyVisibleNode, includeRoot)
+
+    def _candidates(self, snapshot, cond):
+        # ids of nodes that may match cond, from an attribute index, and whether they still need
+        # to be verified against cond. None if cond cannot use an index.
+        op, args = cond
+        predicates = args if op == 'and' else (cond,)
+        for predicate in predicates:
+            pred_op, pred_args = predicate
+            if pred_op != 'attr=':
+                continue
+            attrName, value = pred_args
+            if attrName in _INDEXED_ATTRIBUTES and isinstance(value, six.string_types):
+                return _attribute_index(snapshot, attrName).get(value, ()), op == 'and'
+        return None
+
+    def _traverse(self, snapshot, cond, root, multiple, maxDepth, onlyVisibleNode, includeRoot):
+        if self.use_index:
+            candidates = self._candidates(snapshot, cond)
+            if candidates is not None:
+                ids, verify = candidates
+                return self._filter(snapshot, cond, ids, verify, root, multiple, maxDepth, onlyVisibleNode,
+                                    includeRoot)
+
+        # iterative pre-order walk of the subtree at root, same visiting order and pruning as
+        # Selector._selectTraverse
+        match = self._compile(cond)
+        view = UIAutomator2Node.of
+        flags = snapshot.flags
+        children_of = snapshot.children_of
+        result = []
+        stack = [(root, maxDepth, includeRoot)]
+        while stack:
+            i, depth, include = stack.pop()
+            if onlyVisibleNode and not flags[i] & (FLAG_VISIBLE | FLAG_HIERARCHY):
+                continue
+            if include and match(view(snapshot, i)):
+                result.append(i)
+                if not multiple:
+                    break
+            if depth == 0:
+                continue
+            children = [(c, depth - 1, True) for c in children_of(i)]
+            children.reverse()
+            stack.extend(children)
+        return result
+
+    def _traverse_batch(self, snapshot, conds, root, multiple, onlyVisibleNode):
+        # _traverse of the whole subtree at root for several conditions in one walk
+        predicates = [self._compile(cond) for cond in conds]
+        results = [[] for _ in conds]
+        active = list(range(len(conds)))
+        view = UIAutomator2Node.of
+        flags = snapshot.flags
+        subtree_end = snapshot.subtree_end
+        i, end = root, subtree_end[root]
+        while i < end and active:
+            if onlyVisibleNode and not flags[i] & (FLAG_VISIBLE | FLAG_HIERARCHY):
+                # prune the invisible branch
+                i = subtree_end[i]
+                continue
+            node = view(snapshot, i)
+            for k in list(active):
+                if predicates[k](node):
+                    results[k].append(i)
+                    if not multiple:
+                        active.remove(k)
+            i += 1
+        return results
+
+    def _filter(self, snapshot, cond, ids, verify, root, multiple, maxDepth, onlyVisibleNode, includeRoot):
+        # same result as _traverse, for candidate ids in document order (= traversal order)
+        match = self._compile(cond) if verify else None
+        view = UIAutomator2Node.of
+        flags = snapshot.flags
+        parent = snapshot.parent
+        depth = snapshot.depth
+        end = snapshot.subtree_end[root]
+        max_depth = depth[root] + maxDepth
+        result = []
+        for k in range(bisect_left(ids, root), len(ids)):
+            i = ids[k]
+            if i >= end:
+                break
+            if (i == root and not includeRoot) or depth[i] > max_depth:
+                continue
+            if onlyVisibleNode:
+                # every node from root down to i must be visible, as invisible branches are pruned
+                p = i
+                while p != root and flags[p] & (FLAG_VISIBLE | FLAG_HIERARCHY):
+                    p = parent[p]
+                if not flags[p] & (FLAG_VISIBLE | FLAG_HIERARCHY):
+                    continue
+            if verify and not match(view(snapshot, i)):
+                continue
+            result.append(i)
+            if not multiple:
+                break
+        return result
 
 
 class UIAutomator2Hierarchy(HierarchyInterface):
     def __init__(self, dumper, selector, attributor):
         super(UIAutomator2Hierarchy, self).__init__()
         self.dumper = dumper
-        self.selector = selector  # unused
+        self.selector = selector
         self.attributor = attributor
 
     def dump(self):
@@ -617,99 +1234,123 @@ class UIAutomator2Hierarchy(HierarchyInterface):
     def getAttr(self, node, attrName):  # noqa: N802
         return self.attributor.getAttr(node, attrName)
 
+    def getAttrs(self, node, attrNames):  # noqa: N802
+        return self.attributor.getAttrs(node, attrNames)
+
+    def batchGetAttrs(self, nodes, attrNames):  # noqa: N802
+        return self.attributor.batchGetAttrs(nodes, attrNames)
+
     def setAttr(self, node, attrName, attrVal):  # noqa: N802
-        return self.attributor.setAttr(node, attrName, attrVal)
+        try:
+            return self.attributor.setAttr(node, attrName, attrVal)
+        finally:
+            self.dumper.on_action()
 
     def select(self, query, multiple=False):
-        # Basic tree traversal/attribute match to remain compatible with v1 expectations
         try:
-            root = self.dumper.getRoot()
-            if not root:
-                return []
-            matches = self._select_nodes(root, query, multiple=True) or []
-            return matches if multiple else matches[:1]
+            return self.selector.select(query, multiple)
+        except NoSuchTargetException:
+            return []
         except Exception as e:
             warnings.warn('Selection failed: {}'.format(e))
             return []
 
-    def _select_nodes(self, root, query, multiple=False):
-        def evaluate(node, conditions):
-            if not conditions:
-                return True
-            for cond in conditions:
-                if not isinstance(cond, tuple) or len(cond) != 3:
-                    continue
-                op, attr, expected = cond
-                actual = node.getAttr(attr)
-                if op == 'attr=' and actual != expected:
-                    return False
-                if op == 'attr.*=' and str(expected) not in str(actual):
-                    return False
-            return True
-
-        def normalize_query(q):
-            # Convert Poco's query tuples into flat condition list where possible
-            if isinstance(q, list):
-                return q
-            if isinstance(q, tuple) and len(q) >= 2:
-                op = q[0]
-                operands = q[1]
-                if op == 'and' and isinstance(operands, (list, tuple)):
-                    conds = []
-                    for item in operands:
-                        if isinstance(item, tuple) and len(item) == 2 and isinstance(item[1], tuple):
-                            pred, kv = item
-                            conds.append((pred, kv[0], kv[1]))
-                    return conds
-                # child/parent ops: evaluate right side on current node for compatibility
-                if op in ('>', '/', '-', '^'):
-                    try:
-                        return normalize_query(operands[1])
-                    except Exception:
-                        return []
-                if op == 'index':
-                    return []
-            return []
-
-        conditions = normalize_query(query)
-        out = []
-
-        def dfs(n):
-            if evaluate(n, conditions):
-                out.append(n)
-                if not multiple:  # early exit for single match
-                    return True
-            for c in n.getChildren() or []:
-                if dfs(c) and not multiple:
-                    return True
-            return False
-
-        dfs(root)
-        return out
+    def batchSelect(self, queries, multiple=False):
+        try:
+            return self.selector.selectBatch(queries, multiple)
+        except Exception as e:
+            warnings.warn('Selection failed: {}'.format(e))
+            return [[] for _ in queries]
 
 
 class AndroidUiautomator2Agent(PocoAgent):
-    def __init__(self, device, use_airtest_input=False):
-        dumper = UIAutomator2Dumper(device)
-        selector = None  # unused in this simple implementation
-        attributor = UIAutomator2Attributor(device)
+    def __init__(self, device, use_airtest_input=False, snapshot_max_age=None, invalidate_on_action=True,
+                 prefetch_hierarchy=False, prefetch_interval=0.2, prefetch_idle_timeout=3.0, raw_screenshot=False,
+                 screen_stream=None, screen_stream_interval=0.0, screen_stream_idle_timeout=5.0,
+                 fast_ime_idle_timeout=10.0, multitouch='airtest'):
+        dumper = UIAutomator2Dumper(device, max_age=snapshot_max_age, invalidate_on_action=invalidate_on_action)
+        self.prefetcher = None
+        if prefetch_hierarchy:
+            self.prefetcher = UIAutomator2Prefetcher(dumper, prefetch_interval, prefetch_idle_timeout)
+        selector = UIAutomator2Selector(dumper)
+        self.ime = FastInputSession(device, fast_ime_idle_timeout)
+        attributor = UIAutomator2Attributor(device, dumper.geometry, self.ime)
         hierarchy = UIAutomator2Hierarchy(dumper, selector, attributor)
 
+        if multitouch == 'airtest':
+            multitouch = AirtestMultiTouch(device)
         if use_airtest_input:
             try:
                 from poco.utils.airtest.input import AirtestInput
                 inputer = AirtestInput()
             except Exception:
                 warnings.warn('use_airtest_input=True but Airtest not available; falling back to UIAutomator2 input')
-                inputer = UIAutomator2Input(device, dumper)
+                inputer = UIAutomator2Input(device, dumper, multitouch)
         else:
-            inputer = UIAutomator2Input(device, dumper)
+            inputer = UIAutomator2Input(device, dumper, multitouch)
+
+        self.frame_source = None
+        if screen_stream == 'screenshot':
+            capture = screenshot_capture(device)
+        elif screen_stream == 'screencap':
+            capture = screencap_capture(device._adb_device)
+        elif screen_stream is not None:
+            raise ValueError('screen_stream should be None, "screenshot" or "screencap", got {}'.format(screen_stream))
+        if screen_stream is not None:
+            self.frame_source = LatestFrameSource(capture, screen_stream_interval, screen_stream_idle_timeout)
+        screen = UIAutomator2Screen(device, dumper, raw_screenshot, self.frame_source)
+        super(AndroidUiautomator2Agent, self).__init__(hierarchy, inputer, screen, None)
+
+
+class _PinnedSnapshot(object):
+    def __init__(self, dumper):
+        self.dumper = dumper
+
+    def __enter__(self):
+        self.dumper.pin()
+        return self
 
-        super(AndroidUiautomator2Agent, self).__init__(hierarchy, inputer, UIAutomator2Screen(device, dumper), None)
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.dumper.unpin()
 
 
 class AndroidUiautomator2Poco(Poco):
-    """Primary entry for tmp.poco_v1 Android using UIAutomator2 backend only."""
+    """Primary entry for tmp.poco_v1 Android using UIAutomator2 backend only.
+
+    Besides the standard :py:class:`Poco <poco.pocofw.Poco>` options, accepts:
+        - ``snapshot_max_age``: seconds a hierarchy snapshot is reused by selections before a new dump, default
+          None (kept until invalidated, by an action, a polling wait, a dump or :py:meth:`refresh_hierarchy`).
+          ``0`` dumps on every selection.
+        - ``invalidate_on_action``: drop the snapshot after every input action, default True.
+        - ``prefetch_hierarchy``: keep dumping the hierarchy in a background thread while a wait is polling, so
+          that each poll reads the latest snapshot instead of waiting for a dump. Default False.
+        - ``prefetch_interval``: pause between two background dumps, default 0.2s.
+        - ``prefetch_idle_timeout``: the background thread stops this long after the last polling sleep. Defaults
+          to twice the ``poll_interval`` but at least 3s.
+        - ``coalesce_requests``: wrap the device in a :py:class:`SingleFlightDevice
+          <poco.drivers.android.singleflight.SingleFlightDevice>`, so that concurrent hierarchy dumps, screenshots,
+          ``info`` and ``window_size`` requests share one in-flight request. Default True.
+        - ``coalesce_window``: max age in seconds of an in-flight request that can be joined, default None (any
+          request started since the UI last changed).
+        - ``raw_screenshot``: :py:meth:`snapshot` returns the image bytes instead of base64 text, default False.
+        - ``screen_stream``: capture screenshots continuously in a background thread and serve the latest frame,
+          default None (one capture per :py:meth:`snapshot`). ``'screenshot'`` repeats the uiautomator2 screenshot,
+          ``'screencap'`` streams the raw framebuffer over adb (no image encoding on the device).
+        - ``screen_stream_interval``: minimum seconds between two stream captures, default 0 (back to back).
+        - ``screen_stream_idle_timeout``: the stream stops this long after the last screenshot, default 5s.
+        - ``fast_ime_idle_timeout``: texts set on nodes without resource id are typed through the uiautomator2 fast
+          input IME, which stays active across texts. The previous input method is restored this long after the last
+          text, default 10s. ``None`` keeps the fast IME until :py:meth:`fast_input` ends or the process exits.
+        - ``multitouch``: backend injecting motion events with several contacts at once (pinches,
+          ``apply_motion_tracks``, multi-finger gestures), as the uiautomator2 touch API injects a single contact.
+          Default ``'airtest'``: airtest's minitouch/maxtouch on the device, imported on the first such gesture. Or
+          pass an object with ``down``, ``move`` and ``up(x, y, contact)`` methods. With None, these gestures raise
+          :py:class:`InvalidOperationException <poco.exceptions.InvalidOperationException>`.
+
+    Every poll of a wait dumps a fresh hierarchy, turn ``adaptive_polling`` on to poll sooner than ``poll_interval``.
+    ``stable_fingerprint='hierarchy'`` uses a hash of the dump text. It is not available while a snapshot
+    is pinned (:py:meth:`pin_snapshot`), where :py:meth:`wait_stable` falls back to the fixed sleep.
+    """
 
     def __init__(self, device=None, device_id=None, using_proxy=True, force_restart=False,
                  use_airtest_input=False, screenshot_each_action=False, **options):
@@ -740,6 +1381,8 @@ class AndroidUiautomator2Poco(Poco):
         except Exception as e:  # pragma: no cover
             raise RuntimeError('Failed to connect to Android device: {}'.format(e))
 
+        if options.get('coalesce_requests', True):
+            d = SingleFlightDevice(d, options.get('coalesce_window'))
         self.device = d
 
         if force_restart:
@@ -751,7 +1394,19 @@ class AndroidUiautomator2Poco(Poco):
             except Exception as e:
                 warnings.warn('force_restart failed: {}'.format(e))
 
-        agent = AndroidUiautomator2Agent(self.device, use_airtest_input)
+        agent = AndroidUiautomator2Agent(self.device, use_airtest_input,
+                                         snapshot_max_age=options.get('snapshot_max_age'),
+                                         invalidate_on_action=options.get('invalidate_on_action', True),
+                                         prefetch_hierarchy=options.get('prefetch_hierarchy', False),
+                                         prefetch_interval=options.get('prefetch_interval', 0.2),
+                                         prefetch_idle_timeout=options.get(
+                                             'prefetch_idle_timeout', max(2 * options.get('poll_interval', 1.44), 3.0)),
+                                         raw_screenshot=options.get('raw_screenshot', False),
+                                         screen_stream=options.get('screen_stream'),
+                                         screen_stream_interval=options.get('screen_stream_interval', 0.0),
+                                         screen_stream_idle_timeout=options.get('screen_stream_idle_timeout', 5.0),
+                                         fast_ime_idle_timeout=options.get('fast_ime_idle_timeout', 10.0),
+                                         multitouch=options.get('multitouch', 'airtest'))
         super(AndroidUiautomator2Poco, self).__init__(agent, **options)
 
     def on_pre_action(self, action, ui, args):  # screenshot hook for Airtest logs
@@ -765,7 +1420,92 @@ class AndroidUiautomator2Poco(Poco):
             except Exception:
                 warnings.warn('screenshot_each_action enabled but airtest not available')
 
+    def poll_wait(self, timeout):
+        # every wait loop sleeps here. With the prefetcher running, wake up as soon as the UI has changed instead
+        dumper = self.agent.hierarchy.dumper
+        if self.agent.prefetcher is not None:
+            self.agent.prefetcher.keep_alive()
+            dumper.wait_for_change(timeout)
+        else:
+            super(AndroidUiautomator2Poco, self).poll_wait(timeout)
+            dumper.on_poll()
+
+    def get_ui_fingerprint(self, kind='hierarchy'):
+        if kind == 'hierarchy':
+            try:
+                return self.agent.hierarchy.dumper.fingerprint()
+            except Exception:
+                return None
+        return super(AndroidUiautomator2Poco, self).get_ui_fingerprint(kind)
+
+    def on_post_action(self, action, ui, args):
+        # also covers inputs that do not report their actions to the dumper (e.g. airtest input)
+        self.agent.hierarchy.dumper.on_action()
+
     # Convenience helpers
+    def pin_snapshot(self):
+        """Context manager that keeps selections on one hierarchy snapshot, e.g. for a burst of reads::
+
+            with poco.pin_snapshot():
+                texts = [item.get_text() for item in poco('list').children()]
+        """
+
+        return _PinnedSnapshot(self.agent.hierarchy.dumper)
+
+    def fast_input(self):
+        """Context manager keeping the fast input IME active for a text heavy phase, e.g. filling a form. The
+        previous input method is restored when the block ends, not after each field::
+
+            with poco.fast_input():
+                poco(text='Name').set_text('Alice')
+                poco(text='City').set_text('Paris')
+        """
+
+        return self.agent.ime.hold()
+
+    def get_request_stats(self):
+        """Per-resource counters of the request coalescing layer (see option ``coalesce_requests``).
+
+        Returns:
+            :obj:`dict`: ``dump_hierarchy``, ``screenshot``, ``info`` and ``window_size`` -> ``requests``,
+            ``performed`` and ``coalesced``. Empty when coalescing is off
+        """
+
+        if isinstance(self.device, SingleFlightDevice):
+            return self.device.get_stats()
+        return {}
+
+    def get_ime_stats(self):
+        """Counters of the fast input IME session (see option ``fast_ime_idle_timeout``).
+
+        Returns:
+            :obj:`dict`: ``activations``, ``restores``, ``texts_sent`` and ``active``
+        """
+
+        return self.agent.ime.get_stats()
+
+    def get_screen_stream_stats(self):
+        """Counters of the screen stream (see option ``screen_stream``).
+
+        Returns:
+            :obj:`dict`: ``frames_captured``, ``frames_served``, ``capture_errors`` and ``running``. Empty when there
+            is no stream
+        """
+
+        if self.agent.frame_source is not None:
+            return self.agent.frame_source.get_stats()
+        return {}
+
+    def get_snapshot_stats(self):
+        """Counters of hierarchy dumps performed, dumps avoided by reusing a snapshot, and dumps identical to the
+        previous one so the previous snapshot was kept.
+
+        Returns:
+            :obj:`dict`: ``dumps_performed``, ``dumps_avoided`` and ``snapshots_reused``
+        """
+
+        return self.agent.hierarchy.dumper.get_snapshot_stats()
+
     def get_device_info(self):
         return getattr(self.device, 'info', {})
 
@@ -820,6 +1560,27 @@ class AndroidUiautomator2Helper(object):
     @classmethod
     def clear_instances(cls):  # pragma: no cover
         cls._instances.clear()
+
+    @classmethod
+    def run_parallel(cls, tests, device_ids, max_workers=None, timeout=None, on_result=None):
+        """Run tests on several devices at once, each device with a new :py:class:`AndroidUiautomator2Poco` rather than
+        the instance from :py:meth:`get_instance`, which a test abandoned after a timeout may keep using. See
+        :py:class:`ParallelRunner <poco.drivers.android.parallel.ParallelRunner>`.
+
+        Args:
+            tests: ``test(poco, device_id)`` callable, or a list of them run in order on every device
+            device_ids (:obj:`list`): device serial numbers
+            max_workers (:obj:`int`): maximum number of tests running at once, defaults to one per device
+            timeout (:obj:`float`): maximum seconds per test
+            on_result (callable): called with each :py:class:`DeviceResult
+             <poco.drivers.android.parallel.DeviceResult>` as soon as it is known
+
+        Returns:
+            :py:class:`RunReport <poco.drivers.android.parallel.RunReport>`: all results
+        """
+
+        from poco.drivers.android.parallel import ParallelRunner
+        return ParallelRunner(device_ids, max_workers, timeout).run(tests, on_result)
 # Ensure thirdparty/site-packages comes before thirdparty/whl on sys.path
 try:
     sp = _os.path.join('thirdparty', 'site-packages')
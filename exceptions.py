@@ -54,6 +54,19 @@ class PocoTargetTimeout(PocoException):
         self.message = 'Waiting timeout for {} of "{}"'.format(action, to_text(repr(poco_obj_proxy)))
 
 
+class PocoActionCancelledException(PocoException):
+    """
+    Raised by the future of an action queued in ``async_actions`` mode when the action was not performed because an
+    earlier action failed.
+    """
+
+    def __init__(self, action, objproxy, cause):
+        super(PocoActionCancelledException, self).__init__()
+        self.cause = cause
+        self.message = 'Action {} of "{}" cancelled, an earlier action failed: {}'.format(
+            action, to_text(repr(objproxy)), to_text(str(cause)))
+
+
 class PocoNoSuchNodeException(PocoException):
     """
     Raised when the UI element specified by query expression cannot be found.
@@ -8,7 +8,7 @@ from poco.sdk.exceptions import UnableToSetAttributeException
 from poco.sdk.interfaces.hierarchy import HierarchyInterface
 
 
-__all__ = ['FrozenUIDumper', 'FrozenUIHierarchy']
+__all__ = ['FrozenUIDumper', 'FrozenUIHierarchy', 'FrozenSnapshot']
 
 
 class FrozenUIDumper(AbstractDumper):
@@ -19,6 +19,9 @@ class FrozenUIDumper(AbstractDumper):
     target app, but to perform like a ordinary dumper.
     """
 
+    # snapshot of the latest dump result, class level so that subclasses need not call __init__
+    _snapshot = None
+
     def dumpHierarchy(self, onlyVisibleNode=True):
         raise NotImplementedError
 
@@ -27,21 +30,19 @@ class FrozenUIDumper(AbstractDumper):
         Dump a hierarchy immediately from target runtime and store into a Node (subclass of :py:class:`AbstractNode 
         <poco.sdk.AbstractNode>`) object.
 
+        The nodes are views of a :py:class:`FrozenSnapshot` of the dump result. The snapshot is built once and reused
+        as long as the dumper returns the same hierarchy object. New data, even if equal, builds a new snapshot, so
+        that reuse costs no comparison of the whole tree.
+
         Returns:
-            :py:class:`inherit from AbstractNode <Node>`: Each time a new node instance is created by latest hierarchy 
-             data.
+            :py:class:`inherit from AbstractNode <Node>`: root node of the latest hierarchy data
         """
 
-        root = Node(self.dumpHierarchy())
-        self._linkParent(root)
-        return root
-
-    def _linkParent(self, root):
-        parent = root.getChildren()
-        if parent:
-            for child in parent:
-                child.setParent(root)
-                self._linkParent(child)
+        hierarchy = self.dumpHierarchy()
+        snapshot = self._snapshot
+        if snapshot is None or hierarchy is not snapshot.source:
+            snapshot = self._snapshot = FrozenSnapshot(hierarchy)
+        return snapshot.root
 
 
 
@@ -75,6 +76,13 @@ class FrozenUIHierarchy(HierarchyInterface):
 
         return self.attributor.getAttr(nodes, name)
 
+    def getAttrs(self, nodes, names):
+        """
+        get several node attributes
+        """
+
+        return self.attributor.getAttrs(nodes, names)
+
     def setAttr(self, nodes, name, value):
         """
         set node attribute
@@ -89,21 +97,96 @@ class FrozenUIHierarchy(HierarchyInterface):
 
         return self.selector.select(query, multiple)
 
+    def batchSelect(self, queries, multiple=False):
+        """
+        select nodes for several queries on one dumped hierarchy
+        """
+
+        return self.selector.selectBatch(queries, multiple)
+
+
+class FrozenSnapshot(object):
+    """
+    Immutable index of one dumped hierarchy: the node dicts in an array, with the parent and the range of children of
+    each node by position. The node wrappers are created on first access and cached, so a node reached twice is the
+    same object, and its parent is always known. The hierarchy data itself is left untouched.
+
+    Args:
+        hierarchy (:obj:`dict`): dumped hierarchy data, nodes with ``payload`` and ``children``
+
+    Attributes:
+        source (:obj:`dict`): the hierarchy data
+        nodes (:obj:`list`): node dicts, in breadth first order from the root (position 0)
+        parents (:obj:`list`): position of the parent of each node, -1 for the root
+        children (:obj:`list`): ``(start, end)`` positions of the children of each node
+    """
+
+    def __init__(self, hierarchy):
+        super(FrozenSnapshot, self).__init__()
+        self.source = hierarchy
+        self.nodes = [hierarchy]
+        self.parents = [-1]
+        self.children = []
+        i = 0
+        while i < len(self.nodes):
+            kids = self.nodes[i].get('children') or []
+            start = len(self.nodes)
+            self.nodes.extend(kids)
+            self.parents.extend([i] * len(kids))
+            self.children.append((start, start + len(kids)))
+            i += 1
+        self._wrappers = [None] * len(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, index):
+        """
+        Returns:
+            :py:class:`Node`: the cached wrapper of the node at the given position
+        """
+
+        wrapper = self._wrappers[index]
+        if wrapper is None:
+            wrapper = self._wrappers[index] = Node(self.nodes[index], self, index)
+        return wrapper
+
+    @property
+    def root(self):
+        return self.node(0)
+
 
 class Node(AbstractNode):
-    def __init__(self, node):
+    def __init__(self, node, snapshot=None, index=0):
         super(Node, self).__init__()
         self.node = node
+        self.snapshot = snapshot
+        self.index = index
+        self._parent = None
+        self._children = None
 
     def setParent(self, p):
-        self.node['__parent__'] = p
+        # kept on the wrapper, the node data is shared and must stay as dumped
+        self._parent = p
 
     def getParent(self):
-        return self.node.get('__parent__')
+        if self.snapshot is None:
+            return self._parent
+        parent = self.snapshot.parents[self.index]
+        return self.snapshot.node(parent) if parent >= 0 else None
 
     def getChildren(self):
-        for child in self.node.get('children') or []:
-            yield Node(child)
+        if self.snapshot is None:
+            children = []
+            for child in self.node.get('children') or []:
+                child = Node(child)
+                child.setParent(self)
+                children.append(child)
+            return children
+        if self._children is None:
+            start, end = self.snapshot.children[self.index]
+            self._children = tuple(self.snapshot.node(i) for i in range(start, end))
+        return self._children
 
     def getAttr(self, attrName):
         return self.node['payload'].get(attrName)
@@ -1,17 +1,21 @@
 # coding=utf-8
 from __future__ import unicode_literals
 
+import json
 import time
 import traceback
 import warnings
 
 from .acceleration import PocoAccelerationMixin
-from .exceptions import PocoTargetTimeout, InvalidOperationException
+from .exceptions import PocoTargetTimeout, InvalidOperationException, PocoTargetRemovedException, \
+    PocoNoSuchNodeException
 from .proxy import UIObjectProxy
 from .agent import PocoAgent
 from .freezeui.utils import create_immutable_hierarchy
 from .utils.track import MotionTrackBatch
 from .utils.multitouch_gesture import make_pinching
+from .utils.polling import AdaptivePolling
+from .utils.pipeline import ActionPipeline, pipelined
 from .gesture import PendingGestureAction
 
 __author__ = 'lxn3032'
@@ -38,6 +42,28 @@ class Poco(PocoAccelerationMixin):
             - ``reevaluate_volatile_attributes``: Re-select target UI proxy when retrieving volatile attributes. Poco
               drivers that using hrpc connections should default to be ``False`` as hrpc always reevaluate the
               attributes remotely. This option is useful for ``StdPoco`` driver and should be handled by ``StdPoco``.
+            - ``adaptive_polling``: poll waits on an adaptive schedule instead of every ``poll_interval``: a short
+              first sleep, then growing sleeps that are never shorter than the measured cost of one poll nor longer
+              than ``poll_interval``. See :py:class:`AdaptivePolling <poco.utils.polling.AdaptivePolling>`. Default is
+              ``False``.
+            - ``poll_first_interval``: first sleep of the adaptive schedule. Default value is 0.1s.
+            - ``poll_backoff``: growth factor of the adaptive schedule. Default value is 1.6.
+            - ``stable_fingerprint``: how :py:meth:`wait_stable` tells that the UI has become still. ``None`` (default)
+              sleeps ``action_interval``. ``'hierarchy'`` or ``'screen'`` compare consecutive fingerprints of the
+              hierarchy or of a downscaled screenshot (see :py:meth:`get_ui_fingerprint`) and return as soon as two
+              of them match.
+            - ``stable_min_interval``: minimum time :py:meth:`wait_stable` waits before the first fingerprint.
+              Default value is 0.1s.
+            - ``stable_max_interval``: maximum time :py:meth:`wait_stable` waits for matching fingerprints. Default
+              value is 2.0s.
+            - ``stable_check_interval``: time between two fingerprints. Default value is 0.1s.
+            - ``async_actions``: input actions (click, swipe, long_click, pinch, motion tracks etc., on Poco and on UI
+              proxies) are queued on a per-device ordered :py:class:`ActionPipeline
+              <poco.utils.pipeline.ActionPipeline>` and return an :py:class:`ActionFuture
+              <poco.utils.pipeline.ActionFuture>` at once. Each action, including its pre and post action callbacks
+              and the wait for the UI to become still, runs after the previous one. Hierarchy reads (selections,
+              attributes, dump, freeze) first wait for the queued actions, screenshots do not. See
+              :py:meth:`wait_for_actions`. Default is ``False``.
     """
 
     def __init__(self, agent, **options):
@@ -49,6 +75,19 @@ class Poco(PocoAccelerationMixin):
         self._post_action_interval = options.get('action_interval', 0.8)
         self._poll_interval = options.get('poll_interval', 1.44)
         self._reevaluate_volatile_attributes = options.get('reevaluate_volatile_attributes', False)
+        self._adaptive_polling = options.get('adaptive_polling', False)
+        self._poll_first_interval = options.get('poll_first_interval', 0.1)
+        self._poll_backoff = options.get('poll_backoff', 1.6)
+        self._polling = None
+        self._polling_stats = {'waits': 0, 'polls': 0, 'slept': 0.0, 'saved': 0.0, 'last': None}
+        self._stable_fingerprint = options.get('stable_fingerprint')
+        if self._stable_fingerprint not in (None, 'hierarchy', 'screen'):
+            raise ValueError('Option `stable_fingerprint` should be None, "hierarchy" or "screen". Got {}'
+                             .format(repr(self._stable_fingerprint)))
+        self._stable_min_interval = options.get('stable_min_interval', 0.1)
+        self._stable_max_interval = options.get('stable_max_interval', 2.0)
+        self._stable_check_interval = options.get('stable_check_interval', 0.1)
+        self._pipeline = ActionPipeline() if options.get('async_actions', False) else None
         if 'touch_down_duration' in options:
             touch_down_duration = options['touch_down_duration']
             try:
@@ -122,14 +161,16 @@ class Poco(PocoAccelerationMixin):
             PocoTargetTimeout: when none of UI proxies appeared before timeout
         """
 
+        objects = list(objects)
         start = time.time()
-        while True:
-            for obj in objects:
-                if obj.exists():
-                    return obj
-            if time.time() - start > timeout:
-                raise PocoTargetTimeout('any to appear', objects)
-            self.sleep_for_polling_interval()
+        with self.polling_session():
+            while True:
+                for obj, exists in zip(objects, self._batch_exists(objects)):
+                    if exists:
+                        return obj
+                if time.time() - start > timeout:
+                    raise PocoTargetTimeout('any to appear', objects)
+                self.sleep_for_polling_interval()
 
     def wait_for_all(self, objects, timeout=120):
         """
@@ -146,18 +187,36 @@ class Poco(PocoAccelerationMixin):
             PocoTargetTimeout: when not all of UI proxies appeared before timeout
         """
 
+        objects = list(objects)
         start = time.time()
-        while True:
-            all_exist = True
-            for obj in objects:
-                if not obj.exists():
-                    all_exist = False
-                    break
-            if all_exist:
-                return
-            if time.time() - start > timeout:
-                raise PocoTargetTimeout('all to appear', objects)
-            self.sleep_for_polling_interval()
+        with self.polling_session():
+            while True:
+                if all(self._batch_exists(objects)):
+                    return
+                if time.time() - start > timeout:
+                    raise PocoTargetTimeout('all to appear', objects)
+                self.sleep_for_polling_interval()
+
+    def _batch_exists(self, objects):
+        # exists() of every proxy, selected together with one batchSelect so that a poll cycle costs one hierarchy
+        # state (and on most drivers one traversal) instead of one per proxy
+        self.wait_for_actions()
+        hierarchy = self.agent.hierarchy
+        try:
+            results = hierarchy.batchSelect([obj.query for obj in objects], False)
+        except Exception:
+            return [obj.exists() for obj in objects]
+
+        exists = []
+        for nodes in results:
+            if not nodes:
+                exists.append(False)
+                continue
+            try:
+                exists.append(hierarchy.getAttr(nodes, 'visible'))
+            except (PocoTargetRemovedException, PocoNoSuchNodeException):
+                exists.append(False)
+        return exists
 
     def freeze(this):
         """
@@ -179,6 +238,7 @@ class Poco(PocoAccelerationMixin):
 
         class FrozenPoco(Poco):
             def __init__(self, **kwargs):
+                this.wait_for_actions()
                 hierarchy_dict = this.agent.hierarchy.dump()
                 hierarchy = create_immutable_hierarchy(hierarchy_dict)
                 agent_ = PocoAgent(hierarchy, this.agent.input, this.agent.screen)
@@ -186,6 +246,8 @@ class Poco(PocoAccelerationMixin):
                 kwargs['pre_action_wait_for_appearance'] = 0
                 super(FrozenPoco, self).__init__(agent_, **kwargs)
                 self.this = this
+                # actions stay in order with the ones of the original instance
+                self._pipeline = this._pipeline
 
             def __enter__(self):
                 return self
@@ -200,19 +262,104 @@ class Poco(PocoAccelerationMixin):
 
     def wait_stable(self):
         """
-        Sleep for fixed number of seconds in order to wait for the UI to become still (stable).
+        Wait for the UI to become still (stable). By default sleep for fixed number of seconds, see option
+        ``stable_fingerprint`` for waiting until consecutive UI fingerprints match instead. When fingerprints are not
+        available, the fixed sleep is used.
         There is no need to call this method manually. It's automatically invoked when required.
         """
 
-        time.sleep(self._post_action_interval)
+        kind = self._stable_fingerprint
+        if kind is None:
+            time.sleep(self._post_action_interval)
+            return
+
+        start = time.time()
+        time.sleep(self._stable_min_interval)
+        previous = self.get_ui_fingerprint(kind)
+        while previous is not None:
+            if time.time() - start >= self._stable_max_interval:
+                return
+            time.sleep(self._stable_check_interval)
+            current = self.get_ui_fingerprint(kind)
+            if current is not None and current == previous:
+                return
+            previous = current
+
+        # no fingerprint, sleep the rest of the fixed interval
+        remaining = self._post_action_interval - (time.time() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def get_ui_fingerprint(self, kind='hierarchy'):
+        """
+        Cheap value that changes when the UI changes, used by :py:meth:`wait_stable`. Drivers may override this with
+        a cheaper fingerprint of their own.
+
+        Args:
+            kind (:obj:`str`): ``'hierarchy'`` for a hash of the hierarchy dump, ``'screen'`` for a hash of a
+             screenshot downscaled to 64px wide
+
+        Returns:
+            hashable value, or None when not available
+        """
+
+        self.wait_for_actions()
+        try:
+            if kind == 'hierarchy':
+                return hash(json.dumps(self.agent.hierarchy.dump(), sort_keys=True, default=repr))
+            elif kind == 'screen':
+                data, _ = self.agent.screen.getScreen(64)
+                return hash(data)
+        except Exception:
+            pass
+        return None
 
     def sleep_for_polling_interval(self):
         """
-        Sleep for fixed number of seconds after each poll event.
+        Sleep after each poll event, for ``poll_interval`` seconds or on the adaptive schedule of the current polling
+        session (see option ``adaptive_polling``).
         There is no need to call this method manually. It's automatically invoked when required.
         """
 
-        time.sleep(self._poll_interval)
+        if self._polling is not None:
+            self._polling.sleep(self.poll_wait)
+        else:
+            self.poll_wait(self._poll_interval)
+
+    def poll_wait(self, timeout):
+        """
+        Sleep between two poll events. Drivers that can tell when the UI has changed may override this to return
+        earlier, or to make sure the next poll observes a fresh UI state.
+
+        Args:
+            timeout (:obj:`float`): maximum time to sleep in seconds
+        """
+
+        time.sleep(timeout)
+
+    def polling_session(self):
+        """
+        Context manager around one wait loop. Inside it, :py:meth:`sleep_for_polling_interval` follows one adaptive
+        schedule when option ``adaptive_polling`` is on, and the wait is accounted in :py:meth:`get_polling_stats`.
+        Sessions may be nested, the inner one is used until it exits.
+
+        Returns:
+            context manager, its ``timed_out`` attribute should be set when the loop gives up without raising
+        """
+
+        return _PollingSession(self)
+
+    def get_polling_stats(self):
+        """
+        Polling counters of the waits done with ``adaptive_polling`` on. ``saved`` estimates the seconds gained
+        compared to polling every ``poll_interval``.
+
+        Returns:
+            :obj:`dict`: total ``waits``, ``polls``, ``slept`` and ``saved``, and ``last`` holding the same figures
+            (plus ``elapsed``) for the last wait
+        """
+
+        return dict(self._polling_stats)
 
     @property
     def agent(self):
@@ -225,6 +372,7 @@ class Poco(PocoAccelerationMixin):
 
         return self._agent
 
+    @pipelined
     def click(self, pos):
         """
         Perform click (touch, tap, etc.) action on target device at given coordinates.
@@ -256,11 +404,13 @@ class Poco(PocoAccelerationMixin):
     def rclick(self, pos):
         raise NotImplementedError
 
+    @pipelined
     def double_click(self, pos):
         ret = self.agent.input.double_click(pos[0], pos[1])
         self.wait_stable()
         return ret
 
+    @pipelined
     def swipe(self, p1, p2=None, direction=None, duration=2.0):
         """
         Perform swipe action on target device from point to point given by start point and end point, or by the
@@ -306,6 +456,7 @@ class Poco(PocoAccelerationMixin):
             raise TypeError('Swipe end not set.')
         return self.agent.input.swipe(p1[0], p1[1], p2[0], p2[1], duration)
 
+    @pipelined
     def long_click(self, pos, duration=2.0):
         """
         Similar to click but press the screen for the given time interval and then release
@@ -324,6 +475,7 @@ class Poco(PocoAccelerationMixin):
             raise InvalidOperationException('Click position out of screen. {}'.format(repr(pos)))
         return self.agent.input.longClick(pos[0], pos[1], duration)
 
+    @pipelined
     def scroll(self, direction='vertical', percent=0.6, duration=2.0):
         """
         Scroll from the lower part to the upper part of the entire screen.
@@ -350,6 +502,7 @@ class Poco(PocoAccelerationMixin):
 
         return self.swipe(start, direction=direction, duration=duration)
 
+    @pipelined
     def pinch(self, direction='in', percent=0.6, duration=2.0, dead_zone=0.1):
         """
         Squeezing or expanding 2 fingers on the entire screen.
@@ -402,6 +555,7 @@ class Poco(PocoAccelerationMixin):
 
         return PendingGestureAction(self, pos)
 
+    @pipelined
     def apply_motion_tracks(self, tracks, accuracy=0.004):
         """
         Similar to click but press the screen for the given time interval and then release
@@ -516,4 +670,51 @@ class Poco(PocoAccelerationMixin):
             :obj:`str`: base64 encoded UI tree data
         """
 
+        self.wait_for_actions()
         return self.agent.hierarchy.dump()
+
+    def wait_for_actions(self, timeout=None):
+        """
+        Wait until the actions queued in ``async_actions`` mode are done. Called automatically before hierarchy
+        reads, so that they observe the UI after the actions. Returns at once in synchronous mode and when called by
+        a queued action.
+
+        Args:
+            timeout (:obj:`float`): max seconds to wait, None for no limit
+
+        Raises:
+            PocoTargetTimeout: when the actions are not done in time
+            the exception of the first queued action that failed since the last call. The actions queued after it
+            were cancelled
+        """
+
+        if self._pipeline is not None:
+            self._pipeline.join(timeout)
+
+
+class _PollingSession(object):
+    def __init__(self, poco):
+        self.poco = poco
+        self.timed_out = False
+        self._outer = None
+        self._polling = None
+
+    def __enter__(self):
+        poco = self.poco
+        self._outer = poco._polling
+        if poco._adaptive_polling:
+            self._polling = AdaptivePolling(poco._poll_interval, poco._poll_first_interval, poco._poll_backoff)
+        poco._polling = self._polling
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        poco = self.poco
+        poco._polling = self._outer
+        if self._polling is not None:
+            last = self._polling.finish(exc_type is None and not self.timed_out)
+            stats = poco._polling_stats
+            stats['waits'] += 1
+            stats['polls'] += last['polls']
+            stats['slept'] += last['slept']
+            stats['saved'] += last['saved']
+            stats['last'] = last
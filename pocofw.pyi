@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from typing import List, Union, NoReturn, Callable, Any, Text
+from typing import List, Union, NoReturn, Callable, Any, Text, Dict
 
 from .acceleration import PocoAccelerationMixin
 from .proxy import UIObjectProxy
@@ -16,6 +16,13 @@ class Poco(PocoAccelerationMixin):
         self._post_action_interval = 0.8
         self._poll_interval = 1.44
         self._reevaluate_volatile_attributes = False # type: bool
+        self._adaptive_polling = False              # type: bool
+        self._poll_first_interval = 0.1
+        self._poll_backoff = 1.6
+        self._stable_fingerprint = None             # type: Union[None, Text]
+        self._stable_min_interval = 0.1
+        self._stable_max_interval = 2.0
+        self._stable_check_interval = 0.1
         self._pre_action_callbacks = []             # type: List[Callable[Text, UIObjectProxy, Any]]
         self._post_action_callbacks = []            # type: List[Callable[Text, UIObjectProxy, Any]]
 
@@ -68,9 +75,24 @@ class Poco(PocoAccelerationMixin):
     def wait_stable(self):
         ...
 
+    def get_ui_fingerprint(self, kind: Text='hierarchy') -> Any:
+        ...
+
     def sleep_for_polling_interval(self):
         ...
 
+    def poll_wait(self, timeout: float):
+        ...
+
+    def polling_session(self):
+        ...
+
+    def get_polling_stats(self) -> Dict[Text, Any]:
+        ...
+
+    def wait_for_actions(self, timeout: float=None) -> NoReturn:
+        ...
+
     def on_pre_action(self, action: Text, ui: UIObjectProxy, args: Any) -> NoReturn:
         ...
     def on_post_action(self, action: Text, ui: UIObjectProxy, args: Any) -> NoReturn:
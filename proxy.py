@@ -5,6 +5,7 @@ import math
 import copy
 import poco.utils.six as six
 import time
+import threading
 from functools import wraps
 
 from poco.gesture import PendingGestureAction
@@ -12,9 +13,53 @@ from poco.exceptions import PocoTargetTimeout, InvalidOperationException, PocoNo
 from poco.sdk.exceptions import UnableToSetAttributeException
 from poco.utils.query_util import query_expr, build_query
 from poco.utils.multitouch_gesture import make_pinching
+from poco.utils.pipeline import pipelined
 
 __all__ = ['UIObjectProxy']
 
+# attributes a focus position is computed from, see _focus_position
+_GEOMETRY_ATTRIBUTES = ['pos', 'size', 'anchorPoint']
+
+# per thread depth of nested reads, see after_actions
+_reads = threading.local()
+
+
+def _focus_position(geometry, focus):
+    # geometry: values of _GEOMETRY_ATTRIBUTES. focus: (fx, fy) relative to the element's bounding box
+    (x, y), (w, h), (ap_x, ap_y) = [map(float, v) for v in geometry]
+    fx, fy = focus
+    return [x + w * (fx - ap_x), y + h * (fy - ap_y)]
+
+
+def _l2r_u2d_order(geometries):
+    # indexes of the elements sorted by the (y, x) of their center, stable for equal positions.
+    # geometries: values of _GEOMETRY_ATTRIBUTES of every element
+    keys = [(y + h * (0.5 - ap_y), x + w * (0.5 - ap_x)) for (x, y), (w, h), (ap_x, ap_y) in geometries]
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+class _SortedChildren(object):
+    # the UI elements selected by a proxy in "L2R U2D" order. The geometry of all nodes is read with one
+    # batchGetAttrs and sorted at once; the proxy of each element is created on first access
+    def __init__(self, proxy, nodes):
+        self.proxy = proxy
+        self.nodes = nodes
+        self.order = _l2r_u2d_order(proxy.poco.agent.hierarchy.batchGetAttrs(nodes, _GEOMETRY_ATTRIBUTES))
+        self.proxies = [None] * len(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, item):
+        uiobj = self.proxies[item]
+        if uiobj is None:
+            uiobj = self.proxies[item] = self.proxy._index_proxy(self.nodes, self.order[item])
+        return uiobj
+
+    def __iter__(self):
+        for item in range(len(self.order)):
+            yield self[item]
+
 
 def wait(func):
     @wraps(func)
@@ -31,6 +76,27 @@ def wait(func):
     return wrapped
 
 
+def after_actions(func):
+    """
+    Reads of the hierarchy wait for the actions queued in async_actions mode once, at the outermost read. The reads
+    nested in it (e.g. exists() -> attr() -> _do_query()) do not wait again. Being outermost, the wait also raises the
+    failure of a queued action to the caller instead of inside a read that would take it for a missing or stale node.
+    """
+
+    @wraps(func)
+    def wrapped(proxy, *args, **kwargs):
+        depth = getattr(_reads, 'depth', 0)
+        if not depth:
+            proxy.poco.wait_for_actions()
+        _reads.depth = depth + 1
+        try:
+            return func(proxy, *args, **kwargs)
+        finally:
+            _reads.depth = depth
+
+    return wrapped
+
+
 def refresh_when(err_type):
     def wrapper(func):
         @wraps(func)
@@ -208,6 +274,7 @@ class UIObjectProxy(object):
         obj.query = query
         return obj
 
+    @after_actions
     def __getitem__(self, item):
         """
         Select the specific UI element by index. If this UI proxy represents a set of UI elements, then use this method
@@ -233,22 +300,11 @@ class UIObjectProxy(object):
             nodes = self._do_query(multiple=True, refresh=True)
         else:
             nodes = self._nodes
-        length = len(nodes)
         if not self._sorted_children:
-            self._sorted_children = []
-            for i in range(length):
-                uiobj = UIObjectProxy(self.poco)
-                uiobj.query = ('index', (self.query, i))
-                uiobj._evaluated = True
-                uiobj._query_multiple = True
-                uiobj._nodes = nodes[i]
-                uiobj._nodes_proxy_is_list = False
-                pos = uiobj.get_position()
-                self._sorted_children.append((uiobj, pos))
-
-        self._sorted_children.sort(key=lambda v: (v[1][1], v[1][0]))
-        return self._sorted_children[item][0]
+            self._sorted_children = _SortedChildren(self, nodes)
+        return self._sorted_children[item]
 
+    @after_actions
     def __len__(self):
         """
         Return the number of selected UI elements.
@@ -271,6 +327,7 @@ class UIObjectProxy(object):
             nodes = self._nodes
         return len(nodes) if nodes else 0
 
+    @after_actions
     def __iter__(self):
         """
         Similar method to :py:meth:`.__getitem__() <poco.proxy.UIObjectProxy.__getitem__>` with the difference that this
@@ -291,22 +348,20 @@ class UIObjectProxy(object):
             nodes = self._do_query(multiple=True, refresh=True)
         else:
             nodes = self._nodes
-        length = len(nodes)
-        sorted_nodes = []
-        for i in range(length):
-            uiobj = UIObjectProxy(self.poco)
-            uiobj.query = ('index', (self.query, i))
-            uiobj._evaluated = True
-            uiobj._query_multiple = True
-            uiobj._nodes = nodes[i]
-            uiobj._nodes_proxy_is_list = False
-            pos = uiobj.get_position()
-            sorted_nodes.append((uiobj, pos))
-        sorted_nodes.sort(key=lambda v: (v[1][1], v[1][0]))
-
-        for obj, _ in sorted_nodes:
+        # proxies are created one by one as the iteration advances
+        for obj in _SortedChildren(self, nodes):
             yield obj
 
+    def _index_proxy(self, nodes, i):
+        uiobj = UIObjectProxy(self.poco)
+        uiobj.query = ('index', (self.query, i))
+        uiobj._evaluated = True
+        uiobj._query_multiple = True
+        uiobj._nodes = nodes[i]
+        uiobj._nodes_proxy_is_list = False
+        return uiobj
+
+    @pipelined
     @wait
     def click(self, focus=None, sleep_interval=None):
         """
@@ -339,6 +394,7 @@ class UIObjectProxy(object):
         self.poco.post_action('click', self, pos_in_percentage)
         return ret
 
+    @pipelined
     @wait
     def rclick(self, focus=None, sleep_interval=None):
         """
@@ -371,6 +427,7 @@ class UIObjectProxy(object):
         self.poco.post_action('rclick', self, pos_in_percentage)
         return ret
 
+    @pipelined
     @wait
     def double_click(self, focus=None, sleep_interval=None):
         """
@@ -403,6 +460,7 @@ class UIObjectProxy(object):
         self.poco.post_action('double_click', self, pos_in_percentage)
         return ret
 
+    @pipelined
     @wait
     def long_click(self, duration=2.0):
         """
@@ -428,6 +486,7 @@ class UIObjectProxy(object):
         self.poco.post_action('long_click', self, pos_in_percentage)
         return ret
 
+    @pipelined
     @wait
     def swipe(self, direction, focus=None, duration=0.5):
         """
@@ -460,6 +519,7 @@ class UIObjectProxy(object):
         self.poco.post_action('swipe', self, (origin, dir_vec))
         return ret
 
+    @pipelined
     def drag_to(self, target, duration=2.0):
         """
         Similar to swipe action, but the end point is provide by a UI proxy or by fixed coordinates.
@@ -486,6 +546,7 @@ class UIObjectProxy(object):
         dir_ = [target_pos[0] - origin_pos[0], target_pos[1] - origin_pos[1]]
         return self.swipe(dir_, duration=duration)
 
+    @pipelined
     def scroll(self, direction='vertical', percent=0.6, duration=2.0):
         """
         Simply touch down from point A and move to point B then release up finally. This action is performed within
@@ -517,6 +578,7 @@ class UIObjectProxy(object):
 
         return self.focus(focus1).drag_to(self.focus(focus2), duration=duration)
 
+    @pipelined
     def pinch(self, direction='in', percent=0.6, duration=2.0, dead_zone=0.1):
         """
         Squeezing or expanding 2 fingers on this UI with given motion range and duration.
@@ -610,17 +672,9 @@ class UIObjectProxy(object):
         if focus == 'anchor':
             pos = list(map(float, self.attr('pos')))
         elif focus == 'center':
-            x, y = map(float, self.attr('pos'))
-            w, h = self.get_size()
-            ap_x, ap_y = map(float, self.attr("anchorPoint"))
-            fx, fy = 0.5, 0.5
-            pos = [x + w * (fx - ap_x), y + h * (fy - ap_y)]
+            pos = _focus_position(self.attrs(_GEOMETRY_ATTRIBUTES), (0.5, 0.5))
         elif type(focus) in (list, tuple):
-            x, y = map(float, self.attr('pos'))
-            w, h = self.get_size()
-            ap_x, ap_y = map(float, self.attr("anchorPoint"))
-            fx, fy = focus
-            pos = [x + w * (fx - ap_x), y + h * (fy - ap_y)]
+            pos = _focus_position(self.attrs(_GEOMETRY_ATTRIBUTES), focus)
         else:
             raise TypeError('Unsupported focus type {}. '
                             'Only "anchor/center" or 2-list/2-tuple available.'.format(type(focus)))
@@ -654,10 +708,12 @@ class UIObjectProxy(object):
         """
 
         start = time.time()
-        while not self.exists():
-            self.poco.sleep_for_polling_interval()
-            if time.time() - start > timeout:
-                break
+        with self.poco.polling_session() as session:
+            while not self.exists():
+                self.poco.sleep_for_polling_interval()
+                if time.time() - start > timeout:
+                    session.timed_out = True
+                    break
         return self
 
     def wait_for_appearance(self, timeout=120):
@@ -673,10 +729,11 @@ class UIObjectProxy(object):
         """
 
         start = time.time()
-        while not self.exists():
-            self.poco.sleep_for_polling_interval()
-            if time.time() - start > timeout:
-                raise PocoTargetTimeout('appearance', self)
+        with self.poco.polling_session():
+            while not self.exists():
+                self.poco.sleep_for_polling_interval()
+                if time.time() - start > timeout:
+                    raise PocoTargetTimeout('appearance', self)
 
     def wait_for_disappearance(self, timeout=120):
         """
@@ -690,13 +747,15 @@ class UIObjectProxy(object):
         """
 
         start = time.time()
-        while self.exists():
-            self.poco.sleep_for_polling_interval()
-            if time.time() - start > timeout:
-                raise PocoTargetTimeout('disappearance', self)
-            # 强制重新获取节点状态，避免节点已经存在、又消失后，这里不会刷新节点信息导致exists()永远为True的bug
-            self.invalidate()
+        with self.poco.polling_session():
+            while self.exists():
+                self.poco.sleep_for_polling_interval()
+                if time.time() - start > timeout:
+                    raise PocoTargetTimeout('disappearance', self)
+                # 强制重新获取节点状态，避免节点已经存在、又消失后，这里不会刷新节点信息导致exists()永远为True的bug
+                self.invalidate()
 
+    @after_actions
     @refresh_when(PocoTargetRemovedException)
     def attr(self, name):
         """
@@ -740,6 +799,31 @@ class UIObjectProxy(object):
             val = val.encode('utf-8')
         return val
 
+    @after_actions
+    @refresh_when(PocoTargetRemovedException)
+    def attrs(self, names):
+        """
+        Retrieve several attributes of UI element at once. Same as calling :py:meth:`.attr()
+        <poco.proxy.UIObjectProxy.attr>` for each name, but the element is selected once and the values are read
+        with one bulk request to the hierarchy (a single pass or round trip on drivers that support it).
+
+        Args:
+            names: list of attribute names, see :py:meth:`.attr() <poco.proxy.UIObjectProxy.attr>`
+
+        Returns:
+            :obj:`list`: attribute values in the same order as ``names``, None for absent attributes
+
+        Raises:
+            PocoNoSuchNodeException: when the UI element does not exists
+        """
+
+        nodes = self._do_query(multiple=False)
+        values = self.poco.agent.hierarchy.getAttrs(nodes, list(names))
+        if six.PY2:
+            values = [val.encode('utf-8') if isinstance(val, six.text_type) else val for val in values]
+        return values
+
+    @after_actions
     @refresh_when(PocoTargetRemovedException)
     def setattr(self, name, val):
         """
@@ -761,6 +845,7 @@ class UIObjectProxy(object):
             raise InvalidOperationException('"{}" of "{}"'.format(str(e), self))
 
     @volatile_attribute
+    @after_actions
     def exists(self):
         """
         Test whether the UI element is in the hierarchy. Similar to :py:meth:`.attr('visible')
@@ -832,11 +917,12 @@ class UIObjectProxy(object):
             NormalizedCoordinate system
         """
 
-        size = self.get_size()
-        top_left = self.get_position([0, 0])
+        geometry = self.attrs(_GEOMETRY_ATTRIBUTES)
+        w, h = map(float, geometry[1])
+        left, top = _focus_position(geometry, (0, 0))
 
         # t, r, b, l
-        bounds = [top_left[1], top_left[0] + size[0], top_left[1] + size[1], top_left[0]]
+        bounds = [top, left + w, top + h, left]
         return bounds
 
     def __str__(self):
@@ -852,6 +938,7 @@ class UIObjectProxy(object):
     __repr__ = __str__
 
     @property
+    @after_actions
     def nodes(self):
         """
         Readonly property accessing the UI element(s) in the remote runtime.
@@ -880,6 +967,7 @@ class UIObjectProxy(object):
     refresh = invalidate
 
     def _do_query(self, multiple=True, refresh=False):
+        # callers are read entry points (after_actions), the queued actions are done already
         if not self._evaluated or refresh:
             self._nodes = self.poco.agent.hierarchy.select(self.query, multiple)
             if not self._nodes or len(self._nodes) == 0:
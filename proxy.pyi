@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from typing import Iterable, Iterator, Text, Tuple, Union, List, Dict, Any, NoReturn
+from typing import Iterable, Iterator, Text, Tuple, Union, List, Dict, Any, NoReturn, Sequence
 
 from poco.pocofw import Poco
 from poco.gesture import PendingGestureAction
@@ -15,7 +15,7 @@ class UIObjectProxy(object):
         self._evaluated = ...               # type: bool
         self._nodes = ...                   # type: Union[type(None), List[AbstractNode]]
         self._nodes_proxy_is_list = ...     # type: bool
-        self._sorted_children = ...         # type: Union[type(None), (UIObjectProxy, (float, float))]
+        self._sorted_children = ...         # type: Union[type(None), Sequence[UIObjectProxy]]
         self._focus = ...                   # type: Union[type(None), (float, float)]
 
     def child(self, name: Text=None, **attrs) -> UIObjectProxy:
@@ -88,6 +88,9 @@ class UIObjectProxy(object):
     def attr(self, name: Text) -> Any:
         ...
 
+    def attrs(self, names: List[Text]) -> List[Any]:
+        ...
+
     def setattr(self, name: Text, val: Any) -> bool:
         ...
 
@@ -14,6 +14,9 @@ class AbstractNode(object):
     or their children.
     """
 
+    # no instance state here, so that subclasses may declare ``__slots__`` for lightweight node views
+    __slots__ = ()
+
     def getParent(self):
         """
         Return the parent node of this node. Return None if there is no parent or parent is not accessible or this is
@@ -22,6 +22,13 @@ class Attributor(object):
             node_ = node
         return node_.getAttr(attrName)
 
+    def getAttrs(self, node, attrNames):
+        if type(node) in (list, tuple):
+            node_ = node[0]
+        else:
+            node_ = node
+        return [node_.getAttr(attrName) for attrName in attrNames]
+
     def setAttr(self, node, attrName, attrVal):
         if type(node) in (list, tuple):
             node_ = node[0]
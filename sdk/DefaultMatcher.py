@@ -1,6 +1,9 @@
 # coding=utf-8
 
 import re
+import threading
+from collections import OrderedDict
+
 from .exceptions import NoSuchComparatorException
 
 __author__ = 'lxn3032'
@@ -22,6 +25,20 @@ class IMatcher(object):
 
         raise NotImplementedError
 
+    def compile(self, cond):
+        """
+        Turn the given condition into a predicate that tests one node, so that the condition is processed once for
+        all nodes of a traversal rather than for every node.
+
+        Args:
+            cond (:obj:`tuple`): query expression
+
+        Returns:
+            callable: ``predicate(node) -> bool``, same result as ``match(cond, node)``
+        """
+
+        return lambda node: self.match(cond, node)
+
 
 class EqualizationComparator(object):
     """
@@ -75,14 +92,22 @@ class DefaultMatcher(IMatcher):
       - ``attr.*=`` corresponds to :py:class:`RegexpComparator <poco.sdk.DefaultMatcher.RegexpComparator>`.
       
       The ``op1`` must be a string. The ``Matcher`` will help to map to ``Comparator`` object.
+
+    Compiled conditions (see :py:meth:`compile <poco.sdk.DefaultMatcher.DefaultMatcher.compile>`) are kept in a LRU
+    cache of ``plan_cache_size`` entries keyed by the query tuple. The cache is cleared when ``comparators`` is
+    changed, so customized comparators take effect on the next compile.
     """
 
-    def __init__(self):
+    def __init__(self, plan_cache_size=256):
         super(DefaultMatcher, self).__init__()
         self.comparators = {
             'attr=': EqualizationComparator(),
             'attr.*=': RegexpComparator(),
         }
+        self.plan_cache_size = plan_cache_size
+        self._plans = OrderedDict()
+        self._plans_comparators = dict(self.comparators)
+        self._plans_lock = threading.Lock()
 
     def match(self, cond, node):
         """
@@ -112,3 +137,77 @@ class DefaultMatcher(IMatcher):
             return comparator.compare(targetValue, value)
 
         raise NoSuchComparatorException(op, 'poco.sdk.DefaultMatcher')
+
+    def compile(self, cond):
+        """
+        See Also: :py:meth:`IMatcher.compile <poco.sdk.DefaultMatcher.IMatcher.compile>`. ``and``/``or`` become
+        closures over their compiled operands, the built-in comparators are inlined and regexp patterns are compiled
+        once. Errors are raised when a node is matched, as with :py:meth:`match`.
+        """
+
+        try:
+            hash(cond)
+        except TypeError:
+            return self._compile(cond)
+
+        with self._plans_lock:
+            if self._plans_comparators != self.comparators:
+                # predicates hold the comparators they were compiled with
+                self._plans.clear()
+                self._plans_comparators = dict(self.comparators)
+            predicate = self._plans.pop(cond, None)
+            if predicate is not None:
+                self._plans[cond] = predicate
+                return predicate
+        predicate = self._compile(cond)
+        with self._plans_lock:
+            self._plans[cond] = predicate
+            while len(self._plans) > self.plan_cache_size:
+                self._plans.popitem(last=False)
+        return predicate
+
+    def _compile(self, cond):
+        op, args = cond
+
+        if op in ('and', 'or'):
+            predicates = tuple(self._compile(arg) for arg in args)
+            if op == 'and':
+                def predicate(node):
+                    for p in predicates:
+                        if not p(node):
+                            return False
+                    return True
+            else:
+                def predicate(node):
+                    for p in predicates:
+                        if p(node):
+                            return True
+                    return False
+            return predicate
+
+        comparator = self.comparators.get(op)
+        if not comparator:
+            # raised at match time, the same as match()
+            def predicate(node):
+                raise NoSuchComparatorException(op, 'poco.sdk.DefaultMatcher')
+            return predicate
+
+        attribute, value = args
+        if type(comparator) is EqualizationComparator:
+            return lambda node: node.getAttr(attribute) == value
+        if type(comparator) is RegexpComparator:
+            if value is None:
+                return lambda node: False
+            try:
+                regex = re.compile(value)
+            except re.error:
+                # an invalid pattern raises at match time, the same as match()
+                compare = comparator.compare
+                return lambda node: compare(node.getAttr(attribute), value)
+
+            def predicate(node):
+                origin = node.getAttr(attribute)
+                return origin is not None and regex.match(origin) is not None
+            return predicate
+        compare = comparator.compare
+        return lambda node: compare(node.getAttr(attribute), value)
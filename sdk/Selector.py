@@ -76,6 +76,38 @@ class Selector(ISelector):
         """
         return self.selectImpl(cond, multiple, self.getRoot(), 9999, True, True)
 
+    def selectBatch(self, conds, multiple=False):
+        """
+        Select for several query expressions on one root, the same as calling :py:meth:`select` for each of them on
+        an unchanged hierarchy. Plain predicate expressions (no ``/ > - ^`` or ``index``) share a single traversal.
+        An expression whose index is out of range gives an empty result instead of raising.
+
+        Args:
+            conds (:obj:`list`): query expressions
+            multiple (:obj:`bool`): whether or not to select multiple nodes for every expression
+
+        Returns:
+            :obj:`list`: one result list per expression, in the same order
+        """
+
+        root = self.getRoot()
+        results = [[] for _ in conds]
+        plain = []
+        for k, cond in enumerate(conds):
+            if cond[0] in ('>', '/', '-', '^', 'index'):
+                try:
+                    results[k] = self.selectImpl(cond, multiple, root, 9999, True, True)
+                except NoSuchTargetException:
+                    pass
+            else:
+                plain.append(k)
+
+        if plain and root:
+            predicates = [self._compile(conds[k]) for k in plain]
+            outResults = [results[k] for k in plain]
+            self._selectTraverseBatch(predicates, root, outResults, list(range(len(plain))), multiple, 9999, True)
+        return results
+
     def selectImpl(self, cond, multiple, root, maxDepth, onlyVisibleNode, includeRoot):
         """
         Selector internal implementation. 
@@ -152,13 +184,26 @@ class Selector(ISelector):
 
         return result
 
-    def _selectTraverse(self, cond, node, outResult, multiple, maxDepth, onlyVisibleNode, includeRoot):
+    def _compile(self, cond):
+        compile_ = getattr(self.matcher, 'compile', None)
+        if compile_ is not None:
+            return compile_(cond)
+        match = self.matcher.match
+        return lambda node: match(cond, node)
+
+    def _selectTraverse(self, cond, node, outResult, multiple, maxDepth, onlyVisibleNode, includeRoot,
+                        predicate=None):
+        # the condition is compiled once per traversal, and passed down to the children
+        # 条件只在遍历开始时编译一次
+        if predicate is None:
+            predicate = self._compile(cond)
+
         # exclude invisible UI element if onlyVisibleNode specified
         # 剪掉不可见节点branch
         if onlyVisibleNode and not node.getAttr('visible'):
             return False
 
-        if self.matcher.match(cond, node):
+        if predicate(node):
             # To select node from parent or ancestor, the parent or ancestor are excluded.
             # 父子/祖先后代节点选择时，默认是不包含父节点/祖先节点的
             # 在下面的children循环中则需要包含，因为每个child在_selectTraverse中就当做是root
@@ -175,8 +220,29 @@ class Selector(ISelector):
         maxDepth -= 1
 
         for child in node.getChildren():
-            finished = self._selectTraverse(cond, child, outResult, multiple, maxDepth, onlyVisibleNode, True)
+            finished = self._selectTraverse(cond, child, outResult, multiple, maxDepth, onlyVisibleNode, True,
+                                            predicate)
             if finished:
                 return True
 
         return False
+
+    def _selectTraverseBatch(self, predicates, node, outResults, active, multiple, maxDepth, onlyVisibleNode):
+        # _selectTraverse for several predicates at once. ``active`` holds the positions of predicates still looking
+        # for matches, a predicate leaves it at its first match unless multiple
+        if onlyVisibleNode and not node.getAttr('visible'):
+            return
+
+        for k in list(active):
+            if predicates[k](node):
+                outResults[k].append(node)
+                if not multiple:
+                    active.remove(k)
+        if not active or maxDepth == 0:
+            return
+        maxDepth -= 1
+
+        for child in node.getChildren():
+            self._selectTraverseBatch(predicates, child, outResults, active, multiple, maxDepth, onlyVisibleNode)
+            if not active:
+                return
@@ -25,6 +25,22 @@ class HierarchyInterface(object):
 
         raise NotImplementedError
 
+    def batchSelect(self, queries, multiple=False):
+        """
+        Select UI element(s) for several query expressions at once. Implementations should evaluate all queries
+        against the same hierarchy state, and share work (e.g. one dump, one traversal) between them. The default
+        implementation simply calls :py:meth:`select` for each query.
+
+        Args:
+            queries (:obj:`list`): query expressions, see :py:meth:`select`
+            multiple (:obj:`bool`): same as in :py:meth:`select`, applied to every query
+
+        Returns:
+            :obj:`list` : one list of UI elements per query, in the same order as ``queries``
+        """
+
+        return [self.select(query, multiple) for query in queries]
+
     def dump(self):
         """
         Get the UI hierarchy with its origin structure and attributes, then store the structure and attributes  into
@@ -49,6 +65,38 @@ class HierarchyInterface(object):
 
         raise NotImplementedError
 
+    def getAttrs(self, nodes, names):
+        """
+        Get several attributes of UI element at once. Implementations should read all of them in one pass or one
+        round trip. The default implementation simply calls :py:meth:`getAttr` for each name.
+
+        Args:
+            nodes: UI element or list of UI elements, if there is a list of UI elements provided, then only the \
+            first UI element will be used
+            names (:obj:`list`): attribute names
+
+        Returns:
+            :obj:`list` : attribute values in the same order as ``names``
+        """
+
+        return [self.getAttr(nodes, name) for name in names]
+
+    def batchGetAttrs(self, nodes, names):
+        """
+        Get several attributes of each of several UI elements, e.g. the geometry of every element of a selection.
+        The default implementation simply calls :py:meth:`getAttrs` for each UI element.
+
+        Args:
+            nodes (:obj:`list`): UI elements
+            names (:obj:`list`): attribute names
+
+        Returns:
+            :obj:`list` : one list of attribute values (see :py:meth:`getAttrs`) per UI element, in the same order as
+            ``nodes``
+        """
+
+        return [self.getAttrs(node, names) for node in nodes]
+
     def setAttr(self, nodes, name, value):
         """
         Set attribute of UI element.
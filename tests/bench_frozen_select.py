@@ -0,0 +1,154 @@
+# coding=utf-8
+"""
+Micro-benchmark of ``FrozenUIHierarchy.select``: the former ``getRoot``
+(new ``Node`` tree and a recursive ``__parent__`` link written into the dump
+on every select) vs the ``FrozenSnapshot`` built once per dump result.
+
+No device needed. Builds a synthetic dump dict and selects on it the way a
+frozen poco (same dict on every dump) does. Checks that both give the same
+nodes, that the snapshot is reused only for the same dump object, that it
+keeps one wrapper per node and that the dump data is left untouched.
+
+Run:
+  python -m tmp.poco_v1.tests.bench_frozen_select
+"""
+from __future__ import print_function
+
+import copy
+import json
+import random
+import time
+
+from tmp.poco_v1.freezeui.hierarchy import FrozenUIDumper, FrozenUIHierarchy, Node
+from tmp.poco_v1.utils.query_util import build_query
+
+
+class LegacyNode(Node):
+    def getParent(self):
+        return self.node.get('__parent__')
+
+    def getChildren(self):
+        for child in self.node.get('children') or []:
+            yield LegacyNode(child)
+
+
+class LegacyDumper(FrozenUIDumper):
+    def __init__(self, dumps):
+        self.dumps = dumps
+
+    def dumpHierarchy(self, onlyVisibleNode=True):
+        return self.dumps()
+
+    def getRoot(self):
+        root = LegacyNode(self.dumpHierarchy())
+        self._linkParent(root)
+        return root
+
+    def _linkParent(self, root):
+        for child in root.getChildren():
+            child.node['__parent__'] = root
+            self._linkParent(child)
+
+
+class SnapshotDumper(FrozenUIDumper):
+    def __init__(self, dumps):
+        self.dumps = dumps
+
+    def dumpHierarchy(self, onlyVisibleNode=True):
+        return self.dumps()
+
+
+def build_dump(count, seed=0):
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(count):
+        nodes.append({
+            'name': 'Item {}'.format(i % 500),
+            'payload': {
+                'name': 'Item {}'.format(i % 500),
+                'type': rng.choice(['Button', 'Text', 'Layout']),
+                'visible': True,
+                'pos': [rng.random(), rng.random()],
+            },
+            'children': [],
+        })
+    for i in range(1, count):
+        nodes[rng.randrange(0, i)]['children'].append(nodes[i])
+    return nodes[0]
+
+
+QUERIES = [
+    ('name=', build_query('Item 42')),
+    ('type= (all)', build_query(None, type='Button')),
+    ('offspring', ('>', (build_query(None, type='Layout'), build_query('Item 42')))),
+    ('sibling', ('-', (build_query('Item 42'), build_query(None, type='Text')))),
+    ('parent', ('^', (build_query('Item 42'), None))),
+]
+
+
+def payloads(nodes):
+    # fresh wrappers on every traversal defeated the dedup of nodes reached along several paths, drop the repeats
+    seen = set()
+    result = []
+    for n in nodes:
+        if id(n.node) not in seen:
+            seen.add(id(n.node))
+            result.append(json.dumps(n.node['payload'], sort_keys=True))
+    return result
+
+
+def measure(hierarchy, cond, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        result = hierarchy.select(cond, True)
+    return (time.time() - start) / rounds * 1e3, result
+
+
+def measure_root(dumper):
+    start = time.time()
+    dumper.getRoot()
+    return (time.time() - start) * 1e3
+
+
+def run(count=5000, rounds=5):
+    dump = build_dump(count)
+    pristine = copy.deepcopy(dump)
+
+    print('{} nodes, ms per select'.format(count))
+    print('{:<14} {:>10} {:>10} {:>8} {:>8}'.format('query', 'legacy', 'snapshot', 'speedup', 'matches'))
+    legacy_dump = copy.deepcopy(pristine)
+    legacy_dumper = LegacyDumper(lambda: legacy_dump)
+    snapshot_dumper = SnapshotDumper(lambda: dump)
+    legacy_ms = min(measure_root(legacy_dumper) for _ in range(rounds))
+    snapshot_ms = min(measure_root(snapshot_dumper) for _ in range(rounds))
+    print('{:<14} {:>8.2f}ms {:>8.2f}ms {:>7.1f}x'.format('getRoot', legacy_ms, snapshot_ms, legacy_ms / snapshot_ms))
+    # one hierarchy for all the queries, as in a frozen poco
+    legacy_hierarchy = FrozenUIHierarchy(legacy_dumper)
+    snapshot_hierarchy = FrozenUIHierarchy(snapshot_dumper)
+    for label, cond in QUERIES:
+        legacy_ms, legacy_result = measure(legacy_hierarchy, cond, rounds)
+        snapshot_ms, result = measure(snapshot_hierarchy, cond, rounds)
+        print('{:<14} {:>8.2f}ms {:>8.2f}ms {:>7.1f}x {:>8}'.format(
+            label, legacy_ms, snapshot_ms, legacy_ms / snapshot_ms, len(result)))
+
+        # same nodes, in the same order
+        assert payloads(result) == payloads(legacy_result), label
+
+    # the same dump object reuses the snapshot, a new one (even equal) builds a new snapshot
+    dumper = SnapshotDumper(lambda: dump)
+    root = dumper.getRoot()
+    assert dumper.getRoot() is root
+    dumper.dumps = lambda: copy.deepcopy(pristine)
+    assert dumper.getRoot() is not root
+
+    # one wrapper per node, parents known without writing into the dump
+    hierarchy = FrozenUIHierarchy(SnapshotDumper(lambda: dump))
+    first = hierarchy.select(build_query('Item 42'), True)[0]
+    assert hierarchy.select(build_query('Item 42'), True)[0] is first
+    assert first in first.getParent().getChildren()
+    assert dump == pristine
+    json.dumps(dump)
+
+
+if __name__ == '__main__':
+    run()
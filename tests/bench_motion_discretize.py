@@ -0,0 +1,187 @@
+# coding=utf-8
+"""
+Micro-benchmark of ``MotionTrackBatch.discretize``: the former list based
+merge (one sleep event per millisecond, ``pop(0)`` on every step) vs the heap
+merge with coalesced sleeps, and the former ``Vec2`` stepping of
+``track_sampling`` vs sampling whole segments at once.
+
+No device needed. Builds 2-finger (pinch) and 5-finger tracks, reports the
+discretize time and event counts, and checks that both produce the same motion
+events at the same times. Then samples segments at decreasing accuracies and
+checks that the points match.
+
+Run:
+  python -m tmp.poco_v1.tests.bench_motion_discretize
+"""
+from __future__ import print_function
+
+import math
+import time
+
+from tmp.poco_v1.utils.multitouch_gesture import make_pinching
+from tmp.poco_v1.utils.track import MotionTrack, MotionTrackBatch, track_sampling
+from tmp.poco_v1.utils.vector import Vec2
+
+
+def legacy_track_sampling(track, accuracy=0.002):
+    if len(track) <= 1:
+        return track
+
+    sample_points = []
+    for i in range(len(track) - 1):
+        p0 = Vec2(track[i])
+        p1 = Vec2(track[i + 1])
+        seg_length = (p1 - p0).length
+        d = (p1 - p0).unit() * accuracy
+        sp = p0
+        while (sp - p0).length < seg_length:
+            sample_points.append(sp.to_list())
+            sp = sp + d
+
+    sample_points.append(track[-1])
+    return sample_points
+
+
+def legacy_track_discretize(track, contact_id=0, accuracy=0.004, dt=0.001):
+    if not track.event_points:
+        return []
+
+    events = []
+    action_dt = accuracy / track.speed
+    dt = dt or action_dt
+
+    ep0 = track.event_points[0]
+    for _ in range(int(ep0[0] / dt)):
+        events.append(['s', dt])
+    events.append(['d', ep0[1], contact_id])
+    for i, ep in enumerate(track.event_points[1:]):
+        prev_ts = track.event_points[i][0]
+        curr_ts = ep[0]
+        p0 = track.event_points[i][1]
+        p1 = ep[1]
+        if p0 == p1:
+            for _ in range(int((curr_ts - prev_ts) / dt)):
+                events.append(['s', dt])
+        else:
+            # the current sampling, so that the comparison is about the merge only
+            dpoints = track_sampling([p0, p1], accuracy)
+            for p in dpoints:
+                events.append(['m', p, contact_id])
+                for _ in range(int(action_dt / dt)):
+                    events.append(['s', dt])
+
+    events.append(['u', contact_id])
+    return events
+
+
+def legacy_discretize(tracks, accuracy=0.004):
+    if accuracy < 0.001:
+        accuracy = 0.001
+    events = []
+    discretized_tracks = [legacy_track_discretize(t, i, accuracy) for i, t in enumerate(tracks)]
+
+    while discretized_tracks:
+        for dtrack in discretized_tracks:
+            while True:
+                evt = dtrack[0]
+                if evt[0] != 's':
+                    events.append(evt)
+                    dtrack.pop(0)
+                else:
+                    break
+                if not dtrack:
+                    break
+
+        discretized_tracks = list(filter(lambda a: a != [], discretized_tracks))
+
+        while discretized_tracks and all(dtrack[0][0] == 's' for dtrack in discretized_tracks):
+            evt_sleep = discretized_tracks[0][0]
+            if events:
+                prev_evt = events[-1]
+                if prev_evt[0] == 's':
+                    prev_evt[1] += evt_sleep[1]
+                    events[-1] = prev_evt
+                else:
+                    events.append(evt_sleep)
+            else:
+                events.append(evt_sleep)
+            for dtrack in discretized_tracks:
+                dtrack.pop(0)
+
+            discretized_tracks = list(filter(lambda a: a != [], discretized_tracks))
+
+    return events
+
+
+def timeline(events):
+    # motion events with their start time in whole milliseconds
+    at = 0.0
+    result = []
+    for e in events:
+        if e[0] == 's':
+            at += e[1]
+        else:
+            result.append((int(round(at * 1000)), e))
+    return result
+
+
+def five_fingers(duration):
+    tracks = []
+    for i in range(5):
+        angle = 2 * math.pi * i / 5
+        start = [0.5 + 0.1 * math.cos(angle), 0.5 + 0.1 * math.sin(angle)]
+        end = [0.5 + 0.4 * math.cos(angle), 0.5 + 0.4 * math.sin(angle)]
+        track = MotionTrack([start], speed=0.3 / duration)
+        track.hold(0.2 * i).move(end).hold(0.3)
+        tracks.append(track)
+    return tracks
+
+
+CASES = [
+    ('pinch 0.5s', lambda: make_pinching('in', [0.5, 0.5], [1, 1], 0.6, 0.1, 0.5)),
+    ('pinch 2s', lambda: make_pinching('out', [0.5, 0.5], [1, 1], 0.8, 0.1, 2.0)),
+    ('5 fingers 1s', lambda: five_fingers(1.0)),
+    ('5 fingers 3s', lambda: five_fingers(3.0)),
+]
+
+
+def measure(fn, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        result = fn()
+    return (time.time() - start) / rounds * 1e3, result
+
+
+def run_sampling(rounds=20):
+    track = [[0.1, 0.1], [0.7, 0.9], [0.2, 0.5]]
+    print('{:<14} {:>10} {:>10} {:>8} {:>9}'.format('accuracy', 'Vec2', 'segment', 'speedup', 'points'))
+    for accuracy in (0.01, 0.002, 0.0005, 0.0001):
+        legacy_ms, legacy_points = measure(lambda: legacy_track_sampling(track, accuracy), rounds)
+        sampling_ms, points = measure(lambda: track_sampling(track, accuracy), rounds)
+        print('{:<14} {:>8.2f}ms {:>8.2f}ms {:>7.1f}x {:>9}'.format(
+            accuracy, legacy_ms, sampling_ms, legacy_ms / sampling_ms, len(points)))
+
+        # the Vec2 stepping accumulates rounding errors, so the point count may differ by one per segment
+        assert abs(len(points) - len(legacy_points)) <= len(track) - 1, (len(points), len(legacy_points))
+        for p, q in zip(points[:len(points) // 3], legacy_points):
+            assert abs(p[0] - q[0]) < 1e-9 and abs(p[1] - q[1]) < 1e-9, (p, q)
+
+
+def run(rounds=3):
+    print('{:<14} {:>10} {:>10} {:>8} {:>9} {:>9}'.format('tracks', 'legacy', 'heap', 'speedup', 'events', 'legacy'))
+    for label, make_tracks in CASES:
+        tracks = make_tracks()
+        accuracy = 0.004
+        legacy_ms, legacy_events = measure(lambda: legacy_discretize(tracks, accuracy), rounds)
+        heap_ms, events = measure(lambda: MotionTrackBatch(tracks).discretize(accuracy), rounds)
+        print('{:<14} {:>8.1f}ms {:>8.1f}ms {:>7.1f}x {:>9} {:>9}'.format(
+            label, legacy_ms, heap_ms, legacy_ms / heap_ms, len(events), len(legacy_events)))
+
+        # same motion events at the same times
+        assert timeline(events) == timeline(legacy_events), label
+    print()
+    run_sampling()
+
+
+if __name__ == '__main__':
+    run()
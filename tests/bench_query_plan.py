@@ -0,0 +1,146 @@
+# coding=utf-8
+"""
+Micro-benchmark of query matching: interpreted ``DefaultMatcher.match`` vs
+the compiled predicate from ``DefaultMatcher.compile``.
+
+No device needed. Builds a synthetic tree of plain nodes and reports the
+per-node match cost for typical query shapes, plus a full ``Selector``
+traversal. Also checks that cached plans follow changes of the matcher's
+comparators and that an invalid regexp raises when matching, as before.
+
+Run:
+  python -m tmp.poco_v1.tests.bench_query_plan
+"""
+from __future__ import print_function
+
+import random
+import time
+
+from tmp.poco_v1.sdk.AbstractNode import AbstractNode
+from tmp.poco_v1.sdk.DefaultMatcher import DefaultMatcher
+from tmp.poco_v1.sdk.Selector import Selector
+from tmp.poco_v1.utils.query_util import build_query
+
+
+class BenchNode(AbstractNode):
+    def __init__(self, attrs, children=()):
+        self.attrs = attrs
+        self.children = list(children)
+        self.parent = None
+        for c in self.children:
+            c.parent = self
+
+    def getParent(self):
+        return self.parent
+
+    def getChildren(self):
+        return self.children
+
+    def getAttr(self, attrName):
+        return self.attrs.get(attrName)
+
+
+class BenchDumper(object):
+    def __init__(self, root):
+        self.root = root
+
+    def getRoot(self):
+        return self.root
+
+
+def build_tree(count, seed=0):
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(count):
+        nodes.append(BenchNode({
+            'name': 'Item {}'.format(i % 500),
+            'type': rng.choice(['android.widget.TextView', 'android.widget.Button', 'android.view.View']),
+            'text': 'Item {}'.format(i % 500),
+            'resourceId': 'com.app:id/item_{}'.format(i % 50),
+            'visible': True,
+        }))
+    # attach every node under a random earlier one
+    children = [[] for _ in nodes]
+    for i in range(1, count):
+        children[rng.randrange(0, i)].append(nodes[i])
+    for node, c in zip(nodes, children):
+        node.children = c
+        for child in c:
+            child.parent = node
+    return nodes
+
+
+QUERIES = [
+    ('name=', build_query('Item 42')),
+    ('name= & type=', build_query('Item 42', type='android.widget.Button')),
+    ('textMatches', build_query(None, textMatches='^Item 4.*$')),
+    ('3 preds & regexp', build_query('Item 42', type='android.widget.Button', resourceIdMatches='.*item_4$')),
+]
+
+
+def per_node(fn, nodes, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        for n in nodes:
+            fn(n)
+    return (time.time() - start) / (rounds * len(nodes)) * 1e9
+
+
+def check_plan_cache(nodes):
+    class PrefixComparator(object):
+        def compare(self, origin, prefix):
+            return origin is not None and origin.startswith(prefix)
+
+    matcher = DefaultMatcher()
+    cond = ('attr=', ('text', 'Item 1'))
+    assert sum(map(matcher.compile(cond), nodes)) < sum(1 for n in nodes if n.getAttr('text').startswith('Item 1'))
+    matcher.comparators['attr='] = PrefixComparator()
+    assert sum(map(matcher.compile(cond), nodes)) == sum(1 for n in nodes if n.getAttr('text').startswith('Item 1'))
+
+    predicate = matcher.compile(('attr.*=', ('text', '(')))
+    assert not predicate(BenchNode({}))
+    try:
+        predicate(nodes[0])
+    except Exception:
+        pass
+    else:
+        raise AssertionError('invalid regexp should raise when matching')
+
+
+def run(count=5000, rounds=5):
+    check_plan_cache(build_tree(600))
+    nodes = build_tree(count)
+    matcher = DefaultMatcher()
+    print('{} nodes, ns per node match'.format(count))
+    print('{:<20} {:>12} {:>12} {:>8}'.format('query', 'match()', 'compiled', 'speedup'))
+    for label, cond in QUERIES:
+        interpreted = per_node(lambda n: matcher.match(cond, n), nodes, rounds)
+        predicate = matcher.compile(cond)
+        compiled = per_node(predicate, nodes, rounds)
+        print('{:<20} {:>12.0f} {:>12.0f} {:>7.1f}x'.format(label, interpreted, compiled, interpreted / compiled))
+
+        # compiled and interpreted must agree
+        assert [matcher.match(cond, n) for n in nodes] == [predicate(n) for n in nodes], label
+
+    class InterpretedSelector(Selector):
+        def _compile(self, cond):
+            match = self.matcher.match
+            return lambda node: match(cond, node)
+
+    dumper = BenchDumper(nodes[0])
+    for label, cond in QUERIES:
+        results = []
+        timings = []
+        for selector in (InterpretedSelector(dumper), Selector(dumper)):
+            start = time.time()
+            for _ in range(rounds):
+                result = selector.select(cond, True)
+            timings.append((time.time() - start) / rounds * 1e3)
+            results.append(result)
+        assert results[0] == results[1], label
+        print('select {:<13} {:>9.2f}ms {:>9.2f}ms  ({} matches)'.format(label, timings[0], timings[1],
+                                                                      len(results[0])))
+
+
+if __name__ == '__main__':
+    run()
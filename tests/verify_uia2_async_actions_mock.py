@@ -0,0 +1,128 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for the async_actions mode of Poco, on the
+UIAutomator2 driver.
+
+No device needed. A FakeDevice takes a while per click and shows its click
+count in the hierarchy. Checks that:
+ - actions return futures at once and run in order on one worker thread
+ - pre and post action callbacks fire in order, on the worker
+ - hierarchy reads wait for the queued actions and see their effect, once
+   per read however many reads are nested in it
+ - a failed action is raised by the next read, the actions queued behind it
+   are cancelled, and the pipeline is usable again afterwards
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_async_actions_mock
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent
+from tmp.poco_v1.pocofw import Poco
+# the exception classes the proxy and the pipeline raise (they import the absolute poco package)
+from tmp.poco_v1.proxy import PocoNoSuchNodeException
+from tmp.poco_v1.utils.pipeline import PocoActionCancelledException
+
+CLICK_TIME = 0.2
+
+
+class FakeDevice(object):
+    def __init__(self):
+        self.info = {'displayWidth': 1080, 'displayHeight': 1920, 'displayRotation': 0}
+        self.clicks = []
+
+    def window_size(self):
+        return self.info['displayWidth'], self.info['displayHeight']
+
+    def dump_hierarchy(self, compressed=False):
+        return (
+            '<hierarchy rotation="0">'
+            '<node index="0" text="{}" resource-id="com.app:id/count" class="android.widget.TextView" '
+            'package="com.app" content-desc="" bounds="[0,0][1080,100]" enabled="true" visible-to-user="true" />'
+            '</hierarchy>'
+        ).format(len(self.clicks))
+
+    def click(self, x, y):
+        time.sleep(CLICK_TIME)
+        self.clicks.append((x, y, threading.current_thread().name))
+
+    def long_click(self, x, y, duration):
+        self.click(x, y)
+
+
+def make_poco():
+    device = FakeDevice()
+    poco = Poco(AndroidUiautomator2Agent(device), async_actions=True, action_interval=0.05,
+                pre_action_wait_for_appearance=0.2)
+    return device, poco
+
+
+def check_order_and_barrier():
+    device, poco = make_poco()
+    callbacks = []
+    poco.add_pre_action_callback(lambda p, action, ui, args: callbacks.append(('pre', action)))
+    poco.add_post_action_callback(lambda p, action, ui, args: callbacks.append(('post', action)))
+
+    start = time.time()
+    first = poco(resourceId='com.app:id/count').click()
+    second = poco.click([0.5, 0.9])
+    third = poco(resourceId='com.app:id/count').long_click(duration=0.1)
+    assert time.time() - start < CLICK_TIME, time.time() - start
+    assert not first.done()
+
+    # the read waits for the three actions
+    assert poco(resourceId='com.app:id/count').get_text() == '3'
+    assert first.done() and second.done() and third.done()
+    assert [(x, y) for x, y, _ in device.clicks] == [(540, 50), (540, 1728), (540, 50)], device.clicks
+    assert all(name == 'poco-actions' for _, _, name in device.clicks)
+    assert callbacks == [('pre', 'click'), ('post', 'click'), ('pre', 'long_click'), ('post', 'long_click')]
+
+
+def check_single_barrier():
+    device, poco = make_poco()
+    waits = []
+    wait_for_actions = poco.wait_for_actions
+
+    def counted(timeout=None):
+        waits.append(timeout)
+        return wait_for_actions(timeout)
+
+    poco.wait_for_actions = counted
+    proxy = poco(resourceId='com.app:id/count')
+    for read in (proxy.exists, proxy.get_text, proxy.get_position, lambda: len(proxy)):
+        del waits[:]
+        read()
+        assert len(waits) == 1, (read, waits)
+
+
+def check_failure():
+    device, poco = make_poco()
+    failed = poco('missing').click()
+    cancelled = poco.click([0.1, 0.1])
+    try:
+        poco(resourceId='com.app:id/count').exists()
+    except PocoNoSuchNodeException:
+        pass
+    else:
+        assert False, 'failure of the queued click not raised'
+    assert isinstance(failed.exception(), PocoNoSuchNodeException)
+    assert isinstance(cancelled.exception(), PocoActionCancelledException)
+    assert device.clicks == []
+
+    # raised once, then the pipeline works again
+    poco.click([0.1, 0.1])
+    assert poco(resourceId='com.app:id/count').get_text() == '1'
+
+
+def run():
+    check_order_and_barrier()
+    check_single_barrier()
+    check_failure()
+    print('SUCCESS: Async actions mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
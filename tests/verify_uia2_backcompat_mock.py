@@ -9,6 +9,8 @@ device.dump_hierarchy() return to validate that:
  - 'package' attribute is preserved in payload for all nodes
  - Visibility filtering is bypassed (nodes with visible-to-user="false" remain)
  - Normalized coordinates (pos/size/bounds) are computed correctly
+ - A cold dump takes the display rotation from the dump root, without
+   reading device.info for it
 
 Run:
   python -m tmp.poco_v1.tests.verify_uia2_backcompat_mock
@@ -68,7 +70,16 @@ def count_total_nodes(dump_dict):
     return _rec(dump_dict)
 
 
+def check_cold_dump_rotation():
+    dev = FakeDevice(build_sample_xml().replace('<hierarchy>', '<hierarchy rotation="1">'), 1920, 1080)
+    dumper = UIAutomator2Dumper(dev)
+    dumper.dumpHierarchy()
+    assert dumper.geometry.rotation_queries == 0, dumper.geometry.rotation_queries
+    assert dumper.geometry.get_size() == (1920, 1080)
+
+
 def run():
+    check_cold_dump_rotation()
     xml = build_sample_xml()
     dev = FakeDevice(xml, 1080, 1920)
     dumper = UIAutomator2Dumper(dev)
@@ -0,0 +1,113 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for the fast input IME session of the
+UIAutomator2 driver.
+
+No device needed. A FakeDevice records its IME switches. Checks that:
+ - texts set on nodes without resource id switch to the fast IME only once
+ - the pixel position comes from the cached screen geometry, not device.info
+ - the previous input method is restored after the idle timeout
+ - a fast_input() block keeps the fast IME and restores it when it ends
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_fast_ime_mock
+"""
+from __future__ import print_function
+
+import time
+
+from tmp.poco_v1.drivers.android.ime import FAST_INPUT_IME
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent
+from tmp.poco_v1.pocofw import Poco
+
+
+class FakeDevice(object):
+    def __init__(self):
+        self.ime = 'com.example/.Keyboard'
+        self.calls = []
+        self.info_reads = 0
+
+    @property
+    def info(self):
+        self.info_reads += 1
+        return {'displayWidth': 1080, 'displayHeight': 1920, 'displayRotation': 0}
+
+    def window_size(self):
+        return 1080, 1920
+
+    def dump_hierarchy(self, compressed=False):
+        fields = ''.join(
+            '<node index="{0}" text="" resource-id="" class="android.widget.EditText" package="com.app" '
+            'content-desc="field{0}" bounds="[0,{1}][1080,{2}]" enabled="true" visible-to-user="true" />'.format(
+                i, i * 200, i * 200 + 100)
+            for i in range(3))
+        return '<hierarchy rotation="0">{}</hierarchy>'.format(fields)
+
+    def click(self, x, y):
+        self.calls.append(('click', x, y))
+
+    def current_ime(self):
+        return self.ime, True
+
+    def set_fastinput_ime(self, enable):
+        self.calls.append(('set_fastinput_ime', enable))
+        if enable:
+            self.ime = FAST_INPUT_IME
+
+    def shell(self, cmd):
+        self.calls.append(('shell', tuple(cmd)))
+        if cmd[:2] == ['ime', 'set']:
+            self.ime = cmd[2]
+
+    def send_keys(self, text, clear=False):
+        assert self.ime == FAST_INPUT_IME
+        self.calls.append(('send_keys', text))
+
+
+def switches(device):
+    return [c for c in device.calls if c[0] in ('set_fastinput_ime', 'shell')]
+
+
+def fill(poco, texts):
+    for i, text in enumerate(texts):
+        poco(contentDesc='field{}'.format(i)).set_text(text)
+
+
+def check_idle_restore():
+    device = FakeDevice()
+    poco = Poco(AndroidUiautomator2Agent(device, fast_ime_idle_timeout=0.3))
+    fill(poco, ['a', 'b', 'c'])
+    info_reads = device.info_reads
+    assert switches(device) == [('set_fastinput_ime', True)], device.calls
+    assert [c for c in device.calls if c[0] == 'click'][1] == ('click', 540, 250), device.calls
+    assert poco.agent.ime.get_stats()['texts_sent'] == 3
+
+    time.sleep(0.6)
+    assert switches(device)[1:] == [('set_fastinput_ime', False), ('shell', ('ime', 'set', 'com.example/.Keyboard'))]
+    assert device.ime == 'com.example/.Keyboard'
+    assert not poco.agent.ime.is_active()
+    assert device.info_reads == info_reads, 'screen size read again'
+
+
+def check_held():
+    device = FakeDevice()
+    agent = AndroidUiautomator2Agent(device, fast_ime_idle_timeout=0.1)
+    poco = Poco(agent)
+    with agent.ime.hold():
+        fill(poco, ['a', 'b'])
+        time.sleep(0.3)
+        assert agent.ime.is_active()
+        fill(poco, ['c'])
+    assert not agent.ime.is_active()
+    assert agent.ime.get_stats()['activations'] == 1 and agent.ime.get_stats()['restores'] == 1
+    assert device.ime == 'com.example/.Keyboard'
+
+
+def run():
+    check_idle_restore()
+    check_held()
+    print('SUCCESS: Fast input IME mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,157 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for the continuous screen stream of the
+UIAutomator2 driver.
+
+No device needed. A FakeDevice encodes a new JPEG frame on every screenshot
+(taking a while, like a real device) and a FakeAdbDevice serves raw
+``screencap`` output. Checks that:
+ - a snapshot is served from the latest captured frame without a round trip
+ - after an input action only a frame captured later is served
+ - the stream stops by itself when idle and restarts on demand
+ - without a usable frame (slow or failing captures) a direct capture is used
+ - raw screencap output (old and new header) is decoded and re-encoded
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_frame_source_mock
+"""
+from __future__ import print_function
+
+import base64
+import io
+import struct
+import time
+
+from PIL import Image
+
+from tmp.poco_v1.drivers.android.framesource import LatestFrameSource, screencap_capture
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent
+from tmp.poco_v1.pocofw import Poco
+
+CAPTURE_TIME = 0.1
+
+
+class FakeDevice(object):
+    def __init__(self, width=216, height=384):
+        self.info = {'displayWidth': width, 'displayHeight': height, 'displayRotation': 0}
+        self.screenshots = 0
+
+    def window_size(self):
+        return self.info['displayWidth'], self.info['displayHeight']
+
+    def dump_hierarchy(self, compressed=False):
+        return '<hierarchy rotation="0" />'
+
+    def click(self, x, y):
+        pass
+
+    def screenshot(self, format='pillow'):
+        time.sleep(CAPTURE_TIME)
+        self.screenshots += 1
+        buf = io.BytesIO()
+        Image.new('RGB', self.window_size(), (self.screenshots % 256, 0, 0)).save(buf, format='JPEG')
+        return buf.getvalue()
+
+
+class FakeConnection(object):
+    def __init__(self, data):
+        self.data = data
+        self.commands = []
+
+    def send_command(self, cmd):
+        self.commands.append(cmd)
+
+    def check_okay(self):
+        pass
+
+    def read(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeAdbDevice(object):
+    def __init__(self, header_fields):
+        self.header_fields = header_fields
+
+    def open_transport(self):
+        width, height = 4, 3
+        header = struct.pack('<{}I'.format(len(self.header_fields) + 2), width, height, *self.header_fields)
+        return FakeConnection(header + b'\x10\x20\x30\xff' * width * height)
+
+
+def frame_red(b64):
+    return Image.open(io.BytesIO(base64.b64decode(b64))).convert('RGB').getpixel((0, 0))[0]
+
+
+def check_latest_frame():
+    device = FakeDevice()
+    poco = Poco(AndroidUiautomator2Agent(device, screen_stream='screenshot', screen_stream_idle_timeout=0.5))
+    b64, fmt = poco.snapshot()
+    assert fmt == 'jpg', fmt
+
+    # the stream keeps capturing, the next snapshots come from memory
+    time.sleep(2 * CAPTURE_TIME)
+    served = poco.agent.frame_source.get_stats()['frames_served']
+    for _ in range(5):
+        poco.snapshot()
+    served = poco.agent.frame_source.get_stats()['frames_served'] - served
+    assert served == 5, served
+
+    # after an action the frame must be captured later than the action
+    before = device.screenshots
+    poco.click([0.5, 0.5])
+    b64, _ = poco.snapshot()
+    assert frame_red(b64) > before, (frame_red(b64), before)
+
+    # idle stream stops, and starts again on the next snapshot
+    time.sleep(0.5 + 3 * CAPTURE_TIME)
+    assert not poco.agent.frame_source.is_running()
+    stopped_at = device.screenshots
+    time.sleep(2 * CAPTURE_TIME)
+    assert device.screenshots == stopped_at
+    assert poco.snapshot()[0] is not None and poco.agent.frame_source.is_running()
+    stats = poco.agent.frame_source.get_stats()
+    assert stats['frames_served'] == 8 and stats['capture_errors'] == 0, stats
+
+
+def check_fallback():
+    # no frame in time: capture directly
+    source = LatestFrameSource(lambda: time.sleep(1), idle_timeout=0.5)
+    assert source.latest(timeout=0.1) == (None, 0)
+
+    def broken():
+        raise IOError('screencap not supported')
+
+    # failing captures: no waiting for the timeout
+    source = LatestFrameSource(broken, idle_timeout=0.5)
+    start = time.time()
+    assert source.latest(timeout=2) == (None, 0)
+    assert time.time() - start < 0.5 and source.capture_errors >= 1
+
+
+def check_screencap():
+    for fields in ([1], [1, 0]):  # pixel format, plus color space since Android 8
+        frame = screencap_capture(FakeAdbDevice(fields))()
+        assert frame.size == (4, 3) and frame.getpixel((0, 0)) == (0x10, 0x20, 0x30, 0xff)
+
+    device = FakeDevice()
+    device._adb_device = FakeAdbDevice([1, 0])
+    poco = Poco(AndroidUiautomator2Agent(device, screen_stream='screencap'))
+    b64, fmt = poco.snapshot(width=8)
+    image = Image.open(io.BytesIO(base64.b64decode(b64)))
+    assert fmt == 'jpg' and image.size == (8, 6), (fmt, image.size)
+    assert device.screenshots == 0
+
+
+def run():
+    check_latest_frame()
+    check_fallback()
+    check_screencap()
+    print('SUCCESS: Frame source mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
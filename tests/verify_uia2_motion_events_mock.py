@@ -0,0 +1,176 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for the motion event engine of the
+UIAutomator2 driver.
+
+No device needed. Checks that the discretized motion events of Poco gestures
+compile into the fewest device calls:
+ - a tap and a long tap become one click / long_click
+ - a steady swipe becomes one swipe_points call, with short segments merged
+ - a drag with holds becomes touch down / move / up calls at the right times
+ - gestures with several contacts (a pinch, three fingers, a finger
+   touching again, a pinch with holds) compile to per-contact pointer calls
+   keeping every point and hold, and are rejected without a multi-touch
+   backend
+and that playing the calls keeps to the schedule despite slow device calls.
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_motion_events_mock
+"""
+from __future__ import print_function
+
+import time
+
+# the exception class the motion module raises (it imports the absolute poco package)
+from tmp.poco_v1.drivers.android.motion import compile_motion_events, play_motion_calls, InvalidOperationException
+from tmp.poco_v1.utils.multitouch_gesture import make_pinching
+from tmp.poco_v1.utils.track import MotionTrack, MotionTrackBatch
+
+
+def to_px(x, y):
+    return int(x * 1000), int(y * 2000)
+
+
+def methods(calls):
+    return [method for _, method, _ in calls]
+
+
+class FakeTouch(object):
+    def __init__(self, device):
+        self.device = device
+
+    def __getattr__(self, name):
+        return lambda *args: self.device.record(name, args)
+
+
+class FakeDevice(object):
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = []
+        self.start = time.time()
+        self.touch = FakeTouch(self)
+
+    def record(self, name, args):
+        self.calls.append((time.time() - self.start, name, args))
+        time.sleep(self.latency)
+
+
+class FakeMultiTouch(FakeTouch):
+    pass
+
+
+def rejected(events):
+    try:
+        compile_motion_events(events, to_px)
+    except InvalidOperationException:
+        return True
+    return False
+
+
+def check_taps():
+    calls = compile_motion_events([['d', [0.5, 0.5], 0], ['s', 0.05], ['u', 0]], to_px)
+    assert calls == [(0.0, 'click', (500, 1000))], calls
+    calls = compile_motion_events([['d', [0.5, 0.5], 0], ['s', 1.0], ['u', 0]], to_px)
+    assert calls == [(0.0, 'long_click', (500, 1000, 1.0))], calls
+
+
+def check_swipe():
+    track = MotionTrack([[0.5, 0.8], [0.5, 0.2]], speed=1.2)
+    calls = compile_motion_events(MotionTrackBatch([track]).discretize(0.004), to_px)
+    assert methods(calls) == ['swipe_points'], methods(calls)
+    points, segment_duration = calls[0][2]
+    assert points[0] == (500, 1600) and points[-1] == (500, 400), points
+    # 3.3ms apart points are merged to whole 5ms uiautomator steps
+    assert segment_duration >= 0.005 and len(points) < 150, (segment_duration, len(points))
+    assert abs((len(points) - 1) * int(segment_duration * 200) * 0.005 - 0.5) < 0.05
+
+
+def check_drag_with_holds():
+    # poco.start_gesture([0.5, 0.5]).hold(0.5).to([0.6, 0.6]).hold(0.3).to([0.5, 0.5]).up()
+    track = MotionTrack()
+    track.start([0.5, 0.5])
+    track.hold(0.5).move([0.6, 0.6]).hold(0.3).move([0.5, 0.5])
+    calls = compile_motion_events(MotionTrackBatch([track]).discretize(), to_px)
+    assert methods(calls)[0] == 'down' and methods(calls)[-1] == 'up', methods(calls)
+    assert set(methods(calls)[1:-1]) == {'move'}
+    assert 0.49 < calls[1][0] < 0.52, calls[1]
+    assert calls[-1][2] == (500, 1000)
+
+
+def check_pinch():
+    tracks = make_pinching('in', [0.5, 0.5], [1, 1], 0.6, 0.1, 0.5)
+    events = MotionTrackBatch(tracks).discretize(0.005)
+    assert rejected(events)
+    calls = compile_motion_events(events, to_px, multitouch=True)
+    assert methods(calls)[:2] == ['pointer_down'] * 2 and methods(calls)[-2:] == ['pointer_up'] * 2, methods(calls)
+    for contact in (0, 1):
+        points = [args[:2] for _, _, args in calls if args[2] == contact]
+        # the finger moves towards the center
+        assert abs(points[-1][0] - 500) < abs(points[0][0] - 500), points
+
+
+def check_multiple_contacts():
+    three = [['d', [0.1, 0.1], 0], ['d', [0.2, 0.2], 1], ['s', 0.1], ['d', [0.3, 0.3], 2], ['s', 0.1],
+             ['m', [0.3, 0.4], 2], ['s', 0.1], ['u', 0], ['u', 1], ['u', 2]]
+    assert rejected(three)
+    calls = compile_motion_events(three, to_px, multitouch=True)
+    assert [(round(at, 3), method, args[2]) for at, method, args in calls] == [
+        (0.0, 'pointer_down', 0), (0.0, 'pointer_down', 1), (0.1, 'pointer_down', 2), (0.2, 'pointer_move', 2),
+        (0.3, 'pointer_up', 0), (0.3, 'pointer_up', 1), (0.3, 'pointer_up', 2)], calls
+    assert calls[3][2] == (300, 800, 2)
+
+    # a finger lifting and touching again while the other one is down
+    again = [['d', [0.1, 0.1], 0], ['d', [0.5, 0.5], 1], ['s', 0.1], ['u', 0], ['d', [0.2, 0.2], 0], ['s', 0.1],
+             ['u', 0], ['u', 1]]
+    assert rejected(again)
+    calls = compile_motion_events(again, to_px, multitouch=True)
+    assert [(method, args[2]) for _, method, args in calls] == [
+        ('pointer_down', 0), ('pointer_down', 1), ('pointer_up', 0), ('pointer_down', 0), ('pointer_up', 1),
+        ('pointer_up', 0)], calls
+
+    # a pinch holding at the end keeps its hold
+    tracks = make_pinching('in', [0.5, 0.5], [1, 1], 0.6, 0.1, 0.5)
+    for track in tracks:
+        track.hold(0.5)
+    events = MotionTrackBatch(tracks).discretize(0.005)
+    assert rejected(events)
+    calls = compile_motion_events(events, to_px, multitouch=True)
+    moves = [at for at, method, _ in calls if method == 'pointer_move']
+    ups = [at for at, method, _ in calls if method == 'pointer_up']
+    assert len(moves) > 20 and min(ups) - max(moves) > 0.45, (len(moves), ups, moves[-1])
+
+    # played through the backend
+    device = FakeDevice(latency=0)
+    multitouch = FakeMultiTouch(device)
+    play_motion_calls(device, compile_motion_events(three, to_px, multitouch=True), multitouch)
+    assert [name for _, name, _ in device.calls] == ['down', 'down', 'down', 'move', 'up', 'up', 'up']
+    assert 0.29 < device.calls[-1][0] < 0.35, device.calls[-1]
+
+
+def check_schedule():
+    # 20 moves 10ms apart on a device taking 25ms per call: late moves are skipped and the up is still on time
+    events = [['d', [0.0, 0.5], 0]]
+    for i in range(1, 21):
+        events += [['s', 0.01], ['m', [i / 100.0, 0.5], 0]]
+    events += [['s', 0.2], ['u', 0]]
+    calls = compile_motion_events(events, to_px)
+    device = FakeDevice(latency=0.025)
+    performed = play_motion_calls(device, calls)
+    assert performed < len(calls), (performed, len(calls))
+    up_at, name, args = device.calls[-1]
+    assert name == 'up' and args == (200, 1000), device.calls[-1]
+    assert 0.4 - 0.02 < up_at < 0.4 + 0.04, up_at
+
+
+def run():
+    check_taps()
+    check_swipe()
+    check_drag_with_holds()
+    check_pinch()
+    check_multiple_contacts()
+    check_schedule()
+    print('SUCCESS: Motion events mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,168 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for the multi-device ParallelRunner of the
+UIAutomator2 driver.
+
+No device needed. Every "device" is a FakeDevice serving its own hierarchy
+dump, wrapped in a real AndroidUiautomator2Agent and Poco. Checks that:
+ - every device runs the test on its own Poco instance
+ - failures, errors and Poco creation errors are reported per device
+ - concurrency stays within max_workers and devices take turns (round robin)
+ - a test past its timeout is reported at the deadline, the rest of its
+   device is skipped, and the other devices are not held up
+ - results are streamed as they complete
+ - rerunning a device after a timeout gives it a new Poco instance, not the
+   one the abandoned thread is still using
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_parallel_runner_mock
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+from tmp.poco_v1.drivers.android.parallel import ParallelRunner, DeviceResult
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent
+from tmp.poco_v1.pocofw import Poco
+
+
+class FakeDevice(object):
+    def __init__(self, serial, width=1080, height=1920):
+        self.serial = serial
+        self.info = {'displayWidth': width, 'displayHeight': height, 'displayRotation': 0}
+
+    def window_size(self):
+        return self.info['displayWidth'], self.info['displayHeight']
+
+    def dump_hierarchy(self, compressed=False):
+        return (
+            '<hierarchy rotation="0">'
+            '<node index="0" text="{}" resource-id="com.app:id/serial" class="android.widget.TextView" '
+            'package="com.app" content-desc="" bounds="[0,0][1080,100]" enabled="true" visible-to-user="true" />'
+            '</hierarchy>'
+        ).format(self.serial)
+
+
+def fake_poco(device_id):
+    if device_id == 'offline':
+        raise RuntimeError('Failed to connect to Android device: offline')
+    return Poco(AndroidUiautomator2Agent(FakeDevice(device_id)))
+
+
+def read_serial(poco, device_id):
+    text = poco(resourceId='com.app:id/serial').get_text()
+    assert text == device_id, 'device {} shows {}'.format(device_id, text)
+    return id(poco)
+
+
+def check_results_per_device():
+    devices = ['dev-{}'.format(i) for i in range(4)]
+    report = ParallelRunner(devices, poco_factory=fake_poco).run(read_serial)
+    assert report.ok, report.failures
+    assert sorted(r.device_id for r in report.results) == devices
+    # one Poco instance per device
+    assert len(set(r.value for r in report.results)) == len(devices)
+
+
+def check_failures():
+    def flaky(poco, device_id):
+        if device_id == 'dev-bad':
+            assert False, 'bad device'
+        if device_id == 'dev-broken':
+            raise ValueError('broken')
+        return read_serial(poco, device_id)
+
+    report = ParallelRunner(['dev-ok', 'dev-bad', 'dev-broken', 'offline'], poco_factory=fake_poco).run(flaky)
+    status = {r.device_id: r.status for r in report.results}
+    assert status == {
+        'dev-ok': DeviceResult.PASSED,
+        'dev-bad': DeviceResult.FAILED,
+        'dev-broken': DeviceResult.ERROR,
+        'offline': DeviceResult.ERROR,
+    }, status
+    assert 'bad device' in report.by_device()['dev-bad'][0].traceback
+    summary = report.summary()
+    assert (summary['passed'], summary['failed'], summary['error']) == (1, 1, 2), summary
+
+
+def check_bounded_and_fair():
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+    starts = []
+
+    def make_test(n):
+        def test(poco, device_id):
+            with lock:
+                starts.append(device_id)
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.05)
+            with lock:
+                state['running'] -= 1
+        test.__name__ = 'test_{}'.format(n)
+        return test
+
+    devices = ['dev-a', 'dev-b', 'dev-c']
+    report = ParallelRunner(devices, max_workers=2, poco_factory=fake_poco).run([make_test(n) for n in range(3)])
+    assert report.ok and len(report.results) == 9
+    assert state['peak'] <= 2, state
+    # with one slot, devices take turns instead of one device running all its tests first
+    del starts[:]
+    ParallelRunner(devices, max_workers=1, poco_factory=fake_poco).run([make_test(n) for n in range(3)])
+    assert starts == devices * 3, starts
+
+
+def check_timeout_and_streaming():
+    def test(poco, device_id):
+        time.sleep(5 if device_id == 'dev-hung' else 0.05)
+
+    def second(poco, device_id):
+        pass
+
+    runner = ParallelRunner(['dev-hung', 'dev-fast'], timeout=0.5, poco_factory=fake_poco)
+    start = time.time()
+    arrivals = []
+    for result in runner.iter_results([test, second]):
+        arrivals.append((result.device_id, result.status, time.time() - start))
+    elapsed = time.time() - start
+    assert elapsed < 2, elapsed
+    status = [(device_id, s) for device_id, s, _ in arrivals]
+    assert ('dev-hung', DeviceResult.TIMEOUT) in status and ('dev-hung', DeviceResult.SKIPPED) in status, status
+    assert [s for d, s in status if d == 'dev-fast'] == [DeviceResult.PASSED] * 2, status
+    # the fast device is reported long before the hung one times out
+    assert arrivals[0][0] == 'dev-fast' and arrivals[0][2] < 0.4, arrivals
+
+
+def check_rerun_after_timeout():
+    release = threading.Event()
+    used = []
+
+    def hang(poco, device_id):
+        used.append(poco)
+        release.wait(5)
+        # the abandoned thread goes on with its Poco after the deadline
+        read_serial(poco, device_id)
+
+    runner = ParallelRunner(['dev-hung'], timeout=0.2, poco_factory=fake_poco)
+    try:
+        report = runner.run(hang)
+        assert [r.status for r in report.results] == [DeviceResult.TIMEOUT], report.results
+        report = runner.run(read_serial)
+        assert report.ok, report.failures
+        assert report.results[0].value != id(used[0]), 'rerun got the Poco of the abandoned thread'
+    finally:
+        release.set()
+
+
+def run():
+    check_results_per_device()
+    check_failures()
+    check_bounded_and_fair()
+    check_timeout_and_streaming()
+    check_rerun_after_timeout()
+    print('SUCCESS: Parallel runner mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,114 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for the request coalescing layer of the
+UIAutomator2 driver (SingleFlightDevice).
+
+No device needed. Checks that:
+ - concurrent hierarchy dumps share one device request
+ - selector calls (device(resourceId=...)) and other attributes pass through
+   the wrapper, so setAttr('text') on a node with a resource id still works
+ - an expired request is not joined any more, and invalidating the hierarchy
+   expires it (a plain device has nothing to expire)
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_singleflight_mock
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+from tmp.poco_v1.drivers.android.singleflight import SingleFlightDevice
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent
+from tmp.poco_v1.pocofw import Poco
+
+DUMP_TIME = 0.2
+
+
+class FakeUiObject(object):
+    def __init__(self, device, selector):
+        self.device = device
+        self.selector = selector
+
+    def set_text(self, text):
+        self.device.texts.append((self.selector, text))
+        return True
+
+
+class FakeDevice(object):
+    def __init__(self):
+        self.info = {'displayWidth': 1080, 'displayHeight': 1920, 'displayRotation': 0}
+        self.dumps = 0
+        self.texts = []
+
+    def window_size(self):
+        return 1080, 1920
+
+    def dump_hierarchy(self, compressed=False):
+        self.dumps += 1
+        time.sleep(DUMP_TIME)
+        return (
+            '<hierarchy rotation="0">'
+            '<node index="0" text="" resource-id="com.app:id/name" class="android.widget.EditText" '
+            'package="com.app" content-desc="" bounds="[0,0][1080,100]" enabled="true" visible-to-user="true" />'
+            '</hierarchy>'
+        )
+
+    def __call__(self, **selector):
+        return FakeUiObject(self, selector)
+
+
+def check_coalesced_dumps():
+    device = FakeDevice()
+    wrapped = SingleFlightDevice(device)
+    threads = [threading.Thread(target=wrapped.dump_hierarchy) for _ in range(5)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert device.dumps == 1, device.dumps
+    assert time.time() - start < 2 * DUMP_TIME
+    stats = wrapped.get_stats()['dump_hierarchy']
+    assert stats == {'requests': 5, 'performed': 1, 'coalesced': 4}, stats
+
+    wrapped.expire()
+    wrapped.dump_hierarchy()
+    assert device.dumps == 2
+
+
+def check_passthrough():
+    device = FakeDevice()
+    wrapped = SingleFlightDevice(device)
+    assert wrapped(resourceId='com.app:id/name').set_text('x')
+    assert wrapped.texts is device.texts
+
+    poco = Poco(AndroidUiautomator2Agent(wrapped))
+    poco(resourceId='com.app:id/name').set_text('Alice')
+    assert device.texts[-1] == ({'resourceId': 'com.app:id/name'}, 'Alice'), device.texts
+
+
+def check_invalidate_expires():
+    device = FakeDevice()
+    wrapped = SingleFlightDevice(device)
+    dumper = AndroidUiautomator2Agent(wrapped).hierarchy.dumper
+    in_flight = threading.Thread(target=wrapped.dump_hierarchy)
+    in_flight.start()
+    time.sleep(DUMP_TIME / 4)
+    dumper.invalidate_cache()
+    wrapped.dump_hierarchy()
+    in_flight.join()
+    assert device.dumps == 2, device.dumps
+
+    AndroidUiautomator2Agent(FakeDevice()).hierarchy.dumper.invalidate_cache()
+
+
+def run():
+    check_coalesced_dumps()
+    check_passthrough()
+    check_invalidate_expires()
+    print('SUCCESS: Single flight mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,114 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for pinned snapshots of the UIAutomator2
+dumper.
+
+No device needed. A FakeDevice counts its dumps and shows the count in the
+hierarchy. Checks that:
+ - a pinned snapshot is kept across actions and polls
+ - invalidating the cache inside a pin dumps once, and the pin then keeps the
+   new snapshot instead of losing its root
+ - getRoot never returns None while other threads keep invalidating
+ - the hierarchy fingerprint is not available while pinned, so wait_stable
+   falls back to its fixed sleep instead of taking the pin for a still UI
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_snapshot_pin_mock
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent, AndroidUiautomator2Poco, \
+    _PinnedSnapshot
+from tmp.poco_v1.pocofw import Poco
+
+
+class FakeDevice(object):
+    def __init__(self):
+        self.info = {'displayWidth': 1080, 'displayHeight': 1920, 'displayRotation': 0}
+        self.dumps = 0
+
+    def window_size(self):
+        return 1080, 1920
+
+    def dump_hierarchy(self, compressed=False):
+        self.dumps += 1
+        return (
+            '<hierarchy rotation="0">'
+            '<node index="0" text="{}" resource-id="com.app:id/count" class="android.widget.TextView" '
+            'package="com.app" content-desc="" bounds="[0,0][1080,100]" enabled="true" visible-to-user="true" />'
+            '</hierarchy>'
+        ).format(self.dumps)
+
+
+def count(poco):
+    return poco(resourceId='com.app:id/count').get_text()
+
+
+def check_invalidate_inside_pin():
+    device = FakeDevice()
+    poco = Poco(AndroidUiautomator2Agent(device, snapshot_max_age=0))
+    dumper = poco.agent.hierarchy.dumper
+    with _PinnedSnapshot(dumper):
+        pinned = count(poco)
+        dumper.on_action()
+        dumper.on_poll()
+        assert count(poco) == pinned
+
+        dumper.invalidate_cache()
+        refreshed = count(poco)
+        assert refreshed != pinned
+        dumps = device.dumps
+        # the pin keeps the refreshed snapshot
+        for _ in range(3):
+            assert dumper.getRoot() is not None
+            assert count(poco) == refreshed
+        assert device.dumps == dumps, (device.dumps, dumps)
+    assert count(poco) != refreshed
+
+
+def check_concurrent_invalidation():
+    device = FakeDevice()
+    poco = Poco(AndroidUiautomator2Agent(device, snapshot_max_age=0))
+    dumper = poco.agent.hierarchy.dumper
+    stop = threading.Event()
+
+    def invalidate():
+        while not stop.is_set():
+            dumper.on_action()
+
+    thread = threading.Thread(target=invalidate)
+    thread.start()
+    try:
+        for _ in range(300):
+            assert dumper.getRoot() is not None
+    finally:
+        stop.set()
+        thread.join()
+
+
+def check_fingerprint_while_pinned():
+    device = FakeDevice()
+    # the driver's Poco on a fake device, without connecting to one
+    poco = AndroidUiautomator2Poco.__new__(AndroidUiautomator2Poco)
+    super(AndroidUiautomator2Poco, poco).__init__(AndroidUiautomator2Agent(device), stable_fingerprint='hierarchy',
+                                                  action_interval=0.3)
+    assert poco.get_ui_fingerprint() is not None
+    with poco.pin_snapshot():
+        assert poco.get_ui_fingerprint() is None
+        start = time.time()
+        poco.wait_stable()
+        assert time.time() - start >= 0.3
+
+
+def run():
+    check_invalidate_inside_pin()
+    check_concurrent_invalidation()
+    check_fingerprint_while_pinned()
+    print('SUCCESS: Snapshot pin mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
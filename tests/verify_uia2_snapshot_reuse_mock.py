@@ -0,0 +1,64 @@
+# coding=utf-8
+"""
+Verification script (mock-based) for snapshot reuse of the UIAutomator2
+dumper.
+
+No device needed. A FakeDevice shows a label that changes on demand. Checks
+that:
+ - a byte-identical dump keeps the previous snapshot with its node views
+ - a changed label gives a new snapshot
+ - hierarchy fingerprints follow the dump text
+
+Run:
+  python -m tmp.poco_v1.tests.verify_uia2_snapshot_reuse_mock
+"""
+from __future__ import print_function
+
+from tmp.poco_v1.drivers.android.uiautomation2 import AndroidUiautomator2Agent
+from tmp.poco_v1.pocofw import Poco
+
+
+class FakeDevice(object):
+    def __init__(self):
+        self.info = {'displayWidth': 1080, 'displayHeight': 1920, 'displayRotation': 0}
+        self.label = '0%'
+
+    def window_size(self):
+        return 1080, 1920
+
+    def dump_hierarchy(self, compressed=False):
+        return (
+            '<hierarchy rotation="0">'
+            '<node index="0" text="" resource-id="com.app:id/list" class="android.widget.FrameLayout" '
+            'package="com.app" content-desc="" bounds="[0,0][1080,1920]" enabled="true" visible-to-user="true">'
+            '<node index="0" text="{}" resource-id="com.app:id/progress" class="android.widget.TextView" '
+            'package="com.app" content-desc="" bounds="[0,0][1080,100]" enabled="true" visible-to-user="true" />'
+            '</node>'
+            '</hierarchy>'
+        ).format(self.label)
+
+
+def run():
+    device = FakeDevice()
+    poco = Poco(AndroidUiautomator2Agent(device, snapshot_max_age=0))
+    dumper = poco.agent.hierarchy.dumper
+    assert poco(resourceId='com.app:id/progress').get_text() == '0%'
+    snapshot = dumper._snapshot
+    fingerprint = dumper.fingerprint()
+    assert fingerprint is not None
+
+    poco(resourceId='com.app:id/progress').get_text()
+    assert dumper.get_snapshot_stats()['snapshots_reused'] >= 1
+    assert dumper._snapshot is snapshot
+    assert dumper.getRoot().snapshot is snapshot
+    assert dumper.fingerprint() == fingerprint
+
+    device.label = '50%'
+    assert poco(resourceId='com.app:id/progress').get_text() == '50%'
+    assert dumper._snapshot is not snapshot
+    assert dumper.fingerprint() != fingerprint
+    print('SUCCESS: Snapshot reuse mock verification passed.')
+
+
+if __name__ == '__main__':
+    run()
@@ -3,10 +3,10 @@
 # @Email:  gzliuxin@corp.netease.com
 # @Date:   2017-07-11 14:34:46
 
-from hrpc.exceptions import TransportDisconnected
+from hrpc.exceptions import TransportDisconnected, RpcRemoteException
 
 from poco.sdk.interfaces.hierarchy import HierarchyInterface
-from poco.utils.hrpc.utils import transform_node_has_been_removed_exception
+from poco.utils.hrpc.utils import transform_node_has_been_removed_exception, is_node_removed_exception
 from poco.utils.retry import retries_when
 
 
@@ -16,6 +16,8 @@ class RemotePocoHierarchy(HierarchyInterface):
         self.dumper = dumper
         self.selector = selector
         self.attributor = attributor
+        # whether the remote attributor serves getAttrs, None until the first try
+        self._remote_get_attrs = None
 
     # node/hierarchy interface
     @retries_when(TransportDisconnected, delay=3.0)
@@ -23,6 +25,21 @@ class RemotePocoHierarchy(HierarchyInterface):
     def getAttr(self, nodes, name):
         return self.attributor.getAttr(nodes, name)
 
+    @retries_when(TransportDisconnected, delay=3.0)
+    @transform_node_has_been_removed_exception
+    def getAttrs(self, nodes, names):
+        # one round trip when the remote sdk implements getAttrs, one per attribute on older ones
+        if self._remote_get_attrs is not False:
+            try:
+                values = self.attributor.getAttrs(nodes, names)
+                self._remote_get_attrs = True
+                return values
+            except RpcRemoteException as e:
+                if self._remote_get_attrs or is_node_removed_exception(e):
+                    raise
+                self._remote_get_attrs = False
+        return [self.attributor.getAttr(nodes, name) for name in names]
+
     @retries_when(TransportDisconnected, delay=3.0)
     @transform_node_has_been_removed_exception
     def setAttr(self, nodes, name, value):
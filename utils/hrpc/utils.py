@@ -8,11 +8,25 @@ from hrpc.object_proxy import safe_repr
 from poco.exceptions import PocoTargetRemovedException
 
 
+_NODE_REMOVED_EXC_TYPES = (
+    'NodeHasBeenRemovedException',
+    'RemoteObjectNotFoundException',
+)
+
+
+def is_node_removed_exception(e):
+    """
+    whether the RpcRemoteException means the target node no longer exists
+    """
+
+    return any(e.error_type == t or e.error_type.endswith('.' + t) for t in _NODE_REMOVED_EXC_TYPES)
+
+
 def transform_node_has_been_removed_exception(func):
     """
     将HRpcRemoteException.NodeHasBeenRemovedException转换成PocoTargetRemovedException
 
-    :param func: 仅限getattr和setattr两个接口方法
+    :param func: 仅限getattr、getattrs和setattr几个接口方法
     :return: 
     """
 
@@ -28,16 +42,10 @@ def transform_node_has_been_removed_exception(func):
         :return:
         """
 
-        tolerance_exc_types = (
-            'NodeHasBeenRemovedException',
-            'RemoteObjectNotFoundException',
-        )
         try:
             return func(self, nodes, name, *args, **kwargs)
         except RpcRemoteException as e:
-            for t in tolerance_exc_types:
-                if e.error_type == t or e.error_type.endswith('.' + t):
-                    raise PocoTargetRemovedException('{}: {}'.format(func.__name__, name), safe_repr(nodes))
-            else:
-                raise
+            if is_node_removed_exception(e):
+                raise PocoTargetRemovedException('{}: {}'.format(func.__name__, name), safe_repr(nodes))
+            raise
     return wrapped
@@ -0,0 +1,233 @@
+# coding=utf-8
+
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from poco.exceptions import PocoTargetTimeout, PocoActionCancelledException
+
+__all__ = ['ActionPipeline', 'ActionFuture', 'pipelined']
+
+
+class ActionFuture(object):
+    """
+    Pending result of an action queued on an :py:class:`ActionPipeline`.
+
+    Attributes:
+        action (:obj:`str`): name of the action
+        ui: the UI proxy the action is performed on, None for actions on screen coordinates
+    """
+
+    def __init__(self, action, ui=None):
+        super(ActionFuture, self).__init__()
+        self.action = action
+        self.ui = ui
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Wait for the action to be performed.
+
+        Args:
+            timeout (:obj:`float`): max seconds to wait, None for no limit
+
+        Returns:
+            the return value of the action
+
+        Raises:
+            PocoTargetTimeout: when the action is not done in time
+            the exception raised by the action, or :py:class:`PocoActionCancelledException
+            <poco.exceptions.PocoActionCancelledException>` if it was dropped after an earlier action failed
+        """
+
+        if not self._done.wait(timeout):
+            raise PocoTargetTimeout(self.action, self.ui)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def exception(self, timeout=None):
+        """
+        Same as :py:meth:`result` but returns the exception of the action instead of raising it, None on success.
+        """
+
+        if not self._done.wait(timeout):
+            raise PocoTargetTimeout(self.action, self.ui)
+        return self._error
+
+    def add_done_callback(self, fn):
+        """
+        Call ``fn(future)`` once the action is done, at once if it already is. Callbacks run on the pipeline worker.
+        """
+
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, result=None, error=None):
+        with self._lock:
+            self._result = result
+            self._error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:
+                pass
+
+
+class ActionPipeline(object):
+    """
+    Ordered queue of input actions of one Poco instance (one device), performed one after another by a worker
+    thread while the caller goes on.
+
+    Actions run in submission order, each one entirely (pre action callbacks, the input, waiting for the UI to
+    become still, post action callbacks) before the next. When an action fails, the actions queued behind it are
+    dropped (their futures raise :py:class:`PocoActionCancelledException
+    <poco.exceptions.PocoActionCancelledException>`), and so are new ones, until :py:meth:`join` has raised the
+    failure. This mirrors the synchronous mode, where the failure stops the script.
+
+    The worker thread starts with the first action and stops after ``idle_timeout`` seconds without any.
+
+    Args:
+        idle_timeout (:obj:`float`): seconds the idle worker thread is kept
+    """
+
+    def __init__(self, idle_timeout=5.0):
+        super(ActionPipeline, self).__init__()
+        self.idle_timeout = idle_timeout
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = None  # future of the action being performed
+        self._error = None  # first failure, until join raises it
+        self.actions_performed = 0
+        self.actions_cancelled = 0
+
+    def in_worker(self):
+        """
+        Whether the caller is the worker thread, i.e. an action calling into Poco. Such calls are never queued.
+        """
+
+        return threading.current_thread() is self._thread
+
+    def pending(self):
+        """
+        Returns:
+            :obj:`int`: number of actions queued or being performed
+        """
+
+        with self._cond:
+            return len(self._queue) + (self._running is not None)
+
+    def submit(self, action, ui, func, *args, **kwargs):
+        """
+        Queue an action.
+
+        Args:
+            action (:obj:`str`): name of the action
+            ui: the UI proxy involved, if any
+            func: callable performing the action, called with ``args`` and ``kwargs``
+
+        Returns:
+            :py:class:`ActionFuture`: the pending result
+        """
+
+        future = ActionFuture(action, ui)
+        with self._cond:
+            self._queue.append((future, func, args, kwargs))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='poco-actions')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify_all()
+        return future
+
+    def join(self, timeout=None):
+        """
+        Barrier: wait until every queued action is done. Returns at once on the worker thread.
+
+        Args:
+            timeout (:obj:`float`): max seconds to wait, None for no limit
+
+        Raises:
+            PocoTargetTimeout: when the actions are not done in time
+            the exception of the first action that failed since the last join
+        """
+
+        if self.in_worker():
+            return
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while self._queue or self._running is not None:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise PocoTargetTimeout('pending actions', self._running.ui if self._running else None)
+                self._cond.wait(remaining)
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait(self.idle_timeout)
+                    if not self._queue:
+                        self._thread = None
+                        return
+                future, func, args, kwargs = self._queue.popleft()
+                earlier_error = self._error
+                self._running = future
+
+            result = error = None
+            if earlier_error is not None:
+                error = PocoActionCancelledException(future.action, future.ui, earlier_error)
+            else:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+            # done before join can return
+            future._finish(result, error)
+
+            with self._cond:
+                self._running = None
+                if earlier_error is not None:
+                    self.actions_cancelled += 1
+                else:
+                    self.actions_performed += 1
+                    if error is not None:
+                        self._error = error
+                self._cond.notify_all()
+
+
+def pipelined(func):
+    """
+    Decorator of the input actions of :py:class:`Poco <poco.pocofw.Poco>` and :py:class:`UIObjectProxy
+    <poco.proxy.UIObjectProxy>`. With option ``async_actions`` on, the action is queued on the pipeline of the Poco
+    instance and an :py:class:`ActionFuture` is returned instead of the result. Actions called by a queued action
+    run directly.
+    """
+
+    @wraps(func)
+    def wrapped(self, *args, **kwargs):
+        poco = getattr(self, 'poco', self)
+        pipeline = getattr(poco, '_pipeline', None)
+        if pipeline is None or pipeline.in_worker():
+            return func(self, *args, **kwargs)
+        ui = self if poco is not self else None
+        return pipeline.submit(func.__name__, ui, func, self, *args, **kwargs)
+
+    return wrapped
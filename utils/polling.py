@@ -0,0 +1,96 @@
+# coding=utf-8
+
+import time
+
+__all__ = ['AdaptivePolling']
+
+
+class AdaptivePolling(object):
+    """
+    Sleep schedule of one wait loop, replacing the fixed ``poll_interval`` sleep between two polls.
+
+    The first sleep is short, so that a UI that is already about to change is seen quickly. Each following sleep
+    grows by ``backoff``, but never drops below ``cost_ratio`` times the measured cost of one poll (the time spent
+    between two sleeps, i.e. dump and evaluation), which keeps the device at most ``1 / (1 + cost_ratio)`` busy with
+    polling on slow devices. No sleep is longer than ``poll_interval``, so a wait never polls less often than with
+    the fixed interval.
+
+    Args:
+        poll_interval (:obj:`float`): the fixed interval being replaced, used as the cap
+        first_interval (:obj:`float`): the first sleep
+        backoff (:obj:`float`): growth factor of the following sleeps
+        cost_ratio (:obj:`float`): minimum sleep relative to the poll cost
+    """
+
+    def __init__(self, poll_interval, first_interval=0.1, backoff=1.6, cost_ratio=1.0):
+        super(AdaptivePolling, self).__init__()
+        self.poll_interval = poll_interval
+        self.first_interval = min(first_interval, poll_interval)
+        self.backoff = backoff
+        self.cost_ratio = cost_ratio
+        self.polls = 0
+        self.slept = 0.0
+        self.poll_cost = None
+        self._interval = None
+        self._started = time.time()
+        self._woke = self._started
+        self._previous_poll = None
+
+    def next_interval(self):
+        if self._interval is None:
+            interval = self.first_interval
+        else:
+            interval = self._interval * self.backoff
+        if self.poll_cost is not None:
+            interval = max(interval, self.poll_cost * self.cost_ratio)
+        return min(interval, self.poll_interval)
+
+    def sleep(self, wait=time.sleep):
+        """
+        Sleep until the next poll.
+
+        Args:
+            wait (callable): ``wait(seconds)`` that does the sleeping, it may return earlier (e.g. when the driver
+             knows the UI has changed)
+        """
+
+        now = time.time()
+        cost = now - self._woke
+        self.poll_cost = cost if self.poll_cost is None else (self.poll_cost + cost) / 2.0
+        self._previous_poll = self._woke
+        self._interval = self.next_interval()
+        wait(self._interval)
+        self._woke = time.time()
+        self.polls += 1
+        self.slept += self._woke - now
+
+    def finish(self, succeeded=True):
+        """
+        Summary of the wait, called when it ends.
+
+        The time saved is estimated against the fixed schedule (a poll every ``poll_interval`` plus poll cost): the
+        awaited state did not hold at the previous poll, so the fixed schedule could not have seen it before its
+        first poll after that one. Nothing is saved by a wait that timed out.
+
+        Args:
+            succeeded (:obj:`bool`): whether the awaited state was reached
+
+        Returns:
+            :obj:`dict`: ``polls``, ``slept``, ``elapsed`` and ``saved`` seconds
+        """
+
+        end = time.time()
+        elapsed = end - self._started
+        saved = 0.0
+        if succeeded and self._previous_poll is not None:
+            cost = self.poll_cost or 0.0
+            period = self.poll_interval + cost
+            previous = self._previous_poll - self._started
+            fixed = (int(previous / period) + 1) * period + cost
+            saved = max(0.0, fixed - elapsed)
+        return {
+            'polls': self.polls,
+            'slept': self.slept,
+            'elapsed': elapsed,
+            'saved': saved,
+        }
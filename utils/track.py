@@ -1,37 +1,50 @@
 # coding=utf-8
 
+import heapq
+import math
+
 from poco.utils.vector import Vec2
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 __all__ = ['MotionTrack', 'MotionTrackBatch']
 
+# below this many points per segment, building the NumPy arrays costs more than the list comprehension
+NUMPY_SAMPLING_THRESHOLD = 64
+
 
 def track_sampling(track, accuracy=0.002):
     # accuracy： 采样精度，都是归一化坐标系
     if len(track) <= 1:
         return track
 
-    total_distance = 0.0
-    for i in range(len(track) - 1):
-        p0 = Vec2(track[i])
-        p1 = Vec2(track[i + 1])
-        total_distance += (p1 - p0).length
-
     sample_points = []
-    for i in range(len(track) - 1):
-        p0 = Vec2(track[i])
-        p1 = Vec2(track[i + 1])
-        d = p1 - p0
-        seg_length = d.length
-        d = (p1 - p0).unit() * accuracy
-        sp = p0
-        while (sp - p0).length < seg_length:
-            sample_points.append(sp.to_list())
-            sp = sp + d
-
+    for p0, p1 in zip(track, track[1:]):
+        sample_points.extend(_segment_sampling(p0, p1, accuracy))
     sample_points.append(track[-1])
     return sample_points
 
 
+def _segment_sampling(p0, p1, accuracy):
+    # p0 + k * accuracy along the segment, for every k with k * accuracy < segment length. All at once instead of
+    # stepping and measuring a Vec2 per point
+    x0, y0 = p0[0], p0[1]
+    dx, dy = p1[0] - x0, p1[1] - y0
+    length = math.sqrt(dx * dx + dy * dy)
+    if length == 0:
+        return []
+    # the epsilon keeps a point landing on p1 by rounding out, p1 is the next segment's start or the track's end
+    count = max(1, int(math.ceil(length / accuracy - 1e-9)))
+    sx, sy = dx / length * accuracy, dy / length * accuracy
+    if numpy is not None and count >= NUMPY_SAMPLING_THRESHOLD:
+        k = numpy.arange(count, dtype=numpy.float64)[:, None]
+        return (numpy.array([x0, y0], dtype=numpy.float64) + k * numpy.array([sx, sy])).tolist()
+    return [[x0 + k * sx, y0 + k * sy] for k in range(count)]
+
+
 class MotionTrackHold(object):
     def __init__(self, how_long):
         super(MotionTrackHold, self).__init__()
@@ -75,27 +88,30 @@ class MotionTrack(object):
         for ep in self.event_points:
             ep[2] = _id
 
-    def discretize(self, contact_id=0, accuracy=0.004, dt=0.001):
+    def iter_timed_events(self, contact_id=0, accuracy=0.004, dt=0.001):
         """
-        Sample this motion track into discretized motion events.
+        Sample this motion track into motion events without sleep events, each tagged with its time in ticks of
+        ``dt``.
 
         Args:
             contact_id: contact point id
             accuracy: motion minimum difference in space
             dt: sample time difference
+
+        Yields:
+            tuple: (tick, motion event)
         """
 
         if not self.event_points:
-            return []
+            return
 
-        events = []
         action_dt = accuracy / self.speed
         dt = dt or action_dt
+        action_ticks = int(action_dt / dt)
 
         ep0 = self.event_points[0]
-        for _ in range(int(ep0[0] / dt)):
-            events.append(['s', dt])
-        events.append(['d', ep0[1], contact_id])
+        tick = int(ep0[0] / dt)
+        yield tick, ['d', ep0[1], contact_id]
         for i, ep in enumerate(self.event_points[1:]):
             prev_ts = self.event_points[i][0]
             curr_ts = ep[0]
@@ -103,18 +119,41 @@ class MotionTrack(object):
             p1 = ep[1]
             if p0 == p1:
                 # hold
-                for _ in range(int((curr_ts - prev_ts) / dt)):
-                    events.append(['s', dt])
+                tick += int((curr_ts - prev_ts) / dt)
             else:
                 # move
-                dpoints = track_sampling([p0, p1], accuracy)
-                for p in dpoints:
-                    events.append(['m', p, contact_id])
-                    for _ in range(int(action_dt / dt)):
-                        events.append(['s', dt])
+                for p in track_sampling([p0, p1], accuracy):
+                    yield tick, ['m', p, contact_id]
+                    tick += action_ticks
+        yield tick, ['u', contact_id]
 
-        events.append(['u', contact_id])
-        return events
+    def discretize(self, contact_id=0, accuracy=0.004, dt=0.001):
+        """
+        Sample this motion track into discretized motion events.
+
+        Args:
+            contact_id: contact point id
+            accuracy: motion minimum difference in space
+            dt: sample time difference
+        """
+
+        return list(_with_sleeps(self.iter_timed_events(contact_id, accuracy, dt), dt or accuracy / self.speed))
+
+
+def _with_sleeps(timed_events, dt):
+    # one sleep event for each gap between the ticks of consecutive events
+    tick = 0
+    for t, evt in timed_events:
+        if t > tick:
+            yield ['s', (t - tick) * dt]
+            tick = t
+        yield evt
+
+
+def _tagged(timed_events, index):
+    # sort key of the merge: tick, then track index, then order within the track. Events themselves never compare
+    for seq, (tick, evt) in enumerate(timed_events):
+        yield tick, index, seq, evt
 
 
 class MotionTrackBatch(object):
@@ -122,42 +161,25 @@ class MotionTrackBatch(object):
         super(MotionTrackBatch, self).__init__()
         self.tracks = tracks
 
-    def discretize(self, accuracy=0.004):
+    def iter_events(self, accuracy=0.004, dt=0.001):
+        """
+        Lazily merge the discretized motion events of all tracks in time order. Events at the same time come in
+        track order, and the sleeps between them are coalesced into one sleep event.
+
+        Args:
+            accuracy: motion minimum difference in space
+            dt: sample time difference
+
+        Yields:
+            list: motion event
+        """
+
         if accuracy < 0.001:
             accuracy = 0.001
-        events = []
-        discretized_tracks = [t.discretize(i, accuracy) for i, t in enumerate(self.tracks)]
-
-        while discretized_tracks:
-            # take motion events
-            for dtrack in discretized_tracks:
-                while True:
-                    evt = dtrack[0]
-                    if evt[0] != 's':
-                        events.append(evt)
-                        dtrack.pop(0)
-                    else:
-                        break
-                    if not dtrack:
-                        break
-
-            discretized_tracks = list(filter(lambda a: a != [], discretized_tracks))
-
-            # take sleep events
-            while discretized_tracks and all(dtrack[0][0] == 's' for dtrack in discretized_tracks):
-                evt_sleep = discretized_tracks[0][0]
-                if events:
-                    prev_evt = events[-1]
-                    if prev_evt[0] == 's':
-                        prev_evt[1] += evt_sleep[1]
-                        events[-1] = prev_evt
-                    else:
-                        events.append(evt_sleep)
-                else:
-                    events.append(evt_sleep)
-                for dtrack in discretized_tracks:
-                    dtrack.pop(0)
-
-                discretized_tracks = list(filter(lambda a: a != [], discretized_tracks))
-
-        return events
+        streams = [_tagged(t.iter_timed_events(i, accuracy, dt), i) for i, t in enumerate(self.tracks)]
+        merged = ((tick, evt) for tick, _, _, evt in heapq.merge(*streams))
+        for evt in _with_sleeps(merged, dt):
+            yield evt
+
+    def discretize(self, accuracy=0.004):
+        return list(self.iter_events(accuracy))